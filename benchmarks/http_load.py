@@ -0,0 +1,180 @@
+"""
+    Closed-loop HTTP load generator used to compare deployments of the app under the same load.
+
+    Each target is hit by N concurrent clients (threads with a keep-alive connection each) for a fixed
+    time; every client sends its next request as soon as the previous one is answered. For every target
+    and concurrency level it reports throughput and latency percentiles (p50/p95/p99).
+
+    Comparing the WSGI and the ASGI stacks (sync views vs `tasks.async_views`):
+
+        # WSGI, sync workers
+        cd src && gunicorn task_manager.wsgi:application --bind 127.0.0.1:8000 --workers 4
+        # ASGI, same number of workers
+        cd src && gunicorn task_manager.asgi:application --bind 127.0.0.1:8001 --workers 4 -k uvicorn.workers.UvicornWorker
+
+        python benchmarks/http_load.py --email admin@example.com --password secret \\
+            --target wsgi=http://127.0.0.1:8000/tasks/ \\
+            --target asgi=http://127.0.0.1:8001/tasks/async/ \\
+            --concurrency 1,16,64 --duration 20
+
+    Only the Python standard library is used, so it runs from any machine that can reach the server.
+    The client is itself Python, so run it from another machine for high concurrency levels.
+"""
+import argparse
+import http.client
+import http.cookies
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.parse
+
+
+def connect(url):
+    parts = urllib.parse.urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    return connection_class(parts.netloc, timeout=30)
+
+
+def login(url, email, password):
+    """
+        Logs in through the login form of the site of `url` and returns the `Cookie` header of the session.
+    """
+    cookies = http.cookies.SimpleCookie()
+    connection = connect(url)
+
+    connection.request('GET', '/login/')
+    response = connection.getresponse()
+    response.read()
+    cookies.load(', '.join(response.headers.get_all('Set-Cookie', [])))
+
+    csrftoken = cookies['csrftoken'].value if 'csrftoken' in cookies else ''
+    form = urllib.parse.urlencode({'username': email, 'password': password, 'csrfmiddlewaretoken': csrftoken})
+    parts = urllib.parse.urlsplit(url)
+    connection.request('POST', '/login/', body=form, headers={
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'Cookie': f'csrftoken={csrftoken}',
+        'Referer': f'{parts.scheme}://{parts.netloc}/login/',
+    })
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    for header in response.headers.get_all('Set-Cookie', []):
+        cookies.load(header)
+
+    if 'sessionid' not in cookies:
+        raise SystemExit(f'login failed on {parts.netloc}/login/ (status {response.status})')
+    return '; '.join(f'{name}={morsel.value}' for name, morsel in cookies.items())
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def client(url, headers, deadline, latencies, errors, lock):
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    connection = connect(url)
+    own_latencies, own_errors = [], 0
+
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                own_errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            own_errors += 1
+            connection.close()
+            connection = connect(url)
+            continue
+        own_latencies.append(time.perf_counter() - started)
+
+    connection.close()
+    with lock:
+        latencies.extend(own_latencies)
+        errors.append(own_errors)
+
+
+def run(url, headers, concurrency, duration):
+    """
+        Hits `url` with `concurrency` clients for `duration` seconds and returns the measured statistics.
+    """
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    threads = [
+        threading.Thread(target=client, args=(url, headers, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': sum(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round(max(latencies, default=0) * 1000, 1),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def parse_target(value):
+    name, separator, url = value.partition('=')
+    if not separator or not url.startswith(('http://', 'https://')):
+        raise argparse.ArgumentTypeError('expected NAME=URL, e.g. wsgi=http://127.0.0.1:8000/tasks/')
+    return name, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', type=parse_target, action='append', required=True, help='NAME=URL to load (repeatable).')
+    parser.add_argument('--concurrency', default='1,16,64', help='Comma-separated numbers of concurrent clients.')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load per target and concurrency.')
+    parser.add_argument('--warmup', type=float, default=2, help='Seconds of load discarded before each target.')
+    parser.add_argument('--email', help='Log in with this user before loading pages that require it.')
+    parser.add_argument('--password', help='Password of --email.')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    results = []
+    for name, url in args.target:
+        headers = {'Accept': 'text/html,application/json'}
+        if args.email:
+            headers['Cookie'] = login(url, args.email, args.password or '')
+        if args.warmup:
+            run(url, headers, max(levels), args.warmup)
+        for level in levels:
+            result = {'target': name, 'url': url, **run(url, headers, level, args.duration)}
+            results.append(result)
+            if not args.json:
+                print(
+                    f"{name:>8} c={level:<4} {result['requests_per_second']:>8} req/s  "
+                    f"p50 {result['p50_ms']:>7} ms  p95 {result['p95_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  "
+                    f"errors {result['errors']}",
+                    flush=True,
+                )
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+    Counts the database queries of warm authenticated requests, with database sessions + `ModelBackend`
+    (Django's defaults) and with the project's settings (cached_db sessions + `CachedModelBackend`).
+
+        python benchmarks/request_queries.py
+        python benchmarks/request_queries.py --path /home/ --path /tasks/ --requests 200 --json
+
+    It runs the app in-process with Django's test client against a throwaway test database, so it needs
+    the project's dependencies but no running server. For each configuration and page it reports the
+    queries of a warm request (total, and those reading the session or the user) and the median time
+    of `--requests` requests.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import Group  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection, reset_queries  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment  # noqa: E402
+
+from perfil_users.models import CustomUser  # noqa: E402
+
+
+CONFIGURATIONS = {
+    'db-session+ModelBackend': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    },
+    'project-settings': {},
+}
+AUTH_TABLES = ('"django_session"', '"perfil_users_customuser"."password"')
+
+
+def measure(path, requests):
+    """
+        Logs a fresh client in, warms `path` up and returns its query counts and median request time.
+    """
+    cache.clear()
+    client = Client()
+    client.login(username='bench@example.com', password='Senha@123')
+    client.get(path)
+
+    reset_queries()  # with DEBUG the log is capped, and a full log hides the new queries
+    with CaptureQueriesContext(connection) as ctx:
+        status = client.get(path).status_code
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get(path)
+        timings.append(time.perf_counter() - started)
+
+    return {
+        'status': status,
+        'queries': len(ctx.captured_queries),
+        'session_and_user_queries': sum(1 for query in ctx.captured_queries if any(table in query['sql'] for table in AUTH_TABLES)),
+        'median_ms': round(statistics.median(timings) * 1000, 2) if timings else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--path', action='append', help='Page to measure (repeatable); default /home/ and /tasks/.')
+    parser.add_argument('--requests', type=int, default=100, help='Requests timed per configuration and page.')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON.')
+    args = parser.parse_args(argv)
+    paths = args.path or ['/home/', '/tasks/']
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = CustomUser.objects.create_user('bench', 'bench@example.com', 'Senha@123')
+        user.groups.add(*Group.objects.filter(name__in=['tasks', 'timeEntry']))
+
+        results = []
+        for name, overrides in CONFIGURATIONS.items():
+            with override_settings(**overrides):
+                for path in paths:
+                    results.append({'configuration': name, 'path': path, **measure(path, args.requests)})
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        for result in results:
+            print(
+                f"{result['configuration']:>24} {result['path']:<10} status {result['status']}  "
+                f"queries {result['queries']:>3}  session+user {result['session_and_user_queries']}  "
+                f"median {result['median_ms']:>7} ms"
+            )
+    return results
+
+
+if __name__ == '__main__':
+    main()
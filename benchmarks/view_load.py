@@ -0,0 +1,247 @@
+"""
+    Repeatable benchmark of the main pages, to compare commits against the same synthetic data.
+
+    In-process (default): creates a throwaway test database, fills it with `manage.py seed_data`
+    and requests every page with Django's test client, one request at a time. For each page it reports
+    throughput, latency percentiles (p50/p95/p99) and the SQL queries per request.
+
+        python benchmarks/view_load.py --output before.json
+        git checkout my-branch
+        python benchmarks/view_load.py --compare before.json
+
+    Over HTTP (`--base-url`): loads a running server with the closed-loop clients of `http_load.py`.
+    Seed its database first (`python manage.py seed_data`), and pass `--metrics-token` so the queries
+    per request are read from the server's `/metrics` (see `task_manager.metrics`).
+
+        python benchmarks/view_load.py --base-url http://127.0.0.1:8000 --concurrency 16 --duration 20 \\
+            --metrics-token "$METRICS_TOKEN" --output gunicorn.json
+
+    Results are JSON, with the commit they were measured on; `--compare` adds the change of each
+    number against a previous result file.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+from http_load import login, percentile, run
+
+
+ROOT = Path(__file__).resolve().parent.parent
+PATHS = [
+    '/home/',
+    '/tasks/',
+    '/tasks/chart-data/',
+    '/tasks/time-entries/',
+    '/tasks/time-entries/?status=feito',
+    '/tasks/time-entries/report/',
+    '/users/',
+    '/users/group-list/',
+]
+METRIC_LINE = re.compile(r'^http_request_db_queries_(sum|count)\{view="([^"]*)"\} (\S+)$')
+COMPARED = ('requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request')
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def summarize(path, latencies, queries, errors, elapsed):
+    return {
+        'path': path,
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None,
+    }
+
+
+def in_process(args, paths):
+    """
+        Seeds a test database and times `paths` with the test client; returns the results per page.
+    """
+    sys.path.insert(0, str(ROOT / 'src'))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+    import django
+
+    django.setup()
+
+    from django.contrib.auth.models import Group
+    from django.core.management import call_command
+    from django.db import connection, reset_queries
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, setup_test_environment
+
+    from perfil_users.models import CustomUser
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        call_command('seed_data', users=args.users, tasks=args.tasks, seed=args.seed, prefix='bench', password='Senha@123', stdout=sys.stderr)
+        user = CustomUser.objects.get(username='bench-1')
+        user.is_staff = True
+        user.save()
+        user.groups.add(*Group.objects.filter(name__in=['tasks', 'timeEntry', 'users']))
+
+        client = Client()
+        client.force_login(user)
+        results = []
+        for path in paths:
+            for _ in range(args.warmup):
+                client.get(path)
+            latencies, queries, errors = [], [], 0
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                reset_queries()  # with DEBUG the log is capped, and a full log hides the new queries
+                with CaptureQueriesContext(connection) as ctx:
+                    request_started = time.perf_counter()
+                    status = client.get(path).status_code
+                    latencies.append(time.perf_counter() - request_started)
+                queries.append(len(ctx.captured_queries))
+                errors += status != 200
+            results.append(summarize(path, latencies, queries, errors, time.perf_counter() - started))
+            print_result(results[-1])
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+    return results
+
+
+def scrape_queries(base_url, token):
+    """
+        `{view: (sum, count)}` of the `http_request_db_queries` histogram of the server.
+    """
+    request = urllib.request.Request(f'{base_url}/metrics', headers={'Authorization': f'Bearer {token}'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        text = response.read().decode()
+    totals = {}
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            kind, view, value = match.groups()
+            total, count = totals.get(view, (0.0, 0.0))
+            totals[view] = (float(value), count) if kind == 'sum' else (total, float(value))
+    return totals
+
+
+def queries_during(before, after):
+    # The view of the page is the one whose request count grew the most during the run.
+    deltas = {view: (total - before.get(view, (0, 0))[0], count - before.get(view, (0, 0))[1]) for view, (total, count) in after.items() if view != 'metrics'}
+    if not deltas:
+        return None
+    total, count = max(deltas.values(), key=lambda delta: delta[1])
+    return round(total / count, 2) if count else None
+
+
+def over_http(args, paths):
+    """
+        Loads `paths` of a running server with `--concurrency` clients; returns the results per page.
+    """
+    base_url = args.base_url.rstrip('/')
+    headers = {'Accept': 'text/html,application/json', 'Cookie': login(base_url + '/', args.email, args.password)}
+    results = []
+    for path in paths:
+        url = base_url + path
+        if args.warmup:
+            run(url, headers, args.concurrency, min(args.warmup, args.duration))
+        before = scrape_queries(base_url, args.metrics_token) if args.metrics_token else None
+        result = run(url, headers, args.concurrency, args.duration)
+        queries = queries_during(before, scrape_queries(base_url, args.metrics_token)) if before is not None else None
+        results.append({
+            'path': path,
+            'concurrency': args.concurrency,
+            **{key: result[key] for key in ('requests', 'errors', 'requests_per_second', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')},
+            'queries_per_request': queries,
+            'max_queries': None,
+        })
+        print_result(results[-1])
+    return results
+
+
+def compare(results, baseline):
+    """
+        Adds to each result the relative change (in %) of the compared numbers against the same page of `baseline`.
+    """
+    previous = {result['path']: result for result in baseline['results']}
+    for result in results:
+        old = previous.get(result['path'])
+        if old is None:
+            continue
+        result['change_percent'] = {
+            key: round((result[key] - old[key]) / old[key] * 100, 1) if old.get(key) and result.get(key) is not None else None
+            for key in COMPARED
+        }
+
+
+def print_result(result):
+    queries = result['queries_per_request']
+    print(
+        f"{result['path']:<36} {result['requests_per_second']:>8} req/s  p50 {result['p50_ms']:>7} ms  "
+        f"p95 {result['p95_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  "
+        f"queries {queries if queries is not None else '-':>6}  errors {result['errors']}",
+        file=sys.stderr, flush=True,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--path', action='append', help='Page to measure (repeatable); default the main pages.')
+    parser.add_argument('--output', help='Write the JSON results to this file instead of stdout.')
+    parser.add_argument('--compare', help='JSON results of a previous run to compare against.')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per page (seconds of load over HTTP).')
+    local = parser.add_argument_group('in-process')
+    local.add_argument('--requests', type=int, default=100, help='Timed requests per page.')
+    local.add_argument('--users', type=int, default=50, help='Users seeded in the test database.')
+    local.add_argument('--tasks', type=int, default=40, help='Tasks seeded per user.')
+    local.add_argument('--seed', type=int, default=0, help='Seed of the generated data.')
+    http = parser.add_argument_group('over HTTP')
+    http.add_argument('--base-url', help='Load this running server instead of running in-process.')
+    http.add_argument('--email', default='seed-1@example.com', help='User to log in with (seed_data creates seed-1).')
+    http.add_argument('--password', default='Senha@123', help='Password of --email.')
+    http.add_argument('--concurrency', type=int, default=1, help='Concurrent clients.')
+    http.add_argument('--duration', type=float, default=10, help='Seconds of load per page.')
+    http.add_argument('--metrics-token', help='METRICS_TOKEN of the server, to report the queries per request.')
+    args = parser.parse_args(argv)
+    paths = args.path or PATHS
+
+    commit, dirty = git_revision()
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'mode': 'http' if args.base_url else 'in-process',
+        'parameters': (
+            {'base_url': args.base_url, 'concurrency': args.concurrency, 'duration': args.duration}
+            if args.base_url else {'requests': args.requests, 'users': args.users, 'tasks': args.tasks, 'seed': args.seed}
+        ),
+        'results': over_http(args, paths) if args.base_url else in_process(args, paths),
+    }
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        report['baseline_commit'] = baseline.get('commit')
+        compare(report['results'], baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + '\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,8 @@
 from task_manager.settings import APP_URLS
+from perfil_users.groups import get_group_names
 
 
 def injecAppsContextProcessor(request):
-   app_urls_filtered = {app_name: pages for app_name, pages in APP_URLS.items() if app_name in request.user.groups.values_list("name", flat=True)}
+   group_names = get_group_names(request.user)
+   app_urls_filtered = {app_name: pages for app_name, pages in APP_URLS.items() if app_name in group_names}
    return {'app_urls': app_urls_filtered}
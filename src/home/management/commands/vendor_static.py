@@ -0,0 +1,108 @@
+import base64
+import hashlib
+import posixpath
+import re
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from home.vendor import ASSETS, VENDOR_DIR, write_checksums
+
+
+# Google Fonts picks the font format from the User-Agent; this one gets woff2.
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+CSS_URL = re.compile(r'url\((["\']?)([^)"\']+)\1\)')
+# The source maps aren't vendored, and `collectstatic` fails on a reference to a missing file.
+SOURCE_MAP = re.compile(rb'^(?://|/\*)# sourceMappingURL=.*$\n?', re.MULTILINE)
+
+
+def fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.read()
+    except OSError as error:
+        raise CommandError(f"Could not download {url}: {error}")
+
+
+def check_integrity(content, integrity):
+    algorithm, _, expected = integrity.partition('-')
+    digest = base64.b64encode(hashlib.new(algorithm, content).digest()).decode()
+    return digest == expected
+
+
+class Command(BaseCommand):
+    """
+        Downloads the front-end assets of `home.vendor.ASSETS` into `static/vendor/` and updates
+        `static/vendor/SHA256SUMS`; run it where the CDNs are reachable and commit the result.
+
+        Every download is checked against the SRI hash of its pin. Stylesheets are scanned for the fonts
+        and images they reference, which are downloaded next to them: relative references keep their path,
+        absolute ones are saved beside the stylesheet and the stylesheet is rewritten to point to them.
+        `sourceMappingURL` comments are removed. Assets already vendored are skipped unless `--force`.
+    """
+    help = "Downloads the pinned third-party CSS/JS/fonts into static/vendor/."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--asset', action='append', choices=sorted(ASSETS), help='Only download this asset (repeatable).')
+        parser.add_argument('--force', action='store_true', help='Download assets that are already vendored.')
+
+    def handle(self, *args, **options):
+        root = Path(settings.BASE_DIR) / 'static'
+        for name in options['asset'] or sorted(ASSETS):
+            asset = ASSETS[name]
+            target = root / asset.path
+            if target.exists() and not options['force']:
+                self.stdout.write(f"{name}: already vendored at {asset.path}.")
+                continue
+
+            content = fetch(asset.url)
+            if not check_integrity(content, asset.integrity):
+                raise CommandError(f"{name}: {asset.url} doesn't match its integrity hash {asset.integrity}.")
+            content = SOURCE_MAP.sub(b'', content)
+            if target.suffix == '.css':
+                content, extra = self.vendor_references(asset, content, root)
+            else:
+                extra = 0
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            self.stdout.write(self.style.SUCCESS(f"{name}: {asset.path} ({len(content)} bytes, {extra} referenced files)."))
+
+        checksums = write_checksums(root / VENDOR_DIR)
+        self.stdout.write(f"{len(checksums)} files listed in static/vendor/SHA256SUMS.")
+
+    def vendor_references(self, asset, content, root):
+        """
+            Downloads the files referenced with `url(...)` by stylesheet `asset` and returns the stylesheet,
+            rewritten where needed, and the number of files downloaded.
+        """
+        css = content.decode()
+        directory = posixpath.dirname(asset.path)
+        downloaded = {}
+
+        def replace(match):
+            reference = match.group(2)
+            if reference.startswith(('data:', '#')):
+                return match.group(0)
+            url = urllib.parse.urljoin(asset.url, reference)
+            path = urllib.parse.urlsplit(reference).path
+            if urllib.parse.urlsplit(reference).scheme:
+                path = posixpath.basename(path)
+                rewritten = f'url({path})'
+            else:
+                rewritten = match.group(0)
+            local = posixpath.normpath(posixpath.join(directory, path))
+            if not local.startswith(f'{directory.split("/")[0]}/'):
+                raise CommandError(f"{asset.url} references {reference}, outside of static/vendor/.")
+            if local not in downloaded:
+                downloaded[local] = fetch(url.split('#')[0])
+            return rewritten
+
+        css = CSS_URL.sub(replace, css)
+        for local, data in downloaded.items():
+            (root / local).parent.mkdir(parents=True, exist_ok=True)
+            (root / local).write_bytes(data)
+        return css.encode(), len(downloaded)
@@ -0,0 +1,25 @@
+from django import template
+from django.templatetags.static import static
+from django.utils.html import format_html
+from home.vendor import ASSETS
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_url(name):
+    """
+        URL of the vendored asset `name` (see `home.vendor`).
+    """
+    return static(ASSETS[name].path)
+
+
+@register.simple_tag
+def vendor_asset(name):
+    """
+        `<link>` or `<script>` tag of the vendored asset `name`.
+    """
+    url = vendor_url(name)
+    if ASSETS[name].path.endswith('.css'):
+        return format_html('<link rel="stylesheet" href="{}">', url)
+    return format_html('<script src="{}"></script>', url)
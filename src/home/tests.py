@@ -1,3 +1,267 @@
-from django.test import TestCase
+import base64
+import gzip
+import hashlib
+import importlib.util
+import os
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import SyncToAsync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.template import Context, Template
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from perfil_users.testing import UserTestCase, create_user
+
+from task_manager.metrics import DB_QUERIES, LATENCY, REGISTRY, TEMPLATE_TIME
+from task_manager.warmup import check_databases, warm_up
+from home.vendor import ASSETS, VENDOR_DIR, Asset, file_checksums, read_checksums
+
+
+class VendorAssetsTest(SimpleTestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.static_dir.cleanup)
+        self.vendor_dir = Path(settings.BASE_DIR, 'static', VENDOR_DIR)
+
+    def render(self, source):
+        return Template('{% load vendor_assets %}' + source).render(Context())
+
+    def test_assets_are_served_locally(self):
+        html = self.render("{% vendor_asset 'jquery.js' %} {% vendor_asset 'bootstrap.css' %} {% vendor_url 'chart.js' %}")
+        self.assertEqual(html, (
+            '<script src="/static/vendor/jquery-3.2.1/jquery.min.js"></script> '
+            '<link rel="stylesheet" href="/static/vendor/bootstrap-4.0.0/css/bootstrap.min.css"> '
+            '/static/vendor/chart.js-4.4.0/chart.umd.js'
+        ))
+
+    def test_vendored_files_match_their_checksums(self):
+        checksums = read_checksums(self.vendor_dir)
+        self.assertEqual(file_checksums(self.vendor_dir), checksums)
+        for asset in ASSETS.values():
+            self.assertIn(asset.path.removeprefix(f'{VENDOR_DIR}/'), checksums)
+
+    def test_collectstatic_fingerprints_and_precompresses(self):
+        # Brotli at its best quality takes seconds on the real files; gzip is enough here.
+        with tempfile.TemporaryDirectory() as root, mock.patch('task_manager.storage.brotli', None), override_settings(
+            STATIC_ROOT=root, STATICFILES_DIRS=[self.vendor_dir.parent],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={'staticfiles': {'BACKEND': 'task_manager.storage.CompressedManifestStaticFilesStorage'}},
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name(ASSETS['fontawesome.css'].path)
+            font = staticfiles_storage.stored_name('vendor/fontawesome-free-6.6.0/webfonts/fa-solid-900.woff2')
+
+            css = Path(root, hashed).read_text()
+            self.assertRegex(hashed, r'all\.min\.[0-9a-f]{12}\.css$')
+            self.assertIn(font.rsplit('/', 1)[1], css)
+            self.assertEqual(gzip.decompress(Path(root, hashed + '.gz').read_bytes()).decode(), css)
+            self.assertFalse(Path(root, font + '.gz').exists())
+
+    def test_vendor_static_downloads_referenced_fonts(self):
+        stylesheet = b"@font-face { src: url(https://fonts.gstatic.com/s/font/v5/a.woff2) format('woff2'); }\n/*# sourceMappingURL=font.css.map */"
+        integrity = 'sha384-' + base64.b64encode(hashlib.sha384(stylesheet).digest()).decode()
+        asset = Asset('vendor/fonts/font.css', 'https://fonts.googleapis.com/css2?family=Font', integrity)
+        files = {asset.url: stylesheet, 'https://fonts.gstatic.com/s/font/v5/a.woff2': b'font'}
+        with mock.patch.dict(ASSETS, {'font.css': asset}), \
+                mock.patch('home.management.commands.vendor_static.fetch', files.__getitem__), \
+                override_settings(BASE_DIR=Path(self.static_dir.name)):
+            call_command('vendor_static', asset=['font.css'], stdout=StringIO())
+
+        vendor = Path(self.static_dir.name, 'static/vendor')
+        self.assertEqual((vendor / 'fonts/font.css').read_text(), "@font-face { src: url(a.woff2) format('woff2'); }\n")
+        self.assertEqual((vendor / 'fonts/a.woff2').read_bytes(), b'font')
+        self.assertEqual(read_checksums(vendor), file_checksums(vendor))
+        self.assertEqual(set(read_checksums(vendor)), {'fonts/font.css', 'fonts/a.woff2'})
+
+    def test_vendor_static_fails_when_an_asset_cannot_be_downloaded(self):
+        with mock.patch('urllib.request.urlopen', side_effect=OSError('unreachable')), \
+                override_settings(BASE_DIR=Path(self.static_dir.name)):
+            with self.assertRaisesMessage(CommandError, 'Could not download'):
+                call_command('vendor_static', asset=['chart.js'], stdout=StringIO())
+
+    def test_vendor_static_checks_integrity(self):
+        with mock.patch('home.management.commands.vendor_static.fetch', return_value=b'tampered'), \
+                override_settings(BASE_DIR=Path(self.static_dir.name)):
+            with self.assertRaises(CommandError):
+                call_command('vendor_static', asset=['jquery.js'], stdout=StringIO())
+        self.assertFalse(Path(self.static_dir.name, 'static', ASSETS['jquery.js'].path).exists())
+
+
+class MediaViewTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        Path(media.name, 'uploads').mkdir()
+        Path(media.name, 'uploads/print.png').write_bytes(b'0123456789')
+        settings = override_settings(MEDIA_ROOT=media.name, MEDIA_ACCEL_REDIRECT='')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.url = reverse('media', args=['uploads/print.png'])
+        self.client.force_login(create_user())
+
+    def test_only_logged_in_users(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_streams_the_file_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-4/10')
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=2-4', HTTP_IF_RANGE='"other"').status_code, 200)
+
+    def test_hands_the_file_to_nginx(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/uploads/print.png')
+        self.assertEqual(response.content, b'')
+
+    def test_missing_files_and_paths_outside_media_root(self):
+        self.assertEqual(self.client.get(reverse('media', args=['uploads/missing.png'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('media', args=['../settings.py'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('media', args=['uploads'])).status_code, 404)
+
+
+@override_settings(METRICS_TOKEN='')
+class MetricsTest(UserTestCase):
+
+    def sample(self, metric, labels, suffix='_count'):
+        return REGISTRY.get_sample_value(metric._name + suffix, labels) or 0
+
+    def test_records_latency_queries_and_templates_per_view(self):
+        before = {
+            'requests': self.sample(LATENCY, {'view': 'home', 'method': 'GET'}),
+            'queries': self.sample(DB_QUERIES, {'view': 'home'}, '_sum'),
+            'templates': self.sample(TEMPLATE_TIME, {'view': 'home'}, '_sum'),
+        }
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+
+        self.assertEqual(self.sample(LATENCY, {'view': 'home', 'method': 'GET'}), before['requests'] + 1)
+        self.assertGreater(self.sample(DB_QUERIES, {'view': 'home'}, '_sum'), before['queries'])
+        self.assertGreater(self.sample(TEMPLATE_TIME, {'view': 'home'}, '_sum'), before['templates'])
+
+    def test_asgi_chain_stays_async(self):
+        # A sync-only middleware would make Django wrap the whole chain in SyncToAsync.
+        chain = ASGIHandler()._middleware_chain
+        self.assertNotIsInstance(chain, SyncToAsync)
+        self.assertTrue(iscoroutinefunction(chain))
+
+    async def test_records_queries_of_async_views(self):
+        await self.user.groups.aadd(*[group async for group in Group.objects.filter(name='tasks')])
+        await self.async_client.aforce_login(self.user)
+        before = self.sample(DB_QUERIES, {'view': 'task_list_async'}, '_sum')
+
+        response = await self.async_client.get(reverse('task_list_async'))
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.sample(DB_QUERIES, {'view': 'task_list_async'}, '_sum'), before)
+
+    def test_only_staff_or_scraper_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+        self.client.logout()
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_exposition_includes_fragment_cache_counters(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get(reverse('home'))
+
+        content = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{', content)
+        self.assertIn('view="home"', content)
+        self.assertIn('fragment_cache_requests_total{fragment="task_table",outcome="hits"}', content)
+
+
+class GunicornConfTest(SimpleTestCase):
+
+    def load_config(self, **environ):
+        spec = importlib.util.spec_from_file_location('gunicorn_conf', Path(settings.BASE_DIR, 'task_manager', 'gunicorn_conf.py'))
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch.dict(os.environ, environ):
+            spec.loader.exec_module(module)
+        return module
+
+    def test_cpus_come_from_the_affinity_and_the_cgroup_quota(self):
+        conf = self.load_config()
+        with mock.patch('os.sched_getaffinity', return_value=set(range(16))):
+            with mock.patch('builtins.open', mock.mock_open(read_data='max 100000\n')):
+                self.assertEqual(conf.available_cpus(), 16)
+            with mock.patch('builtins.open', mock.mock_open(read_data='150000 100000\n')):
+                self.assertEqual(conf.available_cpus(), 2)
+            with mock.patch('builtins.open', side_effect=FileNotFoundError):
+                self.assertEqual(conf.available_cpus(), 16)
+
+    def test_default_workers_are_capped(self):
+        conf = self.load_config()
+        with mock.patch.object(conf, 'available_cpus', return_value=1):
+            self.assertEqual(conf.default_workers(), 3)
+        with mock.patch.object(conf, 'available_cpus', return_value=64):
+            self.assertEqual(conf.default_workers(), conf.MAX_DEFAULT_WORKERS)
+
+    def test_environment_overrides_the_sizing(self):
+        conf = self.load_config(GUNICORN_WORKERS='5', GUNICORN_THREADS='4')
+        self.assertEqual((conf.workers, conf.threads, conf.worker_class), (5, 4, 'gthread'))
+        self.assertEqual(self.load_config(GUNICORN_THREADS='1').worker_class, 'sync')
+
+    def test_connection_budget_is_logged(self):
+        server = mock.Mock()
+        with tempfile.TemporaryDirectory() as directory:
+            conf = self.load_config(GUNICORN_WORKERS='3', GUNICORN_THREADS='2', PROMETHEUS_MULTIPROC_DIR=directory)
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory, 'DB_POOL': ''}):
+                conf.on_starting(server)
+            self.assertEqual(server.log.info.call_args.args[1:4], (6, 3, 2))
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory, 'DB_POOL': 'True', 'DB_POOL_SIZE': '4'}):
+                conf.on_starting(server)
+            self.assertEqual(server.log.info.call_args.args[1:4], (12, 3, 4))
+
+
+class WarmupTest(SimpleTestCase):
+
+    def test_databases_are_checked_and_closed(self):
+        database = mock.Mock()
+        with mock.patch('task_manager.warmup.connections', {'default': database}):
+            self.assertEqual(check_databases(), 1)
+        database.ensure_connection.assert_called_once_with()
+        database.close.assert_called_once_with()
+
+    def test_unreachable_database_is_logged(self):
+        database = mock.Mock()
+        database.ensure_connection.side_effect = DatabaseError('unreachable')
+        with mock.patch('task_manager.warmup.connections', {'default': database}), \
+                self.assertLogs('task_manager.warmup', 'WARNING'):
+            self.assertEqual(check_databases(), 0)
+        database.close.assert_called_once_with()
+
+    def test_warm_up_loads_urls_and_templates(self):
+        with mock.patch('task_manager.warmup.connections', {}):
+            report = warm_up()
+        self.assertGreater(report['urls'], 0)
+        self.assertGreater(report['templates'], 0)
+        self.assertEqual(report['databases'], 0)
@@ -0,0 +1,86 @@
+"""
+    Third-party front-end assets (Bootstrap, jQuery, Popper, Font Awesome and Chart.js), committed under
+    `static/vendor/` so that neither the build nor the pages depend on any CDN.
+
+    The pinned versions are listed below, with the URL they come from and the SRI hash of that file.
+    `static/vendor/SHA256SUMS` holds the checksum of every committed file (`sha256sum -c SHA256SUMS`),
+    and the tests check the tree against it. To update an asset, change its pin and run
+    `python manage.py vendor_static --force --asset <name>` where the CDNs are reachable, then commit
+    the result. Templates include the assets with the `vendor_assets` tags; `collectstatic` gives them a
+    hashed name and precompresses them (see `task_manager.storage`).
+"""
+import hashlib
+from collections import namedtuple
+from pathlib import Path
+
+
+Asset = namedtuple('Asset', ['path', 'url', 'integrity'])
+
+VENDOR_DIR = 'vendor'
+CHECKSUMS = 'SHA256SUMS'
+
+ASSETS = {
+    'bootstrap.css': Asset(
+        'vendor/bootstrap-4.0.0/css/bootstrap.min.css',
+        'https://cdn.jsdelivr.net/npm/bootstrap@4.0.0/dist/css/bootstrap.min.css',
+        'sha384-Gn5384xqQ1aoWXA+058RXPxPg6fy4IWvTNh0E263XmFcJlSAwiGgFAW/dAiS6JXm',
+    ),
+    'bootstrap.js': Asset(
+        'vendor/bootstrap-4.0.0/js/bootstrap.min.js',
+        'https://cdn.jsdelivr.net/npm/bootstrap@4.0.0/dist/js/bootstrap.min.js',
+        'sha384-JZR6Spejh4U02d8jOt6vLEHfe/JQGiRRSQQxSfFWpi1MquVdAyjUar5+76PVCmYl',
+    ),
+    'bootstrap5.js': Asset(
+        'vendor/bootstrap-5.1.3/js/bootstrap.bundle.min.js',
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
+        'sha384-ka7Sk0Gln4gmtz2MlQnikT1wXgYsOg+OMhuP+IlRH9sENBO0LRn5q+8nbTov4+1p',
+    ),
+    'jquery.js': Asset(
+        'vendor/jquery-3.2.1/jquery.min.js',
+        'https://code.jquery.com/jquery-3.2.1.min.js',
+        'sha384-xBuQ/xzmlsLoJpyjoggmTEz8OWUFM0/RC5BsqQBDX2v5cMvDHcMakNTNrHIW2I5f',
+    ),
+    'popper.js': Asset(
+        'vendor/popper.js-1.12.9/popper.min.js',
+        'https://cdn.jsdelivr.net/npm/popper.js@1.12.9/dist/umd/popper.min.js',
+        'sha384-ApNbgh9B+Y1QKtv3Rn7W3mgPxhU9K/ScQsAP7hUibX39j7fakFPskvXusvfa0b4Q',
+    ),
+    'fontawesome.css': Asset(
+        'vendor/fontawesome-free-6.6.0/css/all.min.css',
+        'https://cdn.jsdelivr.net/npm/@fortawesome/fontawesome-free@6.6.0/css/all.min.css',
+        'sha384-h/hnnw1Bi4nbpD6kE7nYfCXzovi622sY5WBxww8ARKwpdLj5kUWjRuyiXaD1U2JT',
+    ),
+    'chart.js': Asset(
+        'vendor/chart.js-4.4.0/chart.umd.js',
+        'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js',
+        'sha384-FcQlsUOd0TJjROrBxhJdUhXTUgNJQxTMcxZe6nHbaEfFL1zjQ+bq/uRoBQxb0KMo',
+    ),
+}
+
+
+def file_checksums(directory):
+    """
+        `{path: sha256}` of the vendored files under `directory` (`static/vendor/`), paths relative to it.
+    """
+    directory = Path(directory)
+    return {
+        path.relative_to(directory).as_posix(): hashlib.sha256(path.read_bytes()).hexdigest()
+        for path in sorted(directory.rglob('*'))
+        if path.is_file() and path.name not in (CHECKSUMS, 'README.md')
+    }
+
+
+def read_checksums(directory):
+    """
+        The checksums recorded in `directory/SHA256SUMS`, in the format of `sha256sum`.
+    """
+    path = Path(directory) / CHECKSUMS
+    if not path.exists():
+        return {}
+    return {name: digest for digest, name in (line.split(None, 1) for line in path.read_text().splitlines() if line.strip())}
+
+
+def write_checksums(directory):
+    checksums = file_checksums(directory)
+    (Path(directory) / CHECKSUMS).write_text(''.join(f'{digest}  {name}\n' for name, digest in checksums.items()))
+    return checksums
@@ -1,6 +1,28 @@
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
+from perfil_users.groups import get_group_names
+from tasks.models import TaskSummary
+from tasks.summary import dashboard_rows
 
 class home(LoginRequiredMixin, TemplateView):
+    """
+    Home page: the applications the user can open and a summary of the tasks.
+
+    The counters come from the pre-aggregated `TaskSummary` table (a few rows per user), never from
+    `TimeEntry` itself.
+
+    Methods:
+        get_context_data:
+            - `summaries`: a list of `(title, rows)` with the tasks and estimated hours per status of the
+              logged-in user and, for members of the "tasks" group, of every user.
+    """
     login_url = "/login/"
     template_name = "home/home.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        summaries = [('Minhas tarefas', dashboard_rows(TaskSummary.objects.filter(user=self.request.user)))]
+        if 'tasks' in get_group_names(self.request.user):
+            summaries.append(('Tarefas de todos os usuários', dashboard_rows(TaskSummary.objects.all())))
+        context['summaries'] = summaries
+        return context
@@ -0,0 +1,80 @@
+"""
+    Authentication backend that loads the logged-in user from the Django cache.
+
+    `AuthenticationMiddleware` loads the user of the session on every request; with `CachedModelBackend`
+    that lookup hits the database only on a cache miss. Only the fields read by the views and templates
+    (`CACHED_FIELDS`) are cached, as a plain dict, together with the session hash of the user; the password
+    hash never leaves the database and the other fields are loaded on access, like `.only()`.
+
+    The cached user is dropped whenever the `CustomUser` is saved or deleted, which covers profile edits,
+    password changes and deactivation, and when the user logs out (see `perfil_users.signals`). Changes made
+    with `QuerySet.update()` skip the signals and are only seen once the entry expires (`USER_TIMEOUT`).
+
+    Django still checks the session hash against the one of the loaded user, so sessions are logged out
+    after a password change as with `ModelBackend`.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+
+from .models import CustomUser
+
+
+USER_TIMEOUT = 60 * 15
+
+CACHED_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_key(user_id):
+    return f'perfil_users:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_key(user_id))
+
+
+def dump_user(user):
+    return {
+        'fields': [getattr(user, name) for name in CACHED_FIELDS],
+        'session_auth_hash': user.get_session_auth_hash(),
+    }
+
+
+def load_user(data):
+    user = CustomUser.from_db(router.db_for_read(CustomUser), CACHED_FIELDS, data['fields'])
+    user.cached_session_auth_hash = data['session_auth_hash']
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+        `ModelBackend` whose `get_user` (used by the session middleware) reads the user from the cache.
+
+        Methods:
+            get_user: Returns the active user with `user_id`, caching it for `USER_TIMEOUT` seconds.
+            aget_user: Async version of `get_user`, used by `request.auser()`.
+    """
+
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        data = cache.get(key)
+        if data is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, dump_user(user), USER_TIMEOUT)
+        else:
+            user = load_user(data)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        key = user_key(user_id)
+        data = await cache.aget(key)
+        if data is None:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await cache.aset(key, dump_user(user), USER_TIMEOUT)
+        else:
+            user = load_user(data)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,51 @@
+"""
+    Cache of the group names of each user.
+
+    The names are computed once per request (kept on the user object) and shared across requests through
+    the Django cache. Entries are dropped when a user's groups change, and every entry is discarded at once
+    (by bumping a version number) when a group is renamed or deleted. See `perfil_users.signals`.
+"""
+import time
+
+from django.core.cache import cache
+
+
+VERSION_KEY = 'perfil_users:groups:version'
+GROUPS_TIMEOUT = 60 * 60
+
+
+def get_version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+
+
+def group_names_key(user_id):
+    return f'perfil_users:groups:{get_version()}:{user_id}'
+
+
+def get_group_names(user):
+    """
+        Returns the names of the groups of `user` as a frozenset, hitting the database only on a cache miss.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    names = getattr(user, '_group_names', None)
+    if names is None:
+        key = group_names_key(user.pk)
+        names = cache.get(key)
+        if names is None:
+            names = frozenset(user.groups.values_list('name', flat=True))
+            cache.set(key, names, GROUPS_TIMEOUT)
+        user._group_names = names
+    return names
+
+
+def invalidate_users(user_ids):
+    cache.delete_many([group_names_key(user_id) for user_id in user_ids])
+
+
+def invalidate_all():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # Serve the case-insensitive prefix search of the user autocomplete (`UPPER(username) LIKE 'ABC%'`).
+    # text_pattern_ops lets LIKE use the index whatever the database collation; PostgreSQL only.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE INDEX user_username_upper_prefix_idx ON perfil_users_customuser (UPPER(username) text_pattern_ops)")
+        schema_editor.execute("CREATE INDEX user_email_upper_prefix_idx ON perfil_users_customuser (UPPER(email) text_pattern_ops)")
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS user_username_upper_prefix_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS user_email_upper_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('perfil_users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
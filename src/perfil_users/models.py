@@ -54,3 +54,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+    def get_session_auth_hash(self):
+        """
+            Users loaded from the cache by `CachedModelBackend` carry their session hash instead of the
+            password, which is only loaded (and hashed) when accessed.
+        """
+        if 'password' not in self.__dict__ and hasattr(self, 'cached_session_auth_hash'):
+            return self.cached_session_auth_hash
+        return super().get_session_auth_hash()
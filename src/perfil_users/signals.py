@@ -1,12 +1,49 @@
 # seu_app/signals.py
 
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_migrate
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 from django.dispatch import receiver
 
+from .backends import invalidate_user
+from .groups import invalidate_all, invalidate_users
+from .models import CustomUser
+
 @receiver(post_migrate)
 def create_groups(sender, **kwargs):
     if sender.name == 'perfil_users':
         group_names = ['tasks', 'users', 'timeEntry', 'None']
         for name in group_names:
             Group.objects.get_or_create(name=name)
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def invalidate_group_membership(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_users([instance.pk])
+    elif pk_set:
+        invalidate_users(pk_set)
+    else:
+        # group.user_set.clear() doesn't say which users were removed.
+        invalidate_all()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_names(sender, created=False, **kwargs):
+    if not created:
+        invalidate_all()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, user, **kwargs):
+    if user is not None:
+        invalidate_user(user.pk)
@@ -0,0 +1,45 @@
+"""
+    Helpers shared by the test suites of the apps.
+"""
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase
+
+from .models import CustomUser
+
+
+PASSWORD = 'Senha@123'
+
+
+def create_user(username='tester', groups=(), **extra_fields):
+    """
+        Creates a user named `username`, with the e-mail `<username>@example.com` and `PASSWORD`, in the
+        groups named in `groups`.
+    """
+    user = CustomUser.objects.create_user(username, f'{username}@example.com', PASSWORD, **extra_fields)
+    if groups:
+        user.groups.add(*Group.objects.filter(name__in=groups))
+    return user
+
+
+class UserTestCase(TestCase):
+    """
+        `TestCase` whose `setUp` creates `self.user` and logs it into `self.client`.
+
+        The cache is cleared first: user ids are reused across tests, so group names and users cached by
+        an earlier test would otherwise leak into the next one.
+
+        Attributes:
+            groups: The names of the groups of the user.
+            user_fields: Extra fields of the user, e.g. `{'is_staff': True}`.
+            login: Whether the user is logged in.
+    """
+    groups = ()
+    user_fields = {}
+    login = True
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(groups=self.groups, **self.user_fields)
+        if self.login:
+            self.client.force_login(self.user)
@@ -1,3 +1,113 @@
-from django.test import TestCase
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from .backends import CachedModelBackend, user_key
+from .groups import get_group_names
+from .models import CustomUser
+from .testing import UserTestCase
+
+
+class GroupNamesCacheTest(UserTestCase):
+
+    groups = ('tasks',)
+    login = False
+
+    def fresh_user(self):
+        return CustomUser.objects.get(pk=self.user.pk)
+
+    def test_names_are_cached_across_requests(self):
+        self.assertEqual(get_group_names(self.fresh_user()), {'tasks'})
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_group_names(user), {'tasks'})
+
+    def test_membership_changes_invalidate(self):
+        get_group_names(self.fresh_user())
+
+        self.user.groups.add(Group.objects.get(name='users'))
+        self.assertEqual(get_group_names(self.fresh_user()), {'tasks', 'users'})
+
+        Group.objects.get(name='users').user_set.remove(self.user)
+        self.assertEqual(get_group_names(self.fresh_user()), {'tasks'})
+
+        Group.objects.get(name='tasks').user_set.clear()
+        self.assertEqual(get_group_names(self.fresh_user()), set())
+
+    def test_group_rename_invalidates(self):
+        get_group_names(self.fresh_user())
+
+        group = Group.objects.get(name='tasks')
+        group.name = 'tarefas'
+        group.save()
+        self.assertEqual(get_group_names(self.fresh_user()), {'tarefas'})
+
+    def test_views_and_navigation_do_not_query_groups_again(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('task_list'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('task_list'))
+        self.assertFalse([query for query in ctx.captured_queries if 'auth_group' in query['sql']])
+
+
+class CachedSessionAndUserTest(UserTestCase):
+    """
+        Once warm, an authenticated request reads neither the session nor the user from the database.
+    """
+
+    groups = ('tasks',)
+
+    def auth_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        tables = ('"django_session"', '"perfil_users_customuser"."password"')
+        return response, [query['sql'] for query in ctx.captured_queries if any(table in query['sql'] for table in tables)]
+
+    def test_warm_requests_do_not_load_session_or_user(self):
+        for name in ('home', 'task_list'):
+            self.client.get(reverse(name))
+            response, queries = self.auth_queries(reverse(name))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(queries, [])
+
+    def test_saving_the_user_drops_the_cached_copy(self):
+        self.client.get(reverse('home'))
+        self.user.first_name = 'Renomeado'
+        self.user.save()
+
+        response, queries = self.auth_queries(reverse('home'))
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.wsgi_request.user.first_name, 'Renomeado')
+
+    def test_password_change_and_deactivation_log_out(self):
+        self.client.get(reverse('home'))
+        self.user.set_password('Outra@456')
+        self.user.save()
+        self.assertFalse(self.client.get(reverse('home')).wsgi_request.user.is_authenticated)
+
+        self.client.login(username='tester@example.com', password='Outra@456')
+        self.client.get(reverse('home'))
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(self.client.get(reverse('home')).wsgi_request.user.is_authenticated)
+
+    def test_cache_holds_no_password_hash(self):
+        request = self.client.get(reverse('home')).wsgi_request
+        self.assertNotIn(self.user.password, repr(cache.get(user_key(self.user.pk))))
+
+        user = CachedModelBackend().get_user(self.user.pk)
+        self.assertEqual(user.get_deferred_fields(), {'password', 'last_login', 'position_id', 'phone', 'birth', 'description', 'date_joined'})
+        self.assertEqual(user.get_session_auth_hash(), request.user.get_session_auth_hash())
+        with self.assertNumQueries(1):
+            self.assertEqual(user.password, self.user.password)
+
+    def test_logout_drops_the_cached_copy(self):
+        self.client.get(reverse('home'))
+        self.assertIsNotNone(cache.get(user_key(self.user.pk)))
+
+        self.client.logout()
+        self.assertIsNone(cache.get(user_key(self.user.pk)))
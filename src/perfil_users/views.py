@@ -1,7 +1,7 @@
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from braces.views import GroupRequiredMixin
+from .mixins import GroupRequiredMixin
 from .models import CustomUser, Position
 from .forms import CustomUserForm, CustomUserUpdateForm, PositionForm, GroupForm
 from django.contrib.auth.models import Group
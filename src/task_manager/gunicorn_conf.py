@@ -0,0 +1,129 @@
+"""
+    Gunicorn configuration for production:
+
+        gunicorn task_manager.wsgi:application -c task_manager/gunicorn_conf.py
+
+    - the app is loaded once in the master (`preload_app`) and shared by the forked workers;
+    - workers are sized from the CPUs the container may use (its CPU affinity and cgroup quota, not the
+      host's CPU count), capped at MAX_DEFAULT_WORKERS; GUNICORN_WORKERS and GUNICORN_THREADS override them;
+    - every worker is recycled after GUNICORN_MAX_REQUESTS requests, plus a random jitter so that they don't
+      all restart at the same time;
+    - before accepting traffic each worker imports the URLconf, compiles the templates and checks that
+      the database can be reached, without keeping the connection (`task_manager.warmup`);
+    - the Prometheus metrics of all workers are kept in PROMETHEUS_MULTIPROC_DIR, emptied when the server
+      starts, so `/metrics` reports all of them (`task_manager.metrics`).
+
+    For the ASGI app (`task_manager.asgi:application`) set GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker;
+    threads are then ignored.
+
+    Connection budget: every worker thread keeps its own persistent connection (DB_CONN_MAX_AGE), so the
+    server opens up to workers × threads connections to Postgres; with DB_POOL=True it is workers × DB_POOL_SIZE.
+    Keep that, summed over every replica plus the cron jobs and the admin shells, under the `max_connections`
+    of the server (100 by default). With the defaults that is at most 8 × 2 = 16 connections per replica
+    (8 × 4 = 32 with the pool). The budget is logged when the server starts.
+"""
+import math
+import os
+import shutil
+
+
+def env_int(name, default):
+    value = os.getenv(name, '').strip()
+    return int(value) if value else default
+
+
+def env_bool(name, default):
+    value = os.getenv(name, '').strip().lower()
+    return value in ('1', 'true', 'yes') if value else default
+
+
+def available_cpus():
+    """
+        CPUs this process may run on: its affinity mask (`docker --cpuset-cpus`), lowered by the cgroup v2
+        quota (`docker --cpus`, Kubernetes CPU limits). `os.cpu_count()` would count the host's CPUs.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as file:
+            quota, period = file.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(math.ceil(int(quota) / int(period)), 1))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+# Each worker holds its own database connections (see the connection budget above).
+MAX_DEFAULT_WORKERS = 8
+
+
+def default_workers():
+    return min(available_cpus() * 2 + 1, MAX_DEFAULT_WORKERS)
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+# A template render holds the GIL, so extra processes help more than extra threads; threads
+# cover the time spent waiting on the database.
+workers = env_int('GUNICORN_WORKERS', default_workers())
+threads = env_int('GUNICORN_THREADS', 2)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread' if threads > 1 else 'sync')
+
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+# Must be set before the app (and prometheus_client) is imported.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/task-manager-metrics')
+
+
+def on_starting(server):
+    # Metrics files left by a previous run would be added to the new ones.
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+    pooled = os.getenv('DB_POOL') == 'True'
+    per_worker = env_int('DB_POOL_SIZE', 4) if pooled else (threads if worker_class == 'gthread' else 1)
+    server.log.info(
+        'Up to %s database connections: %s workers × %s %s',
+        workers * per_worker, workers, per_worker, 'pooled connections' if pooled else 'threads',
+    )
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def pre_fork(server, worker):
+    # A connection or pool opened in the master would be shared by every forked worker; drop them before forking.
+    if preload_app:
+        from django.db import connections
+        connections.close_all()
+        for connection in connections.all():
+            if getattr(connection, 'close_pool', None):
+                connection.close_pool()
+
+
+def post_worker_init(worker):
+    # Runs in the worker after the app is loaded and before it starts accepting connections.
+    from task_manager.warmup import warm_up
+    report = warm_up()
+    worker.log.info(
+        'Worker %s warmed up in %s ms (%s url names, %s templates, %s databases checked)',
+        worker.pid, report['elapsed_ms'], report['urls'], report['templates'], report['databases'],
+    )
@@ -0,0 +1,126 @@
+"""
+    Serving of the uploaded media (CKEditor images), only to logged-in users.
+
+    Django checks the permission and hands the file over to nginx with an `X-Accel-Redirect` to the
+    internal location MEDIA_ACCEL_REDIRECT (see `nginx/default.conf`), so the worker is free as soon
+    as the headers are sent and nginx does the sendfile, `Range` and `If-None-Match` handling.
+
+    Without nginx (runserver, or MEDIA_ACCEL_REDIRECT empty) the file is streamed by Django, with the
+    same `ETag` nginx would send and single-range requests.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.generic import View
+
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+CACHE_CONTROL = 'private, max-age=3600'
+
+
+def media_etag(stat):
+    # Same format as nginx (hex mtime and size), so both ways of serving agree.
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+        Parses a single-range `Range` header into `(start, end)`, both inclusive.
+
+        :return: returns None when the header should be ignored (malformed or several ranges)
+        :raises ValueError: when the range can't be satisfied
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        length = int(end)
+        if not length:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class MediaView(LoginRequiredMixin, View):
+    """
+        Serves the file `path` of MEDIA_ROOT to logged-in users.
+
+        Attributes:
+            raise_exception: Anonymous users get a 403 instead of a redirect; these are images, not pages.
+
+        Methods:
+            get: Answers 304 when the `ETag` matches, otherwise the file, through nginx when MEDIA_ACCEL_REDIRECT is set.
+    """
+    raise_exception = True
+    http_method_names = ['get', 'head']
+
+    def get(self, request, path):
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+            stat = os.stat(full_path)
+        except (SuspiciousFileOperation, OSError):
+            raise Http404(path)
+        if not os.path.isfile(full_path):
+            raise Http404(path)
+
+        etag = media_etag(stat)
+        response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+        if response is None:
+            if settings.MEDIA_ACCEL_REDIRECT:
+                response = self.accel_redirect(path)
+            else:
+                response = self.stream(request, full_path, stat.st_size, etag)
+            content_type, encoding = mimetypes.guess_type(full_path)
+            response['Content-Type'] = content_type or 'application/octet-stream'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    def accel_redirect(self, path):
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + quote(path)
+        return response
+
+    def stream(self, request, full_path, size, etag):
+        byte_range = None
+        if request.headers.get('Range') and request.headers.get('If-Range', etag) == etag:
+            try:
+                byte_range = parse_range(request.headers['Range'], size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        start, end = byte_range or (0, size - 1)
+        response = StreamingHttpResponse(read_range(full_path, start, end - start + 1), status=206 if byte_range else 200)
+        response['Content-Length'] = str(end - start + 1)
+        response['Accept-Ranges'] = 'bytes'
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return response
@@ -0,0 +1,210 @@
+"""
+    Per-request performance metrics, exposed for Prometheus on `/metrics`.
+
+    `MetricsMiddleware` records, labelled with the URL name of the view (`task_list`, `time_entry_list`, ...):
+
+        - `http_request_duration_seconds`: latency histogram, plus `http_requests_total` by status;
+        - `http_request_db_queries` and `http_request_db_seconds`: number of SQL queries and time spent in them;
+        - `http_request_template_seconds`: time spent rendering templates.
+
+    The database connection and pool metrics are recorded by `tasks.dbstats`.
+
+    Under gunicorn each worker is a separate process. `gunicorn_conf.py` sets PROMETHEUS_MULTIPROC_DIR,
+    so `prometheus_client` keeps the metrics of every worker in files in that directory and `/metrics`
+    sums them, whichever worker answers the scrape. Without it (runserver, tests) the metrics of the
+    current process are served. The fragment cache counters (`tasks.cache.fragment_stats`) live in the
+    shared cache and are read at scrape time.
+"""
+import hmac
+import os
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import Template
+from django.views.generic import View
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+REQUESTS = Counter('http_requests_total', 'Requests answered.', ['view', 'method', 'status'])
+LATENCY = Histogram('http_request_duration_seconds', 'Time to answer a request.', ['view', 'method'], buckets=LATENCY_BUCKETS)
+DB_QUERIES = Histogram('http_request_db_queries', 'SQL queries run by a request.', ['view'], buckets=QUERY_BUCKETS)
+DB_TIME = Histogram('http_request_db_seconds', 'Time a request spent in SQL queries.', ['view'], buckets=LATENCY_BUCKETS)
+TEMPLATE_TIME = Histogram('http_request_template_seconds', 'Time a request spent rendering templates.', ['view'], buckets=LATENCY_BUCKETS)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_seconds', 'template_seconds', 'rendering')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.rendering = 0
+
+
+def time_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def instrument_connections(**kwargs):
+    """
+        Installs `time_query` on the connections of the current thread, once. Connected to `request_started`,
+        which Django sends from the thread that runs the request's queries, also under ASGI (where the ORM
+        runs in `sync_to_async` threads, not in the thread of the event loop). Outside of a request
+        `time_query` does nothing.
+    """
+    for connection in connections.all():
+        if time_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(time_query)
+
+
+def instrument_templates():
+    """
+        Times `render()` of Django's template backend, used by `render`, `render_to_string` and
+        `TemplateResponse`. Only the outermost render of a request is counted, so nested ones (a
+        template rendered while rendering another) aren't counted twice.
+    """
+    if getattr(Template.render, 'instrumented', False):
+        return
+    render = Template.render
+
+    def timed_render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None or metrics.rendering:
+            return render(self, context, request)
+        metrics.rendering += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            metrics.rendering -= 1
+            metrics.template_seconds += time.perf_counter() - started
+
+    timed_render.instrumented = True
+    Template.render = timed_render
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match and match.view_name else '<unresolved>'
+
+
+class MetricsMiddleware:
+    """
+        Records the latency, SQL queries and template time of every request (see the module docstring).
+        Goes first in MIDDLEWARE, so the time of the other middlewares is included.
+
+        Both sync and async capable: under ASGI the request stays async down to the async views,
+        instead of Django adapting the whole chain to run in a single thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        instrument_templates()
+        request_started.connect(instrument_connections, dispatch_uid='task_manager.metrics')
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, metrics, elapsed):
+        view = view_name(request)
+        REQUESTS.labels(view, request.method, str(response.status_code)).inc()
+        LATENCY.labels(view, request.method).observe(elapsed)
+        DB_QUERIES.labels(view).observe(metrics.queries)
+        DB_TIME.labels(view).observe(metrics.db_seconds)
+        TEMPLATE_TIME.labels(view).observe(metrics.template_seconds)
+
+
+class FragmentCacheCollector:
+    """
+        Hit and miss counters of the cached list tables, read from the shared cache at scrape time.
+    """
+
+    def collect(self):
+        from tasks.cache import fragment_stats
+
+        family = CounterMetricFamily('fragment_cache_requests', 'Reads of the cached list tables.', labels=['fragment', 'outcome'])
+        for name, counters in fragment_stats().items():
+            for outcome, value in counters.items():
+                family.add_metric([name, outcome], value)
+        yield family
+
+
+class LocalCollector:
+    """
+        The metrics of this process (the default registry), used when there is no multiprocess directory.
+    """
+
+    def collect(self):
+        return REGISTRY.collect()
+
+
+def build_registry():
+    registry = CollectorRegistry()
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(LocalCollector())
+    registry.register(FragmentCacheCollector())
+    return registry
+
+
+class MetricsView(View):
+    """
+        Prometheus text exposition of the metrics.
+
+        Methods:
+            get: Open to staff users, and to scrapers sending `Authorization: Bearer <METRICS_TOKEN>` when that setting is set.
+    """
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        authorization = request.headers.get('Authorization', '')
+        if not (request.user.is_staff or token and hmac.compare_digest(authorization, f'Bearer {token}')):
+            return HttpResponseForbidden()
+        return HttpResponse(generate_latest(build_registry()), content_type=CONTENT_TYPE_LATEST)
@@ -52,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'task_manager.metrics.MetricsMiddleware',  # primeiro, para medir também os outros middlewares
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +64,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'task_manager.urls'
 
+# Métricas para o Prometheus em /metrics (ver task_manager/metrics.py): abertas para usuários staff
+# e para quem enviar o cabeçalho "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -92,6 +97,7 @@ APP_URLS = {
     ],
     "timeEntry": [
         ("Controle de tempo", "/tasks/time-entries/"),
+        ("Relatório de horas", "/tasks/time-entries/report/"),
     ],
      
 }
@@ -110,6 +116,14 @@ WSGI_APPLICATION = 'task_manager.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Conexões com o Postgres:
+# DB_CONN_MAX_AGE: segundos que uma conexão fica aberta entre requisições (0 = uma conexão por requisição).
+# DB_POOL=True: usa o pool do psycopg 3 no lugar das conexões persistentes, com no máximo DB_POOL_SIZE
+# conexões por worker do gunicorn (use pelo menos o número de threads) e espera de até DB_POOL_TIMEOUT
+# segundos por uma conexão livre. Nos dois casos a conexão é testada antes de ser reutilizada.
+# As métricas das conexões e do pool ficam em /metrics (tasks.dbstats).
+DB_POOL = os.getenv('DB_POOL') == "True"
+
 #condicional para rodar com docker ter os dados do banco 
 if os.getenv('DEBUG') == "False":
     DATABASES = {
@@ -120,6 +134,15 @@ if os.getenv('DEBUG') == "False":
         'PASSWORD': os.getenv('DATABASE_PASSWORD'),
         'HOST': 'db',
         'PORT': '5432',
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+                'max_size': int(os.getenv('DB_POOL_SIZE', 4)),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            },
+        } if DB_POOL else {},
     }
 }
 else:
@@ -132,6 +155,29 @@ else:
 
 
 
+# Cache
+# O backend é escolhido pela variável CACHE_BACKEND: redis, locmem, file ou db.
+# Em produção use redis (o padrão com DEBUG=False): o incr é atômico entre os workers do gunicorn.
+# Com file ou db dois workers podem perder incrementos dos contadores, e as chaves passam a ser descartadas
+# quando o cache chega a CACHE_MAX_ENTRIES (o que zera os contadores de acerto do cache de tabelas).
+# Para db, crie a tabela com `python manage.py createcachetable`.
+CACHE_BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://redis:6379/1'),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'task-manager'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', '/tmp/task-manager-cache'),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+}
+CACHE_BACKEND, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'locmem' if DEBUG else 'redis')]
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_DEFAULT_LOCATION),
+        # O Redis descarta chaves pela própria política de memória; as opções dele vão para o cliente.
+        'OPTIONS': {} if CACHE_BACKEND.endswith('RedisCache') else {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -167,9 +213,22 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = '/static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']  # static/vendor: CSS/JS/fontes de terceiros, com os arquivos no repositório
+
+# Em produção o collectstatic gera nomes com hash e cópias .gz/.br, servidas pelo nginx (ver task_manager/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'task_manager.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media/'
+# Location interna do nginx que entrega os arquivos de mídia depois que o Django confere o login
+# (ver task_manager/media.py). Vazio: o próprio Django envia o arquivo, como no runserver.
+MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', '' if DEBUG else '/protected-media/')
 
 
 # Default primary key field type
@@ -180,15 +239,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'perfil_users.CustomUser'
 
 AUTHENTICATION_BACKENDS = (
-    'django.contrib.auth.backends.ModelBackend',  # Certifique-se de ter esse backend padrão do Django
+    # ModelBackend com o usuário logado guardado no cache (ver perfil_users/backends.py)
+    'perfil_users.backends.CachedModelBackend',
 )
 
+# Sessões lidas do cache e gravadas também no banco, para sobreviverem a uma limpeza do cache
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 
 # CKEditor Settings
 CKEDITOR_UPLOAD_PATH = 'uploads/'
-CKEDITOR_IMAGE_BACKEND = "pillow"
+# Backend do Pillow que também gera versões menores e em WebP das imagens, fora da requisição (ver tasks/images.py)
+CKEDITOR_IMAGE_BACKEND = "tasks.images.VariantPillowBackend"
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 1))
 
-CKEDITOR_JQUERY_URL = '//ajax.googleapis.com/ajax/libs/jquery/2.1.1/jquery.min.js' 
+# jQuery vendorizado (ver home/vendor.py); o collectstatic mantém também o arquivo com o nome original
+CKEDITOR_JQUERY_URL = STATIC_URL + 'vendor/jquery-3.2.1/jquery.min.js'
 CKEDITOR_CONFIGS = {
     'default': {
         'toolbar': 'full',
@@ -0,0 +1,60 @@
+"""
+    Static files storage used in production: `ManifestStaticFilesStorage` (file names with a hash of their
+    content, so they can be cached forever) that also writes a gzip and, when the `brotli` package is
+    installed, a brotli copy of every text file during `collectstatic`.
+
+    nginx serves the `.gz` copies with `gzip_static` (and the `.br` ones with `brotli_static`, when built
+    with that module) straight from STATIC_ROOT, without compressing on each request; see `nginx/default.conf`.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSED_EXTENSIONS = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ttf', '.eot', '.otf')
+MIN_SIZE = 256
+
+
+def compressors():
+    yield '.gz', lambda content: gzip.compress(content, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda content: brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+        `ManifestStaticFilesStorage` that precompresses the collected files.
+
+        Both the original and the hashed name of each text file are compressed: templates use the hashed
+        names, but CKEditor loads its plugins by their original names. A compressed copy is only kept
+        when it is smaller than the file.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                names.update(n for n in (name, hashed_name) if n)
+            yield name, hashed_name, processed
+
+        if not dry_run:
+            for name in sorted(names):
+                if name.endswith(COMPRESSED_EXTENSIONS):
+                    self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            content = file.read()
+        if len(content) < MIN_SIZE:
+            return
+        for suffix, compress in compressors():
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                with open(path + suffix, 'wb') as file:
+                    file.write(compressed)
@@ -19,6 +19,8 @@ from django.urls import path, include
 from django.views.generic.base import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
+from task_manager.media import MediaView
+from task_manager.metrics import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,8 +29,8 @@ urlpatterns = [
     path('tasks/', include('tasks.urls')),
     path('', RedirectView.as_view(pattern_name='home', permanent=True)),
     path('ckeditor/', include('ckeditor_uploader.urls')),    
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:path>", MediaView.as_view(), name='media'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 if settings.DEBUG:
     urlpatterns+=static(settings.STATIC_URL,document_root=settings.STATIC_ROOT)
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
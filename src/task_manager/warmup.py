@@ -0,0 +1,104 @@
+"""
+    Warms a freshly started process up before it serves its first request.
+
+    Called by the `post_worker_init` hook of `gunicorn_conf.py`, once per worker, so that the first requests
+    a worker gets don't pay for importing the views and compiling the templates, and a database that can't be
+    reached shows up in the log before any request fails on it.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+
+logger = logging.getLogger(__name__)
+
+
+def project_template_dirs():
+    """
+        Template directories of the project itself (`settings.TEMPLATES` DIRS and the templates of our apps).
+        Third-party templates (admin, ckeditor) are left to be compiled on demand.
+    """
+    base_dir = str(settings.BASE_DIR)
+    dirs = [str(directory) for template in settings.TEMPLATES for directory in template.get('DIRS', [])]
+    dirs += [str(directory) for directory in get_app_template_dirs('templates')]
+    return [directory for directory in dirs if directory.startswith(base_dir) and os.path.isdir(directory)]
+
+
+def template_names():
+    for directory in project_template_dirs():
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if file.endswith(('.html', '.txt')):
+                    yield os.path.relpath(os.path.join(root, file), directory).replace(os.sep, '/')
+
+
+def compile_templates():
+    """
+        Loads every project template through each engine; with the cached template loader (the default
+        when DEBUG is False) the compiled templates stay in memory for the life of the worker.
+
+        :return: returns the number of templates compiled
+    """
+    compiled = 0
+    for name in sorted(set(template_names())):
+        for engine in engines.all():
+            try:
+                engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError):
+                logger.warning('warmup: could not compile template %s', name, exc_info=True)
+                continue
+            compiled += 1
+    return compiled
+
+
+def load_urlconf():
+    """
+        Imports the URLconf, and with it every view module, and builds the reverse lookup tables.
+    """
+    resolver = get_resolver()
+    resolver.url_patterns
+    return len(resolver.reverse_dict)
+
+
+def check_databases():
+    """
+        Connects to every database and closes the connection again. Django's connections belong to the
+        thread that opened them, so the request threads of a gthread worker would never reuse one opened
+        here; kept open, it would only add an idle connection per worker to the budget of `gunicorn_conf.py`.
+        With DB_POOL, closing returns the connection to the pool, which stays open for the requests.
+        A database that can't be reached is logged and left to the first request.
+    """
+    checked = 0
+    for alias in connections:
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+        except DatabaseError:
+            logger.warning('warmup: could not connect to database %s', alias, exc_info=True)
+            continue
+        finally:
+            connection.close()
+        checked += 1
+    return checked
+
+
+def warm_up():
+    """
+        Imports the URLconf, compiles the templates and checks the databases of the current process.
+
+        :return: returns a dict with what was warmed up and how long it took, in milliseconds
+    """
+    started = time.perf_counter()
+    report = {
+        'urls': load_urlconf(),
+        'templates': compile_templates(),
+        'databases': check_databases(),
+    }
+    report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return report
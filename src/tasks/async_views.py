@@ -0,0 +1,91 @@
+"""
+    Async counterparts of the read-heavy views, for deployments behind an ASGI server
+    (e.g. `gunicorn task_manager.asgi:application -k uvicorn.workers.UvicornWorker`).
+
+    Each view subclasses its sync version, so querysets, filters, keyset pagination, cached fragments and
+    templates are shared, and only the I/O is awaited: rows are fetched with the async ORM and the cache
+    with its async API. Steps that are still sync in Django (form validation against the database,
+    template rendering with context processors) run through `sync_to_async`.
+
+    Django's async ORM still runs each query in a worker thread (the database drivers are sync), so the gain
+    is in how many slow requests a worker can hold open at once rather than in the latency of a single one.
+    Under WSGI these views work too, but gain nothing; compare both stacks with `benchmarks/http_load.py`.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from perfil_users.mixins import AsyncGroupRequiredMixin
+
+from .cache import aget_or_build_chart, aget_or_render_fragment
+from .views import TaskChartDataView, TaskLisView, TimeEntryListView, task_rows
+
+
+class AsyncFragmentMixin:
+    """
+        Async `get` of `CachedFragmentMixin`: on a miss, `get_fragment_context_data` fetches the rows
+        of the table with the async ORM.
+    """
+    http_method_names = ['get']
+
+    async def get_fragment_context_data(self, queryset):
+        paginator, page, rows, is_paginated = await self.apaginate_queryset(queryset, self.paginate_by)
+        return {
+            'view': self,
+            self.context_object_name: rows,
+            'object_list': rows,
+            'page_obj': page,
+            'is_paginated': is_paginated,
+        }
+
+    async def render_fragment(self):
+        queryset = await sync_to_async(self.get_queryset)()
+        context = await self.get_fragment_context_data(queryset)
+        return await sync_to_async(render_to_string)(self.fragment_template_name, context, self.request)
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = None
+        fragment = await aget_or_render_fragment(self.fragment_name, request, self.render_fragment)
+        return self.render_to_response(self.get_page_context_data(view=self, table_fragment=fragment))
+
+
+class AsyncTaskListView(AsyncGroupRequiredMixin, AsyncFragmentMixin, TaskLisView):
+    """
+        Async version of `TaskLisView` (read only; status changes go through `TaskStatusUpdateView`).
+    """
+
+    async def get_fragment_context_data(self, queryset):
+        context = await super().get_fragment_context_data(queryset)
+        context['tasks_with_time'] = task_rows(context['tasks'])
+        return context
+
+
+class AsyncTimeEntryListView(AsyncGroupRequiredMixin, AsyncFragmentMixin, TimeEntryListView):
+    """
+        Async version of `TimeEntryListView`. The filters are validated in a thread, since the user and task
+        choices are looked up in the database; the page and the total are fetched with the async ORM.
+    """
+
+    async def get_fragment_context_data(self, queryset):
+        context = await super().get_fragment_context_data(queryset)
+        context['total_estimated_hours'] = await queryset.atotal_estimated_hours()
+        return context
+
+
+class AsyncTaskChartDataView(AsyncGroupRequiredMixin, TaskChartDataView):
+    """
+        Async version of `TaskChartDataView`, streaming the grouped rows with `aiterator`.
+    """
+    http_method_names = ['get']
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            group_by, limit = self.get_params(request)
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+
+        data = await aget_or_build_chart(group_by, limit, lambda: self.abuild_chart(group_by, limit))
+        return JsonResponse(data)
+
+    async def abuild_chart(self, group_by, limit):
+        rows = [row async for row in self.chart_rows(group_by, limit).aiterator()]
+        return self.chart_data(group_by, rows)
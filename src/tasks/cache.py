@@ -0,0 +1,165 @@
+"""
+    Caching helpers for data derived from tasks and time entries.
+
+    Every cached value is keyed with a generation number. Saving or deleting a `Task` or a `TimeEntry`
+    bumps the generation once the transaction commits (see `tasks.signals`), so all previously cached
+    values stop being read at once and simply expire from the cache.
+
+    The cache backend is the `default` one, chosen with the `CACHE_BACKEND` environment variable
+    (see `settings.CACHES`). With more than one worker it must be shared so that every worker sees the
+    generation bumps: Redis in production, whose `incr` is atomic. The file and database backends lose
+    concurrent increments of the hit and miss counters, and cull keys once they hold `MAX_ENTRIES`.
+"""
+import hashlib
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from perfil_users.groups import get_group_names
+
+
+GENERATION_KEY = 'tasks:generation'
+CHART_TIMEOUT = 60 * 10
+FRAGMENT_TIMEOUT = 60 * 5
+FRAGMENT_NAMES = ('task_table', 'time_entry_table')
+
+
+def get_generation():
+    # Taken from the clock, so that a generation recreated after the key is evicted is never an old one.
+    return cache.get_or_set(GENERATION_KEY, time.time_ns, timeout=None)
+
+
+async def aget_generation():
+    return await cache.aget_or_set(GENERATION_KEY, time.time_ns, timeout=None)
+
+
+def bump_generation():
+    # A single write of a fresh value: unlike get-and-set increments (the file and database backends),
+    # concurrent bumps can't be lost, and an evicted key doesn't restart from a used generation.
+    cache.set(GENERATION_KEY, max(time.time_ns(), (cache.get(GENERATION_KEY) or 0) + 1), timeout=None)
+
+
+def bump_generation_on_commit(using=None):
+    """
+        Bumps the generation when the current transaction commits (right away outside of one). Bumped
+        earlier, another request could cache what it reads before the commit under the new generation.
+    """
+    transaction.on_commit(bump_generation, using=using)
+
+
+def chart_cache_key(group_by, limit, generation=None):
+    if generation is None:
+        generation = get_generation()
+    return f'tasks:chart:{group_by}:{limit}:{generation}'
+
+
+def get_or_build_chart(group_by, limit, build):
+    """
+        Returns the chart data for `group_by`, calling `build()` only when it's not cached for the current generation.
+    """
+    return cache.get_or_set(chart_cache_key(group_by, limit), build, timeout=CHART_TIMEOUT)
+
+
+async def aget_or_build_chart(group_by, limit, build):
+    """
+        Async version of `get_or_build_chart`, where `build` is a coroutine function.
+    """
+    key = chart_cache_key(group_by, limit, await aget_generation())
+    data = await cache.aget(key)
+    if data is None:
+        data = await build()
+        await cache.aset(key, data, timeout=CHART_TIMEOUT)
+    return data
+
+
+def fragment_cache_key(name, request):
+    """
+        Key of a rendered fragment: the querystring (filters and cursor) and the viewer's groups,
+        under the current generation.
+    """
+    vary = [sorted(request.GET.lists()), sorted(get_group_names(request.user))]
+    digest = hashlib.md5(json.dumps(vary).encode(), usedforsecurity=False).hexdigest()
+    return f'tasks:fragment:{name}:{get_generation()}:{digest}'
+
+
+def count_fragment_access(name, outcome):
+    key = f'tasks:fragment-stats:{name}:{outcome}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def fragment_stats():
+    """
+        Returns the hit and miss counters of every fragment, e.g. `{"task_table": {"hits": 10, "misses": 2}}`.
+    """
+    keys = {(name, outcome): f'tasks:fragment-stats:{name}:{outcome}' for name in FRAGMENT_NAMES for outcome in ('hits', 'misses')}
+    values = cache.get_many(keys.values())
+    return {name: {outcome: values.get(keys[name, outcome], 0) for outcome in ('hits', 'misses')} for name in FRAGMENT_NAMES}
+
+
+def get_or_render_fragment(name, request, render):
+    """
+        Returns the HTML of fragment `name` for `request`, calling `render()` only on a cache miss.
+    """
+    key = fragment_cache_key(name, request)
+    html = cache.get(key)
+    if html is None:
+        count_fragment_access(name, 'misses')
+        html = render()
+        cache.set(key, html, FRAGMENT_TIMEOUT)
+    else:
+        count_fragment_access(name, 'hits')
+    return mark_safe(html)
+
+
+async def aget_or_render_fragment(name, request, render):
+    """
+        Async version of `get_or_render_fragment`, where `render` is a coroutine function.
+    """
+    # The key needs the viewer's group names, which may come from the database.
+    key = await sync_to_async(fragment_cache_key)(name, request)
+    html = await cache.aget(key)
+    if html is None:
+        await sync_to_async(count_fragment_access)(name, 'misses')
+        html = await render()
+        await cache.aset(key, html, FRAGMENT_TIMEOUT)
+    else:
+        await sync_to_async(count_fragment_access)(name, 'hits')
+    return mark_safe(html)
+
+
+class CachedFragmentMixin:
+    """
+        Mixin for `ListView` that caches the rendered table (rows and pagination) of the list.
+
+        On a hit neither the list query nor the table rendering runs: the page is rendered around the cached
+        HTML, available in the template as `table_fragment`.
+
+        Attributes:
+            fragment_name: The name of the fragment, used in the cache key and in the hit/miss counters.
+            fragment_template_name: The template of the table; it receives the regular `ListView` context.
+
+        Methods:
+            get_page_context_data: The context the page needs besides the table (e.g. the filter form).
+    """
+    fragment_name = None
+    fragment_template_name = None
+
+    def get_page_context_data(self, **kwargs):
+        return kwargs
+
+    def render_fragment(self):
+        self.object_list = self.get_queryset()
+        return render_to_string(self.fragment_template_name, self.get_context_data(), self.request)
+
+    def get(self, request, *args, **kwargs):
+        self.object_list = None  # only loaded on a cache miss, by render_fragment
+        fragment = get_or_render_fragment(self.fragment_name, request, self.render_fragment)
+        return self.render_to_response(self.get_page_context_data(view=self, table_fragment=fragment))
@@ -0,0 +1,68 @@
+"""
+    Prometheus metrics of the database connections, served with the others on `/metrics` (`task_manager.metrics`).
+
+        - `db_connections_opened_total`: connections opened per database; compared with `http_requests_total`
+          it shows how well persistent connections (`CONN_MAX_AGE`) are being reused;
+        - when the Postgres pool is enabled (`DB_POOL`), `db_pool_connections` (by state, `in_use` or
+          `available`), `db_pool_max_connections` and `db_pool_waiting_requests`, summed over the live
+          workers, and the counters `db_pool_checkouts_total`, `db_pool_checkouts_queued_total`,
+          `db_pool_checkout_wait_seconds_total`, `db_pool_checkout_errors_total` and `db_pool_connections_lost_total`.
+
+    The pool lives in each gunicorn worker, so every worker copies its pool's statistics into the metrics
+    when it finishes a request, and the multiprocess registry adds them up. E.g. the saturation is
+    `sum(db_pool_connections{state="in_use"}) / sum(db_pool_max_connections)` and the average checkout wait
+    `rate(db_pool_checkout_wait_seconds_total[5m]) / rate(db_pool_checkouts_queued_total[5m])`.
+"""
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from prometheus_client import Counter, Gauge
+
+
+CONNECTIONS_OPENED = Counter('db_connections_opened_total', 'Database connections opened.', ['database'])
+
+POOL_CONNECTIONS = Gauge('db_pool_connections', 'Connections of the pool.', ['database', 'state'], multiprocess_mode='livesum')
+POOL_MAX = Gauge('db_pool_max_connections', 'Maximum size of the pool.', ['database'], multiprocess_mode='livesum')
+POOL_WAITING = Gauge('db_pool_waiting_requests', 'Requests waiting for a free connection.', ['database'], multiprocess_mode='livesum')
+POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Connections taken from the pool.', ['database'])
+POOL_QUEUED = Counter('db_pool_checkouts_queued_total', 'Checkouts that had to wait for a free connection.', ['database'])
+POOL_WAIT = Counter('db_pool_checkout_wait_seconds_total', 'Time checkouts waited for a free connection.', ['database'])
+POOL_ERRORS = Counter('db_pool_checkout_errors_total', 'Checkouts that failed (e.g. timed out).', ['database'])
+POOL_LOST = Counter('db_pool_connections_lost_total', 'Pool connections found broken.', ['database'])
+
+
+@receiver(connection_created, dispatch_uid='tasks.dbstats.count_connection')
+def count_connection(sender, connection, **kwargs):
+    CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+def get_pool(connection):
+    # `connection.pool` would create the pool when it doesn't exist yet; only look at an existing one.
+    return getattr(connection, '_connection_pools', {}).get(connection.alias)
+
+
+def record_pool_stats(alias, pool):
+    """
+        Copies the statistics of a `psycopg_pool.ConnectionPool` into the metrics. `pop_stats()` resets the
+        pool's counters, so each call adds what happened since the previous one.
+    """
+    stats = pool.pop_stats()
+    size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+    POOL_CONNECTIONS.labels(alias, 'in_use').set(size - available)
+    POOL_CONNECTIONS.labels(alias, 'available').set(available)
+    POOL_MAX.labels(alias).set(stats.get('pool_max', 0))
+    POOL_WAITING.labels(alias).set(stats.get('requests_waiting', 0))
+    POOL_CHECKOUTS.labels(alias).inc(stats.get('requests_num', 0))
+    POOL_QUEUED.labels(alias).inc(stats.get('requests_queued', 0))
+    POOL_WAIT.labels(alias).inc(stats.get('requests_wait_ms', 0) / 1000)
+    POOL_ERRORS.labels(alias).inc(stats.get('requests_errors', 0))
+    POOL_LOST.labels(alias).inc(stats.get('connections_lost', 0))
+
+
+@receiver(request_finished, dispatch_uid='tasks.dbstats.record_pools')
+def record_pools(sender, **kwargs):
+    for alias in connections:
+        pool = get_pool(connections[alias])
+        if pool is not None:
+            record_pool_stats(alias, pool)
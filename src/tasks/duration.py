@@ -0,0 +1,77 @@
+"""
+    Parser for the free-form time estimates stored in `TimeEntry.estimated_time`
+    (e.g., `1w 3d 2h 45m`, `3h 30m`, `45m`, `1d`).
+
+    A week counts as 44 working hours and a day as 8 working hours.
+"""
+import re
+from functools import lru_cache
+
+
+MINUTES_PER_HOUR = 60
+MINUTES_PER_DAY = 8 * MINUTES_PER_HOUR
+MINUTES_PER_WEEK = 44 * MINUTES_PER_HOUR
+
+ESTIMATE_PATTERN = re.compile(r'(?:(\d+)w)?\s*(?:(\d+)d)?\s*(?:(\d+)h)?\s*(?:(\d+)m)?')
+
+
+@lru_cache(maxsize=4096)
+def parse_minutes(value):
+    """
+        Converts an estimate into whole minutes.
+
+        Results are memoized, since the same handful of estimates ("2h", "1d") repeat across most entries.
+
+        :return: returns the estimate in minutes, or 0 when the value can't be parsed
+    """
+    match = ESTIMATE_PATTERN.search(value or '')
+
+    if not match:
+        return 0
+
+    weeks, days, hours, minutes = (int(group) if group else 0 for group in match.groups())
+    return weeks * MINUTES_PER_WEEK + days * MINUTES_PER_DAY + hours * MINUTES_PER_HOUR + minutes
+
+
+def minutes_to_hours(minutes):
+    """
+        Converts a number of minutes into hours rounded to two decimal places.
+    """
+    return round((minutes or 0) / MINUTES_PER_HOUR, 2)
+
+
+def parse_hours(value):
+    """
+        Converts an estimate into hours rounded to two decimal places.
+    """
+    return minutes_to_hours(parse_minutes(value))
+
+
+def parse_minutes_array(values):
+    """
+        Converts a whole column of estimates into a NumPy array of minutes in one call.
+
+        Each distinct string is parsed only once: the column is reduced with `numpy.unique`
+        and the parsed values are scattered back through the inverse index.
+
+        :param values: any iterable of estimate strings (None is treated as an empty estimate)
+        :return: returns an `int64` array aligned with `values`
+    """
+    import numpy as np
+
+    column = np.asarray([value or '' for value in values], dtype=str)
+    if not column.size:
+        return np.zeros(0, dtype=np.int64)
+
+    distinct, inverse = np.unique(column, return_inverse=True)
+    parsed = np.fromiter((parse_minutes(str(value)) for value in distinct), dtype=np.int64, count=distinct.size)
+    return parsed[inverse.reshape(-1)]
+
+
+def parse_hours_array(values):
+    """
+        Same as `parse_minutes_array`, but returns a `float64` array of hours rounded to two decimal places.
+    """
+    import numpy as np
+
+    return np.round(parse_minutes_array(values) / MINUTES_PER_HOUR, 2)
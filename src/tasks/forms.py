@@ -1,10 +1,23 @@
 from django import forms
 from django.forms.models import inlineformset_factory
-from .models import Task, TimeEntry
+from .models import Task, TimeEntry, TimeRollup
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from perfil_users.models import CustomUser
+from .rollups import period_start
+from .images import responsive_images
+from .search import search_time_entries
+from .widgets import AutocompleteSelect
 
-class TimeEntryForm(forms.ModelForm):
+class ResponsiveImagesMixin:
+    """
+        Points the uploaded images of the description to their downscaled WebP variants (see `tasks.images`).
+    """
+
+    def clean_description(self):
+        return responsive_images(self.cleaned_data.get('description'))
+
+
+class TimeEntryForm(ResponsiveImagesMixin, forms.ModelForm):
     """
         Form for creating and updating time entries associated with tasks.
 
@@ -38,7 +51,7 @@ class TimeEntryForm(forms.ModelForm):
             field.widget.attrs.update({'class': 'form-control col-lg-6'})  
 
 
-class TaskForm(forms.ModelForm):
+class TaskForm(ResponsiveImagesMixin, forms.ModelForm):
     """
         Form for creating and updating tasks in the system.
 
@@ -46,6 +59,7 @@ class TaskForm(forms.ModelForm):
             model: The Django model `Task`, representing the task entity being created or updated.
             fields: The fields from the `Task` model that will be included in the form.
             description: A custom field for the task's description that utilizes a rich text editor for enhanced formatting.
+            widgets: The user is picked with an autocomplete, so the form doesn't render every user.
 
         Methods:
             __init__:
@@ -61,6 +75,9 @@ class TaskForm(forms.ModelForm):
     class Meta:
         model = Task
         fields = '__all__'
+        widgets = {
+            'user': AutocompleteSelect('user_autocomplete'),
+        }
        
     def __init__(self, *args, **kwargs):
         super(TaskForm, self).__init__(*args, **kwargs)
@@ -88,12 +105,17 @@ class TimeEntryFilterForm(forms.Form):
             status: A choice field for selecting the status of the time entries from predefined options.
             user: A model choice field for selecting a user from the `CustomUser` model associated with the entries.
             task: A model choice field for selecting a task from the `Task` model associated with the entries.
+            The user and task are picked with autocompletes, which only load the selected rows.
 
         Methods:
             __init__:
                 - Initializes the form and applies specific attributes to each field for consistent styling.
                 - Updates each field's widget attributes to include a Bootstrap class for styling.
 
+            filter_queryset:
+                - Applies the cleaned filters to a `TimeEntry` queryset. Shared by every view that lists entries,
+                  so they all filter exactly the same way.
+
         Expected Output:
             - Renders a form for filtering time entries based on specified criteria, such as date range, status, and user.
             - Ensures that the form fields are styled with Bootstrap classes for a consistent and responsive design.
@@ -104,8 +126,8 @@ class TimeEntryFilterForm(forms.Form):
     estimated_time = forms.CharField(label='Estimativas de tempo' ,required=False)
     description = forms.CharField(label='descrição' ,required=False)
     status = forms.ChoiceField(label='status' ,choices=TimeEntry.STATUS_CHOICES, required=False)
-    user = forms.ModelChoiceField(label='Usuário' ,queryset=CustomUser.objects.all(), required=False)
-    task = forms.ModelChoiceField(label='Tarefa' ,queryset=Task.objects.all(), required=False)
+    user = forms.ModelChoiceField(label='Usuário' ,queryset=CustomUser.objects.all(), required=False, widget=AutocompleteSelect('user_autocomplete'))
+    task = forms.ModelChoiceField(label='Tarefa' ,queryset=Task.objects.all(), required=False, widget=AutocompleteSelect('task_autocomplete'))
     
 
     def __init__(self, *args, **kwargs):
@@ -116,5 +138,70 @@ class TimeEntryFilterForm(forms.Form):
     def clean(self):
         cleaned_data = super().clean()
         return cleaned_data
-    
-    
\ No newline at end of file
+
+    def filter_queryset(self, queryset):
+        date_from = self.cleaned_data.get('date_from')
+        date_to = self.cleaned_data.get('date_to')
+
+        if date_from:
+            queryset = queryset.filter(date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(date__lte=date_to)
+        estimated_time = self.cleaned_data.get('estimated_time')
+        if estimated_time:
+            queryset = queryset.filter(estimated_time=estimated_time)
+        description = self.cleaned_data.get('description')
+        if description:
+            queryset = search_time_entries(queryset, description)
+        status = self.cleaned_data.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        user = self.cleaned_data.get('user')
+        if user:
+            queryset = queryset.filter(task__user=user)
+        task = self.cleaned_data.get('task')
+        if task:
+            queryset = queryset.filter(task=task)
+
+        return queryset
+
+
+class TimeRollupFilterForm(forms.Form):
+    """
+        Form for filtering the weekly and monthly estimated-hour rollups.
+
+        Attributes:
+            period: Whether the report lists weeks or months (weeks when empty).
+            date_from: Lists the periods from the one that contains this date.
+            date_to: Lists the periods that start up to this date.
+            user: A model choice field for selecting a user from the `CustomUser` model, with an autocomplete.
+
+        Methods:
+            filter_queryset:
+                - Applies the cleaned filters to a `TimeRollup` queryset.
+    """
+    period = forms.ChoiceField(label='Período', choices=TimeRollup.PERIOD_CHOICES, required=False)
+    date_from = forms.DateField(label='Data inicial', required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(label='Data final', required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    user = forms.ModelChoiceField(label='Usuário', queryset=CustomUser.objects.all(), required=False, widget=AutocompleteSelect('user_autocomplete'))
+
+    def __init__(self, *args, **kwargs):
+        super(TimeRollupFilterForm, self).__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs.update({'class': 'form-control col-lg-6 center'})
+
+    def filter_queryset(self, queryset):
+        period = self.cleaned_data.get('period') or TimeRollup.WEEK
+        queryset = queryset.filter(period=period)
+
+        date_from = self.cleaned_data.get('date_from')
+        if date_from:
+            queryset = queryset.filter(start__gte=period_start(period, date_from))
+        date_to = self.cleaned_data.get('date_to')
+        if date_to:
+            queryset = queryset.filter(start__lte=date_to)
+        user = self.cleaned_data.get('user')
+        if user:
+            queryset = queryset.filter(user=user)
+
+        return queryset
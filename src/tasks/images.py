@@ -0,0 +1,250 @@
+"""
+    Downscaled and WebP variants of the images uploaded through CKEditor.
+
+    For an upload `uploads/2024/10/01/print.png`, `generate_variants` writes next to it:
+
+        - `print.png.webp`: the full-size image as WebP;
+        - `print.png.w480.webp`, `print.png.w960.webp`, ...: WebP copies narrower than the image, one per
+          `VARIANT_WIDTHS`, plus the same sizes in the original format (`print.png.w480.png`, ...).
+
+    Uploads are processed outside the request: `VariantPillowBackend` (the CKEditor image backend) hands
+    every saved image to a process pool. `responsive_images` then points the `<img>` tags of a description
+    to the smallest WebP variant that is still sharp at the displayed width. The task and time entry forms
+    apply it on save; a description saved before the variants of its images were ready is rewritten when
+    they are (`rewrite_references`), and `backfill_image_variants` applies it to what is already stored.
+"""
+import logging
+import multiprocessing
+import posixpath
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from io import BytesIO
+from itertools import islice
+
+from ckeditor_uploader.backends import PillowBackend
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connections
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (480, 960, 1920)
+WEBP_QUALITY = 80
+# Pick a variant sharp enough for screens with this pixel density.
+PIXEL_DENSITY = 2
+FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.gif': 'GIF', '.webp': 'WEBP'}
+
+IMG_TAG = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+SRC = re.compile(r'''(\bsrc\s*=\s*)(["'])(.*?)\2''', re.IGNORECASE)
+WIDTH = re.compile(r'''\bwidth\s*=\s*["']?(\d+)|\bwidth\s*:\s*(\d+)px''', re.IGNORECASE)
+VARIANT = re.compile(r'^(.+\.(?:jpe?g|png|gif|webp))(?:\.w\d+)?\.(?:jpe?g|png|gif|webp)$', re.IGNORECASE)
+
+_executor = None
+
+
+def variant_name(name, width=None, extension='.webp'):
+    return f'{name}.w{width}{extension}' if width else f'{name}{extension}'
+
+
+def original_name(name):
+    """
+        Name of the upload a variant was generated from (the name itself when it isn't a variant).
+    """
+    match = VARIANT.match(name)
+    return match.group(1) if match else name
+
+
+def is_variant(name):
+    return original_name(name) != name
+
+
+def encode(image, format):
+    output = BytesIO()
+    if format == 'WEBP':
+        image.save(output, format='WEBP', quality=WEBP_QUALITY, method=4)
+    elif format == 'JPEG':
+        image.convert('RGB').save(output, format='JPEG', quality=85, optimize=True, progressive=True)
+    else:
+        image.save(output, format=format, optimize=True)
+    return output.getvalue()
+
+
+def save(name, content):
+    default_storage.delete(name)
+    default_storage.save(name, ContentFile(content))
+
+
+def generate_variants(name):
+    """
+        Writes the WebP and downscaled variants of the upload `name` (a path in the default storage).
+        Runs in a worker of the process pool.
+
+        :return: returns the names written; nothing for variants, animations and files Pillow can't read
+    """
+    extension = posixpath.splitext(name)[1].lower()
+    if extension not in FORMATS or is_variant(name):
+        return []
+    try:
+        with default_storage.open(name) as file:
+            image = Image.open(file)
+            image.load()
+    except (OSError, Image.DecompressionBombError):
+        logger.warning('Could not read image %s', name, exc_info=True)
+        return []
+    if getattr(image, 'is_animated', False):
+        return []
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    written = []
+    if extension != '.webp':
+        save(variant_name(name), encode(image, 'WEBP'))
+        written.append(variant_name(name))
+    for width in VARIANT_WIDTHS:
+        if width >= image.width:
+            break
+        resized = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+        for variant_extension, format in (('.webp', 'WEBP'), (extension, FORMATS[extension])):
+            save(variant_name(name, width, variant_extension), encode(resized, format))
+            written.append(variant_name(name, width, variant_extension))
+            if extension == '.webp':
+                break
+    return written
+
+
+def get_executor():
+    """
+        The process pool of this process, started on first use. Workers are spawned rather than forked,
+        so they don't inherit the threads and database connections of the web worker.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_VARIANT_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+        )
+    return _executor
+
+
+def variants_ready(name, future):
+    """
+        Done callback of the variants of `name`. The descriptions are rewritten in a thread of their own:
+        the callback runs in the pool's management thread, or in the request's if the job already finished.
+    """
+    if future.exception() is not None:
+        logger.error('Image variants failed', exc_info=future.exception())
+    elif future.result():
+        threading.Thread(target=rewrite_in_background, args=(name,), daemon=True).start()
+
+
+def rewrite_in_background(name):
+    try:
+        rewrite_references(name)
+    except DatabaseError:
+        logger.exception('Could not point descriptions to the variants of %s', name)
+    finally:
+        # Connections are per thread, and this one ends here.
+        connections.close_all()
+
+
+def schedule_variants(name):
+    """
+        Generates the variants of `name` in the process pool, without waiting for them; the descriptions
+        already saved with the image are pointed to its variants once they're written.
+    """
+    global _executor
+    try:
+        future = get_executor().submit(generate_variants, name)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a new pool.
+        _executor = None
+        future = get_executor().submit(generate_variants, name)
+    future.add_done_callback(partial(variants_ready, name))
+    return future
+
+
+class VariantPillowBackend(PillowBackend):
+    """
+        CKEditor's Pillow backend (thumbnail for the file browser) that also schedules the variants of each image.
+    """
+
+    def save_as(self, filepath):
+        saved_path = super().save_as(filepath)
+        if self.is_image:
+            schedule_variants(saved_path)
+        return saved_path
+
+
+def best_variant(name, display_width):
+    """
+        Name of the smallest existing WebP variant of `name` at least `display_width` * `PIXEL_DENSITY`
+        pixels wide, else of the full-size WebP; None when there's no such variant (yet).
+    """
+    if display_width:
+        for width in VARIANT_WIDTHS:
+            if width >= display_width * PIXEL_DENSITY and default_storage.exists(variant_name(name, width)):
+                return variant_name(name, width)
+    if not name.lower().endswith('.webp') and default_storage.exists(variant_name(name)):
+        return variant_name(name)
+    return None
+
+
+def responsive_images(value):
+    """
+        Points every uploaded image of the HTML `value` to its best variant for the width it's displayed at
+        (the `width` attribute or style CKEditor writes); images without variants are left untouched.
+    """
+    if not value or '<img' not in value.lower():
+        return value
+    prefix = settings.MEDIA_URL + settings.CKEDITOR_UPLOAD_PATH
+
+    def replace_tag(match):
+        tag = match.group(0)
+        src = SRC.search(tag)
+        if not src or not src.group(3).startswith(prefix):
+            return tag
+        name = original_name(src.group(3)[len(settings.MEDIA_URL):])
+        width = WIDTH.search(tag)
+        display_width = int(width.group(1) or width.group(2)) if width else None
+        url = settings.MEDIA_URL + (best_variant(name, display_width) or name)
+        return tag[:src.start(3)] + url + tag[src.end(3):]
+
+    return IMG_TAG.sub(replace_tag, value)
+
+
+def rewrite_descriptions(model, contains='<img', batch_size=500):
+    """
+        Applies `responsive_images` to the descriptions of `model` that contain `contains`, in batches.
+        Only `description` is written: the excerpt and the search document are plain text, which images
+        don't change.
+
+        :return: returns the number of rows updated
+    """
+    rows = model.objects.filter(description__icontains=contains).only('id', 'description').order_by('id').iterator(chunk_size=batch_size)
+    updated = 0
+    while batch := list(islice(rows, batch_size)):
+        changed = []
+        for obj in batch:
+            description = responsive_images(obj.description)
+            if description != obj.description:
+                obj.description = description
+                changed.append(obj)
+        if changed:
+            updated += model.objects.bulk_update(changed, ['description'])
+    return updated
+
+
+def rewrite_references(name):
+    """
+        Points the task and time entry descriptions that show the upload `name` to its variants.
+    """
+    # Imported here: the pool's workers import this module without setting Django up.
+    from .models import Task, TimeEntry
+
+    return sum(rewrite_descriptions(model, contains=settings.MEDIA_URL + name) for model in (Task, TimeEntry))
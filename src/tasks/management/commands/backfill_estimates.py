@@ -0,0 +1,50 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from tasks.models import TimeEntry
+from tasks.duration import parse_minutes_array
+from tasks.signals import time_entries_changed
+from tasks.summary import task_states
+
+
+class Command(BaseCommand):
+    """
+        Recomputes `TimeEntry.estimated_minutes` from the free-form `estimated_time` text.
+
+        Rows are read in chunks with a server-side cursor, each chunk is parsed in one call with
+        `parse_minutes_array`, and only the entries whose stored value is out of date are written
+        back with `bulk_update`. Their `updated_at` is bumped as well, so the next `refresh_rollups`
+        picks up the new estimates, and `time_entries_changed` is sent per batch with the states read
+        before the update, so the dashboard summaries are adjusted and the caches invalidated.
+    """
+    help = "Backfills TimeEntry.estimated_minutes from estimated_time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows parsed and written per batch.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        entries = TimeEntry.objects.only('id', 'task_id', 'estimated_time', 'estimated_minutes', 'updated_at').order_by('id')
+        rows = entries.iterator(chunk_size=batch_size)
+        scanned = updated = 0
+        now = timezone.now()
+
+        while batch := list(islice(rows, batch_size)):
+            scanned += len(batch)
+            minutes = parse_minutes_array(entry.estimated_time for entry in batch)
+            stale = []
+            for entry, value in zip(batch, minutes.tolist()):
+                if entry.estimated_minutes != value:
+                    entry.estimated_minutes = value
+                    entry.updated_at = now
+                    stale.append(entry)
+            if stale:
+                task_ids = [entry.task_id for entry in stale]
+                with transaction.atomic():
+                    previous = task_states(task_ids)
+                    updated += TimeEntry.objects.bulk_update(stale, ['estimated_minutes', 'updated_at'])
+                    time_entries_changed.send(sender=TimeEntry, task_ids=task_ids, previous=previous)
+
+        self.stdout.write(self.style.SUCCESS(f"{scanned} time entries scanned, {updated} updated."))
@@ -0,0 +1,42 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from tasks.models import Task, TimeEntry
+from tasks.search import build_excerpt
+
+
+class Command(BaseCommand):
+    """
+        Recomputes the plain-text `excerpt` of every task and time entry from its rich-text description.
+
+        Rows are read in chunks with a server-side cursor, and only the ones whose stored excerpt is out
+        of date are written back with `bulk_update`.
+    """
+    help = "Backfills Task.excerpt and TimeEntry.excerpt from their descriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows read and written per batch.')
+
+    def handle(self, *args, **options):
+        for model in (Task, TimeEntry):
+            scanned, updated = self.backfill(model, options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.verbose_name}: {scanned} scanned, {updated} updated."
+            ))
+
+    def backfill(self, model, batch_size):
+        rows = model.objects.only('id', 'description', 'excerpt').order_by('id').iterator(chunk_size=batch_size)
+        scanned = updated = 0
+
+        while batch := list(islice(rows, batch_size)):
+            scanned += len(batch)
+            stale = []
+            for obj in batch:
+                excerpt = build_excerpt(obj.description)
+                if obj.excerpt != excerpt:
+                    obj.excerpt = excerpt
+                    stale.append(obj)
+            if stale:
+                updated += model.objects.bulk_update(stale, ['excerpt'])
+
+        return scanned, updated
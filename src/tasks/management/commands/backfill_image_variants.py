@@ -0,0 +1,53 @@
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from tasks.images import FORMATS, generate_variants, is_variant, rewrite_descriptions, variant_name, VARIANT_WIDTHS
+from tasks.models import Task, TimeEntry
+
+
+class Command(BaseCommand):
+    """
+        Generates the WebP and downscaled variants (see `tasks.images`) of the images already in
+        `MEDIA_ROOT/uploads/`, in a process pool, and then points the task and time entry descriptions
+        to them.
+
+        Images whose variants exist are skipped unless `--force` is given. Only `description` is
+        rewritten: the excerpt and the search document are plain text, which images don't change.
+    """
+    help = "Generates the resized/WebP variants of existing uploads and rewrites the descriptions to use them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Processes of the pool; 0 runs in this process.')
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Descriptions read and written per batch.')
+
+    def handle(self, *args, **options):
+        names = [name for name in self.uploads() if options['force'] or not self.has_variants(name)]
+        if options['workers']:
+            with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+                written = sum(len(variants) for variants in executor.map(generate_variants, names, chunksize=8))
+        else:
+            written = sum(len(generate_variants(name)) for name in names)
+        self.stdout.write(self.style.SUCCESS(f"{len(names)} images processed, {written} variants written."))
+
+        for model in (Task, TimeEntry):
+            updated = rewrite_descriptions(model, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"{model._meta.verbose_name}: {updated} descriptions updated."))
+
+    def uploads(self):
+        root = default_storage.path(settings.CKEDITOR_UPLOAD_PATH)
+        for directory, _, files in os.walk(root):
+            for file in sorted(files):
+                name = posixpath.join(settings.CKEDITOR_UPLOAD_PATH, os.path.relpath(os.path.join(directory, file), root).replace(os.sep, '/'))
+                stem, extension = posixpath.splitext(name)
+                if extension.lower() in FORMATS and not stem.endswith('_thumb') and not is_variant(name):
+                    yield name
+
+    def has_variants(self, name):
+        if name.lower().endswith('.webp'):
+            return default_storage.exists(variant_name(name, VARIANT_WIDTHS[0]))
+        return default_storage.exists(variant_name(name))
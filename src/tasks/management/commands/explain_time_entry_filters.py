@@ -0,0 +1,131 @@
+import datetime
+import re
+from itertools import combinations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from perfil_users.models import CustomUser
+from tasks.models import Task
+from tasks.views import TimeEntryListView
+
+
+# Plan lines that mean a table was read whole, with or without an index: on SQLite `SCAN ... USING INDEX`
+# walks the entire index, only `SEARCH` narrows it down.
+FULL_SCANS = {
+    'postgresql': re.compile(r'Seq Scan on (tasks_task|tasks_timeentry)\b'),
+    'sqlite': re.compile(r'\bSCAN (tasks_task|tasks_timeentry)\b'),
+}
+# The first page without filters is read in keyset order, walking the (date, id) index up to the page size.
+KEYSET_SCANS = {
+    'postgresql': re.compile(r'Index (Only )?Scan (Backward )?using timeentry_date_id_idx on tasks_timeentry\b'),
+    'sqlite': re.compile(r'\bSCAN tasks_timeentry USING (COVERING )?INDEX timeentry_date_id_idx\b'),
+}
+# Column each filter narrows; the description filter is a full-text match.
+FILTER_COLUMNS = {
+    'date_from': 'date',
+    'date_to': 'date',
+    'estimated_time': 'estimated_time',
+    'status': 'status',
+    'user': 'user_id',
+    'task': 'task_id',
+    'description': 'search_vector',
+}
+FULL_TEXT_MATCH = re.compile(r'\bSCAN tasks_timeentry_fts VIRTUAL TABLE INDEX \d+:M')
+
+
+def index_conditions(vendor, plan):
+    """
+        Returns the conditions the plan looks up in an index on `tasks_task` / `tasks_timeentry`:
+        `Index Cond` lines on PostgreSQL (index and bitmap index scans), the parenthesised terms of
+        `SEARCH ... USING INDEX` lines on SQLite.
+    """
+    if vendor == 'postgresql':
+        return re.findall(r'Index Cond: (.*)', plan)
+    return re.findall(r'\bSEARCH (?:tasks_task|tasks_timeentry) USING (?:COVERING )?INDEX \S+ \((.*)\)', plan)
+
+
+def uses_index_for(vendor, plan, filters):
+    """
+        Whether at least one of `filters` is looked up in an index, rather than checked row by row as a `Filter`.
+    """
+    if not filters:
+        return bool(KEYSET_SCANS[vendor].search(plan))
+    if 'description' in filters and vendor == 'sqlite' and FULL_TEXT_MATCH.search(plan):
+        return True
+    columns = {FILTER_COLUMNS[name] for name in filters}
+    # A column of another table (`tasks_timeentry.task_id`) is a join condition, not the filter.
+    return any(re.search(rf'(?<![.\w]){column}\b', condition) for condition in index_conditions(vendor, plan) for column in columns)
+
+
+class Command(BaseCommand):
+    """
+        Runs EXPLAIN on every combination of `TimeEntryFilterForm` filters, exactly as `TimeEntryListView`
+        builds them (filters, joins and keyset ordering of the first page), and fails when any of them
+        reads `tasks_task` or `tasks_timeentry` whole (a table scan, or a scan of a whole index), or when
+        none of its filters is looked up in an index (`Index Cond` / bitmap index scan on PostgreSQL,
+        `SEARCH` on SQLite). Without filters the keyset index must be walked in order.
+
+        On PostgreSQL sequential scans are disabled for the check (`SET LOCAL enable_seqscan = off`),
+        so that on a small database the planner still reports which index it *can* use.
+    """
+    help = "Checks with EXPLAIN that every time-entry filter combination is served by an index."
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in FULL_SCANS:
+            raise CommandError(f"EXPLAIN check is not supported on {vendor}.")
+
+        values = self.sample_filters()
+        names = sorted(values)
+        failures = []
+
+        for size in range(len(names) + 1):
+            for combo in combinations(names, size):
+                plan = self.explain({name: values[name] for name in combo})
+                label = ', '.join(combo) or '(no filters)'
+                full_scan = FULL_SCANS[vendor].search(plan if combo else KEYSET_SCANS[vendor].sub('', plan))
+                if full_scan or not uses_index_for(vendor, plan, combo):
+                    failures.append(label)
+                    self.stdout.write(self.style.ERROR(f"{'FULL SCAN' if full_scan else 'NO INDEX':<10} {label}"))
+                    self.stdout.write(plan)
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f"index      {label}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} filter combinations are not served by an index.")
+        self.stdout.write(self.style.SUCCESS(f"All {2 ** len(names)} filter combinations use an index."))
+
+    def sample_filters(self):
+        today = datetime.date.today()
+        values = {
+            'date_from': (today - datetime.timedelta(days=30)).isoformat(),
+            'date_to': today.isoformat(),
+            'estimated_time': '2h',
+            'description': 'relatorio',
+            'status': 'feito',
+        }
+        # The user and task filters are model choices, so they need rows that exist.
+        user = CustomUser.objects.order_by('pk').first()
+        task = Task.objects.order_by('pk').first()
+        if user:
+            values['user'] = user.pk
+        if task:
+            values['task'] = task.pk
+        if not (user and task):
+            self.stdout.write(self.style.WARNING("No users or tasks yet: the user/task filters are not checked."))
+        return values
+
+    def explain(self, params):
+        request = RequestFactory().get('/tasks/time-entries/', params)
+        view = TimeEntryListView()
+        view.setup(request)
+        queryset = view.get_queryset()
+        ordering = [f'-{name}' for name in view.get_keyset_fields()]
+        page = queryset.order_by(*ordering)[:view.paginate_by + 1]
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            return page.explain()
@@ -0,0 +1,161 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from perfil_users.models import CustomUser
+from tasks.models import Task, TimeEntry
+from tasks.search import update_search_vectors
+from tasks.signals import time_entries_changed
+
+
+class Command(BaseCommand):
+    """
+        Imports tasks, and optionally their time entries, from a CSV (with a header line) or JSONL file.
+
+        Every row has the keys:
+            user: email or username of the task owner (required)
+            name: task name (required)
+            description: task description (HTML allowed)
+            date, estimated_time: start date (YYYY-MM-DD) and estimate of the time entry; the entry is only
+                created when both are present
+            status: time entry status (defaults to `pendente`)
+            entry_description: time entry description
+
+        The file is processed in batches. For each batch the users are resolved with a single query, and tasks
+        and entries are written with `bulk_create` inside one transaction. Invalid rows are reported with their
+        line number and skipped; a batch that fails in the database is rolled back and reported with its line
+        range, and the import continues with the next batch.
+    """
+    help = "Bulk imports tasks and time entries from a CSV or JSONL file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows written per transaction.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist.")
+        file_format = options['format'] or ('jsonl' if path.suffix in ('.jsonl', '.ndjson') else 'csv')
+        batch_size = options['batch_size']
+
+        self.statuses = {value for value, label in TimeEntry.STATUS_CHOICES if value}
+        self.date_field = TimeEntry._meta.get_field('date')
+        totals = {'rows': 0, 'tasks': 0, 'entries': 0, 'skipped': 0, 'failed_batches': 0}
+        started = time.monotonic()
+
+        with path.open(newline='', encoding='utf-8') as handle:
+            rows = self.read_rows(handle, file_format)
+            number = 0
+            while batch := list(islice(rows, batch_size)):
+                number += 1
+                totals['rows'] += len(batch)
+                self.import_batch(number, batch, totals)
+
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['rows']} rows in {elapsed:.2f}s ({totals['rows'] / elapsed:.0f} rows/s): "
+            f"{totals['tasks']} tasks and {totals['entries']} time entries created, "
+            f"{totals['skipped']} rows skipped, {totals['failed_batches']} batches failed."
+        ))
+
+    def read_rows(self, handle, file_format):
+        """
+            Yields `(line_number, row)` pairs; unreadable JSON lines are yielded with `None` so they get reported.
+        """
+        if file_format == 'csv':
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+
+    def resolve_users(self, batch):
+        identifiers = {str(row.get('user', '')).strip() for line, row in batch if row}
+        identifiers.discard('')
+        users = {}
+        for user in CustomUser.objects.filter(Q(email__in=identifiers) | Q(username__in=identifiers)).only('id', 'email', 'username'):
+            users[user.email] = user
+            users[user.username] = user
+        return users
+
+    def build_row(self, row, users):
+        """
+            Validates a row and returns the unsaved `(task, entry)` pair, where `entry` may be None.
+        """
+        if row is None:
+            raise ValidationError('invalid JSON object')
+        user = users.get(str(row.get('user', '')).strip())
+        if user is None:
+            raise ValidationError(f"unknown user {row.get('user')!r}")
+        name = (row.get('name') or '').strip()
+        if not name:
+            raise ValidationError('missing task name')
+
+        task = Task(user=user, name=name[:200], description=row.get('description') or '')
+        if not (row.get('date') and row.get('estimated_time')):
+            return task, None
+
+        status = row.get('status') or 'pendente'
+        if status not in self.statuses:
+            raise ValidationError(f"invalid status {status!r}")
+        entry = TimeEntry(
+            task=task,
+            date=self.date_field.to_python(row['date']),
+            estimated_time=str(row['estimated_time'])[:20],
+            description=row.get('entry_description') or '',
+            status=status,
+        )
+        return task, entry
+
+    def import_batch(self, number, batch, totals):
+        users = self.resolve_users(batch)
+        pairs = []
+        for line, row in batch:
+            try:
+                pairs.append(self.build_row(row, users))
+            except ValidationError as error:
+                totals['skipped'] += 1
+                self.stderr.write(f"line {line}: {'; '.join(error.messages)}")
+
+        if not pairs:
+            return
+
+        try:
+            with transaction.atomic():
+                for task, entry in pairs:
+                    task.refresh_derived_fields()
+                tasks = Task.objects.bulk_create([task for task, entry in pairs])
+                entries = []
+                for task, entry in pairs:
+                    if entry is not None:
+                        entry.task = task
+                        entry.refresh_derived_fields()
+                        entries.append(entry)
+                TimeEntry.objects.bulk_create(entries)
+                update_search_vectors(TimeEntry.objects.filter(task__in=tasks))
+        except DatabaseError as error:
+            totals['failed_batches'] += 1
+            self.stderr.write(self.style.ERROR(
+                f"batch {number} (lines {batch[0][0]}-{batch[-1][0]}) rolled back: {error}"
+            ))
+            return
+
+        totals['tasks'] += len(tasks)
+        totals['entries'] += len(entries)
+        time_entries_changed.send(sender=TimeEntry, task_ids=[task.pk for task in tasks], previous={})
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from tasks.models import TimeEntry
+from tasks.search import ensure_sqlite_fts, refresh_search_documents
+
+
+class Command(BaseCommand):
+    """
+        Rebuilds the full-text search data of every time entry: the plain-text `search_document`,
+        the PostgreSQL `search_vector` and, on SQLite, the FTS5 table.
+    """
+    help = "Backfills TimeEntry.search_document and the full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per UPDATE batch.')
+
+    def handle(self, *args, **options):
+        ensure_sqlite_fts(connection.alias)
+        total = refresh_search_documents(TimeEntry.objects.order_by('id'), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{total} time entries reindexed."))
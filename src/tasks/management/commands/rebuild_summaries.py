@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from tasks.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    """
+        Recomputes every `TaskSummary` row (the counters of the home dashboard) from the tasks and
+        time entries. Run it after the first migration, after `loaddata`, or whenever the counters drift.
+    """
+    help = "Recomputes the per-user and per-status task summaries of the dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only rebuild this user id (repeatable).')
+
+    def handle(self, *args, **options):
+        total = rebuild_summaries(user_ids=options['users'])
+        self.stdout.write(self.style.SUCCESS(f"{total} summary rows rebuilt."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from tasks.rollups import refresh_rollups
+
+
+class Command(BaseCommand):
+    """
+        Refreshes the weekly and monthly `TimeRollup` rows read by the rollup report.
+
+        Only the buckets touched since the previous run are recomputed (see `tasks.rollups`);
+        meant to run periodically, e.g. from cron every few minutes.
+    """
+    help = "Incrementally refreshes the weekly and monthly estimated-hour rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every bucket instead of only the touched ones.')
+
+    def handle(self, *args, **options):
+        total = refresh_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"{total} rollup buckets recomputed."))
@@ -0,0 +1,198 @@
+import datetime
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from perfil_users.models import CustomUser, Position
+from tasks.models import Task, TimeEntry
+from tasks.rollups import refresh_rollups
+from tasks.search import update_search_vectors
+from tasks.signals import time_entries_changed
+
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Heitor', 'Isabela', 'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vitória', 'William']
+LAST_NAMES = ['Almeida', 'Barbosa', 'Cardoso', 'Costa', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Oliveira', 'Pereira', 'Ribeiro', 'Rocha', 'Santos', 'Silva', 'Souza']
+POSITIONS = ['Desenvolvedor', 'Analista de Sistemas', 'Designer', 'Gerente de Projetos', 'Analista de QA', 'DevOps', 'Product Owner', 'Suporte', 'Arquiteto de Software', 'Estagiário']
+VERBS = ['Implementar', 'Corrigir', 'Revisar', 'Documentar', 'Testar', 'Refatorar', 'Publicar', 'Migrar', 'Otimizar', 'Configurar']
+SUBJECTS = ['tela de login', 'relatório mensal', 'API de pagamentos', 'cadastro de clientes', 'exportação CSV', 'dashboard', 'integração com o ERP', 'envio de e-mails', 'controle de acesso', 'busca de tarefas', 'backup do banco', 'pipeline de deploy']
+SENTENCES = [
+    'Alinhar com o cliente os critérios de aceite antes de começar.',
+    'Os testes automatizados precisam cobrir os casos de erro.',
+    'Verificar o impacto nas telas que usam o mesmo componente.',
+    'A versão atual apresenta lentidão com muitos registros.',
+    'Atualizar a documentação depois da entrega.',
+    'Combinar a janela de publicação com a equipe de infraestrutura.',
+    'O comportamento deve ser o mesmo no celular e no desktop.',
+    'Registrar no chamado os passos para reproduzir o problema.',
+    'Revisar as permissões dos grupos envolvidos.',
+    'Medir o tempo de resposta antes e depois da mudança.',
+]
+# Estimates in the formats people type: mostly hours, some days and weeks, a few combined.
+ESTIMATES = [
+    ('30m', 6), ('45m', 4), ('1h', 10), ('1h 30m', 6), ('2h', 12), ('3h', 8), ('4h', 8), ('5h 30m', 3),
+    ('6h', 4), ('1d', 8), ('1d 4h', 4), ('2d', 6), ('3d', 4), ('1w', 2), ('1w 2d', 1), ('2w', 1), ('1w 3d 2h 45m', 1),
+]
+STATUS_WEIGHTS = [('pendente', 30), ('em_andamento', 25), ('feito', 35), ('reavaliar', 10)]
+# Groups of the app (see `perfil_users.signals.create_groups`) and the share of users in each.
+APP_GROUPS = [('tasks', 0.9), ('timeEntry', 0.7), ('users', 0.2)]
+
+
+class Command(BaseCommand):
+    """
+        Fills the database with synthetic users, positions, groups, tasks and time entries, to reproduce
+        production-scale volumes locally (e.g. before running `benchmarks/view_load.py`).
+
+        Users get the same password (`--password`) and are added to the app groups (`tasks`, `timeEntry`,
+        `users`) and to one of `--groups` team groups. Each user gets `--tasks` tasks with rich-text
+        descriptions, and `--entry-ratio` of them a time entry with an estimate such as `2h`, `1d 4h` or
+        `1w 3d 2h 45m`, dated within the last `--days` days.
+
+        Everything is written with `bulk_create` in batches, the way `import_tasks` does: derived fields
+        are computed with `refresh_derived_fields`, and `time_entries_changed` is sent per batch so the
+        dashboard summaries and caches follow. The rollups are refreshed at the end.
+        The output is the same for the same `--seed` (except for the creation dates).
+    """
+    help = "Generates synthetic users, groups, tasks and time entries with bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help='Users to create.')
+        parser.add_argument('--tasks', type=int, default=20, help='Tasks per user.')
+        parser.add_argument('--entry-ratio', type=float, default=0.8, help='Share of the tasks that get a time entry.')
+        parser.add_argument('--groups', type=int, default=5, help='Team groups the users are spread across.')
+        parser.add_argument('--days', type=int, default=365, help='Time entries are dated within this many past days.')
+        parser.add_argument('--password', default='Senha@123', help='Password of every generated user.')
+        parser.add_argument('--prefix', default='seed', help='Prefix of the generated usernames and emails.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per bulk insert.')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['entry_ratio'] <= 1:
+            raise CommandError('--entry-ratio must be between 0 and 1.')
+        prefix = options['prefix']
+        if CustomUser.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f"Users with the prefix {prefix!r} already exist; use another --prefix.")
+
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.monotonic()
+
+        with transaction.atomic():
+            positions = self.create_positions()
+            users = self.create_users(options['users'], prefix, options['password'], positions)
+            self.add_to_groups(users, options['groups'], prefix)
+
+        tasks = entries = 0
+        today = timezone.localdate()
+        # Whole users per batch, so each user's summary rows are updated once.
+        users_per_batch = max(self.batch_size // max(options['tasks'], 1), 1)
+        for offset in range(0, len(users), users_per_batch):
+            batch_users = users[offset:offset + users_per_batch]
+            created_tasks, created_entries = self.create_tasks(batch_users, options['tasks'], options['entry_ratio'], options['days'], today)
+            tasks += created_tasks
+            entries += created_entries
+
+        buckets = refresh_rollups()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(users)} users, {tasks} tasks and {entries} time entries created in {elapsed:.2f}s; "
+            f"{buckets} rollup buckets recomputed."
+        ))
+
+    def choice(self, weighted):
+        values, weights = zip(*weighted)
+        return self.random.choices(values, weights)[0]
+
+    def create_positions(self):
+        existing = {position.position: position for position in Position.objects.filter(position__in=POSITIONS)}
+        Position.objects.bulk_create([Position(position=name) for name in POSITIONS if name not in existing])
+        return list(Position.objects.filter(position__in=POSITIONS))
+
+    def create_users(self, count, prefix, password, positions):
+        # Hashing is deliberately slow; every user shares one hash.
+        password = make_password(password)
+        users = []
+        for number in range(1, count + 1):
+            first_name, last_name = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+            users.append(CustomUser(
+                username=f'{prefix}-{number}',
+                email=f'{prefix}-{number}@example.com',
+                first_name=first_name,
+                last_name=last_name,
+                password=password,
+                position=self.random.choice(positions),
+                phone=f'(11) 9{self.random.randint(1000, 9999)}-{self.random.randint(1000, 9999)}',
+                birth=datetime.date(self.random.randint(1970, 2003), self.random.randint(1, 12), self.random.randint(1, 28)),
+                description=f'{first_name} {last_name} trabalha na equipe desde {self.random.randint(2015, 2024)}.',
+            ))
+        CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+        # SQLite and MySQL don't return the ids of bulk inserts.
+        return list(CustomUser.objects.filter(username__startswith=f'{prefix}-').order_by('id'))
+
+    def add_to_groups(self, users, team_count, prefix):
+        app_groups = {group.name: group for group in Group.objects.filter(name__in=[name for name, share in APP_GROUPS])}
+        teams = [Group.objects.get_or_create(name=f'{prefix} equipe {number}')[0] for number in range(1, team_count + 1)]
+
+        Membership = CustomUser.groups.through
+        memberships = []
+        for user in users:
+            for name, share in APP_GROUPS:
+                if name in app_groups and self.random.random() < share:
+                    memberships.append(Membership(customuser_id=user.pk, group_id=app_groups[name].pk))
+            if teams:
+                memberships.append(Membership(customuser_id=user.pk, group_id=self.random.choice(teams).pk))
+        Membership.objects.bulk_create(memberships, batch_size=self.batch_size)
+
+    def task_name(self):
+        return f'{self.random.choice(VERBS)} {self.random.choice(SUBJECTS)}'
+
+    def rich_text(self, paragraphs):
+        """
+            HTML like the one CKEditor produces: paragraphs with some emphasis, a list and now and then a link.
+        """
+        parts = []
+        for _ in range(paragraphs):
+            sentences = self.random.sample(SENTENCES, self.random.randint(1, 3))
+            if self.random.random() < 0.3:
+                sentences[0] = f'<strong>{sentences[0]}</strong>'
+            parts.append(f'<p>{" ".join(sentences)}</p>')
+        if self.random.random() < 0.4:
+            items = ''.join(f'<li>{item}</li>' for item in self.random.sample(SENTENCES, self.random.randint(2, 4)))
+            parts.append(f'<ul>{items}</ul>')
+        if self.random.random() < 0.15:
+            parts.append(f'<p>Referência: <a href="https://example.com/chamados/{self.random.randint(100, 9999)}">chamado</a></p>')
+        return '\n'.join(parts)
+
+    def create_tasks(self, users, per_user, entry_ratio, days, today):
+        tasks = []
+        for user in users:
+            for _ in range(per_user):
+                task = Task(user=user, name=self.task_name(), description=self.rich_text(self.random.randint(1, 3)))
+                task.refresh_derived_fields()
+                tasks.append(task)
+
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+            if tasks and tasks[0].pk is None:
+                tasks = list(Task.objects.filter(user__in=users).order_by('id'))
+            entries = []
+            for task in tasks:
+                if self.random.random() >= entry_ratio:
+                    continue
+                entry = TimeEntry(
+                    task=task,
+                    date=today - datetime.timedelta(days=self.random.randint(0, days)),
+                    estimated_time=self.choice(ESTIMATES),
+                    description=self.rich_text(1) if self.random.random() < 0.6 else '',
+                    status=self.choice(STATUS_WEIGHTS),
+                )
+                entry.refresh_derived_fields()
+                entries.append(entry)
+            TimeEntry.objects.bulk_create(entries, batch_size=self.batch_size)
+            update_search_vectors(TimeEntry.objects.filter(task__in=tasks))
+
+        time_entries_changed.send(sender=TimeEntry, task_ids=[task.pk for task in tasks], previous={})
+        return len(tasks), len(entries)
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:09
+
+from itertools import islice
+
+from django.db import migrations, models
+
+from tasks.duration import parse_minutes_array
+
+
+def backfill_estimated_minutes(apps, schema_editor, batch_size=2000):
+    # Same as the `backfill_estimates` command, with the model of this migration, so existing rows don't
+    # stay at 0 after the upgrade.
+    TimeEntry = apps.get_model('tasks', 'TimeEntry')
+    entries = TimeEntry.objects.using(schema_editor.connection.alias)
+    rows = entries.only('id', 'estimated_time').order_by('id').iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        for entry, minutes in zip(batch, parse_minutes_array(entry.estimated_time for entry in batch).tolist()):
+            entry.estimated_minutes = minutes
+        entries.bulk_update(batch, ['estimated_minutes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='estimated_minutes',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='estimativa em minutos'),
+        ),
+        migrations.AlterField(
+            model_name='timeentry',
+            name='status',
+            field=models.CharField(choices=[('', '---------'), ('pendente', 'Pendente'), ('em_andamento', 'Em Andamento'), ('feito', 'Feito'), ('reavaliar', 'Reavaliar')], default='pendente', max_length=20, verbose_name='Status'),
+        ),
+        migrations.RunPython(backfill_estimated_minutes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:12
+
+from itertools import islice
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+from tasks.search import FTS_TABLE, SEARCH_CONFIG, build_search_document
+
+
+def create_gin_index(apps, schema_editor):
+    # The GIN index only exists on PostgreSQL; SQLite gets an FTS5 table instead (see tasks.search).
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE INDEX tasks_timeentry_search_vector_gin ON tasks_timeentry USING gin (search_vector)")
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS tasks_timeentry_search_vector_gin")
+    elif schema_editor.connection.vendor == 'sqlite':
+        # The FTS5 table created after `migrate` indexes the column removed by this migration.
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def backfill_search_documents(apps, schema_editor, batch_size=1000):
+    # Same as the `rebuild_search_index` command, with the model of this migration, so existing entries are
+    # searchable right after the upgrade. SQLite's FTS5 index is built from these rows after `migrate`.
+    TimeEntry = apps.get_model('tasks', 'TimeEntry')
+    entries = TimeEntry.objects.using(schema_editor.connection.alias)
+    rows = entries.select_related('task').order_by('id').iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        for entry in batch:
+            entry.search_document = build_search_document(entry)
+        entries.bulk_update(batch, ['search_document'])
+
+    if schema_editor.connection.vendor == 'postgresql':
+        entries.update(search_vector=SearchVector('search_document', config=SEARCH_CONFIG))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_timeentry_estimated_minutes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeentry',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='texto indexado para busca'),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_gin_index, drop_gin_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
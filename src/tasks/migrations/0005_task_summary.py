@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def seed_summaries(apps, schema_editor):
+    # Same computation as `tasks.summary.rebuild_summaries`, with the models of this migration; from here on
+    # the signals keep the rows up to date with deltas.
+    Task = apps.get_model('tasks', 'Task')
+    TimeEntry = apps.get_model('tasks', 'TimeEntry')
+    TaskSummary = apps.get_model('tasks', 'TaskSummary')
+    db = schema_editor.connection.alias
+
+    rows = {}
+    for row in Task.objects.using(db).filter(task__isnull=True).values('user_id').annotate(tasks=Count('id')).order_by():
+        rows[row['user_id'], ''] = (row['tasks'], 0)
+    entries = TimeEntry.objects.using(db).values('task__user_id', 'status').annotate(tasks=Count('id'), minutes=Sum('estimated_minutes'))
+    for row in entries.order_by():
+        key = (row['task__user_id'], row['status'])
+        tasks, minutes = rows.get(key, (0, 0))
+        rows[key] = (tasks + row['tasks'], minutes + (row['minutes'] or 0))
+
+    TaskSummary.objects.using(db).bulk_create(
+        TaskSummary(user_id=user_id, status=status, task_count=count, estimated_minutes=minutes)
+        for (user_id, status), (count, minutes) in rows.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(blank=True, max_length=20, verbose_name='Status')),
+                ('task_count', models.IntegerField(default=0, verbose_name='quantidade de tarefas')),
+                ('estimated_minutes', models.IntegerField(default=0, verbose_name='estimativa em minutos')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Resumo de tarefas',
+                'constraints': [models.UniqueConstraint(fields=('user', 'status'), name='tasksummary_user_status_uniq')],
+            },
+        ),
+        migrations.RunPython(seed_summaries, migrations.RunPython.noop),
+    ]
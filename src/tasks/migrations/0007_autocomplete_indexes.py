@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def create_prefix_index(apps, schema_editor):
+    # Serves the case-insensitive prefix search of the task autocomplete (`UPPER(name) LIKE 'ABC%'`).
+    # text_pattern_ops lets LIKE use the index whatever the database collation; PostgreSQL only.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("CREATE INDEX task_name_upper_prefix_idx ON tasks_task (UPPER(name) text_pattern_ops)")
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS task_name_upper_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_time_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
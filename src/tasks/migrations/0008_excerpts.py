@@ -0,0 +1,40 @@
+# Generated by Django 5.1.2 on 2026-10-18 17:31
+
+from itertools import islice
+
+from django.db import migrations, models
+
+from tasks.search import build_excerpt
+
+
+def backfill_excerpts(apps, schema_editor, batch_size=1000):
+    # Same as the `backfill_excerpts` command, with the models of this migration, so the lists don't show
+    # empty excerpts after the upgrade.
+    for name in ('Task', 'TimeEntry'):
+        objects = apps.get_model('tasks', name).objects.using(schema_editor.connection.alias)
+        rows = objects.only('id', 'description').order_by('id').iterator(chunk_size=batch_size)
+        while batch := list(islice(rows, batch_size)):
+            for obj in batch:
+                obj.excerpt = build_excerpt(obj.description)
+            objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='resumo da descrição'),
+        ),
+        migrations.AddField(
+            model_name='timeentry',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200, verbose_name='resumo da descrição'),
+        ),
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
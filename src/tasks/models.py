@@ -1,19 +1,88 @@
 from perfil_users.models import CustomUser
-import re
 from django.db import models
+from django.db.models import Case, Sum, Value, When
+from django.utils import timezone
+from django.contrib.postgres.search import SearchVectorField
 from ckeditor_uploader.fields import RichTextUploadingField
+from .duration import parse_minutes, parse_hours, minutes_to_hours
+from .search import build_excerpt, build_search_document, search_vector_for
+
 
 class Task(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='tasks', verbose_name="Usuario")
     name = models.CharField(max_length=200, verbose_name='Nome da tarefa')
     description = RichTextUploadingField(blank=True, verbose_name='descrição da tarefa')
     created_at = models.DateField(auto_now_add=True, verbose_name='Data da criaçao da tarefa')
+    excerpt = models.CharField(max_length=200, blank=True, editable=False, verbose_name='resumo da descrição')
 
 
     def __str__(self) -> str:
         return self.name
 
-    
+    # Columns computed from the other fields; see `refresh_derived_fields`.
+    DERIVED_FIELDS = ('excerpt',)
+
+    def refresh_derived_fields(self):
+        """
+            Recomputes the plain-text excerpt of the description. Called by `save()`; bulk inserts,
+            which skip `save()`, must call it themselves.
+        """
+        self.excerpt = build_excerpt(self.description)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the task list.
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+            # Tasks of a user, newest first; also serves the TimeEntry filter on `task__user`.
+            models.Index(fields=['user', 'created_at'], name='task_user_created_idx'),
+        ]
+
+
+class TimeEntryQuerySet(models.QuerySet):
+    """
+        QuerySet that aggregates the stored `estimated_minutes` column in the database.
+    """
+
+    def total_estimated_hours(self):
+        return minutes_to_hours(self.aggregate(total=Sum('estimated_minutes'))['total'])
+
+    async def atotal_estimated_hours(self):
+        return minutes_to_hours((await self.aaggregate(total=Sum('estimated_minutes')))['total'])
+
+    def estimated_minutes_by(self, *fields):
+        """
+            Groups the entries by `fields` (e.g. `'task__user__username'`, `'status'`) and sums their estimates
+            with a single `GROUP BY` query. Each row carries the grouping fields plus `total_minutes`.
+        """
+        return self.values(*fields).annotate(total_minutes=Sum('estimated_minutes')).order_by(*fields)
+
+    def set_statuses(self, statuses):
+        """
+            Applies `{task_id: status}` to the entries of those tasks with a single
+            `UPDATE ... SET status = CASE ... WHERE task_id IN (...)` statement.
+
+            Like any queryset `update()`, it bypasses `save()` and the model signals; callers should send
+            `tasks.signals.time_entries_changed` afterwards. `updated_at` is set explicitly, since `auto_now`
+            only applies in `save()`.
+
+            :return: returns the number of updated entries
+        """
+        if not statuses:
+            return 0
+        whens = [When(task_id=task_id, then=Value(status)) for task_id, status in statuses.items()]
+        return self.filter(task_id__in=statuses).update(
+            status=Case(*whens, output_field=models.CharField()),
+            updated_at=timezone.now(),
+        )
+
+
 class TimeEntry(models.Model):
     STATUS_CHOICES = [
         ('', '---------'), 
@@ -32,13 +101,51 @@ class TimeEntry(models.Model):
         default='pendente',
         verbose_name="Status"
     )
+    estimated_minutes = models.PositiveIntegerField(default=0, editable=False, verbose_name='estimativa em minutos')
+    search_document = models.TextField(blank=True, editable=False, verbose_name='texto indexado para busca')
+    excerpt = models.CharField(max_length=200, blank=True, editable=False, verbose_name='resumo da descrição')
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Watermark of the incremental rollup refresh (see `tasks.rollups`).
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Atualizado em')
+
+    objects = TimeEntryQuerySet.as_manager()
 
     def __str__(self) -> str:
         return f"{self.task.name} - {self.estimated_time}"
     
     class Meta:
         verbose_name = "Entrada de tempo"
+        indexes = [
+            # Keyset pagination and the date range filters of the time-entry list.
+            models.Index(fields=['date', 'id'], name='timeentry_date_id_idx'),
+            # Status filter, alone or combined with a date range.
+            models.Index(fields=['status', 'date', 'id'], name='timeentry_status_date_idx'),
+            models.Index(fields=['estimated_time'], name='timeentry_estimate_idx'),
+        ]
+
+
+    # Columns computed from the other fields; see `refresh_derived_fields`.
+    DERIVED_FIELDS = ('estimated_minutes', 'search_document', 'excerpt')
+
+    def refresh_derived_fields(self):
+        """
+            Recomputes the columns derived from the estimate and the descriptions. Called by `save()`;
+            bulk inserts, which skip `save()`, must call it themselves.
+        """
+        self.estimated_minutes = parse_minutes(self.estimated_time)
+        self.search_document = build_search_document(self)
+        self.excerpt = build_excerpt(self.description)
 
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        self.search_vector = search_vector_for(self.search_document)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.DERIVED_FIELDS, 'search_vector', 'updated_at'}
+        super().save(*args, **kwargs)
+        if self.search_vector is not None:
+            # Left deferred, so it's read back from the row instead of exposing the expression.
+            del self.search_vector
 
     @property
     def hours_estimated(self):
@@ -48,27 +155,85 @@ class TimeEntry(models.Model):
 
             :return: returns the rounded value in hours
         """
-        pattern = re.compile(r'(?:(\d+)w)?\s*(?:(\d+)d)?\s*(?:(\d+)h)?\s*(?:(\d+)m)?')
-        match = pattern.search(self.estimated_time)
+        return parse_hours(self.estimated_time)
 
-        if not match:
-            return 0
 
-        weeks = match.group(1)  # Weeks
-        days = match.group(2)   # Days
-        hours = match.group(3)  # Hours
-        minutes = match.group(4)  # Minutes
+class TaskSummary(models.Model):
+    """
+        Pre-aggregated counters of the tasks of a user, per time-entry status, read by the home dashboard.
+
+        Tasks without a time entry are counted under the empty status. The rows are kept up to date
+        incrementally by `tasks.signals` (see `tasks.summary`) and can be recomputed from scratch with
+        the `rebuild_summaries` command.
+
+        The user is not a database foreign key: rows of a deleted user are removed once the user is gone,
+        so the counters can be updated while the deletion cascades through the user's tasks.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', verbose_name="Usuario")
+    status = models.CharField(max_length=20, blank=True, verbose_name="Status")
+    task_count = models.IntegerField(default=0, verbose_name='quantidade de tarefas')
+    estimated_minutes = models.IntegerField(default=0, verbose_name='estimativa em minutos')
 
-        total_hours = 0
+    class Meta:
+        verbose_name = "Resumo de tarefas"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'status'], name='tasksummary_user_status_uniq'),
+        ]
+
+    @property
+    def estimated_hours(self):
+        return minutes_to_hours(self.estimated_minutes)
 
-        if weeks:
-            total_hours += int(weeks) * 44  # Converts weeks to hours (1 week = 7 days = 44 working hours)
-        if days:
-            total_hours += int(days) * 8  # Converts days to hours (1 day = 8 working hours)
-        if hours:
-            total_hours += int(hours)  # Direct hours
-        if minutes:
-            total_hours += int(minutes) / 60  # Converts minutes to hours (1 hour = 60 minutes)
 
-        return round(total_hours, 2)
+class TimeRollup(models.Model):
+    """
+        Estimated minutes of the time entries of a user, summed per week (starting on Monday) or per month.
 
+        Refreshed incrementally by the `refresh_rollups` command (see `tasks.rollups`) and read by the
+        rollup report, so the report never aggregates `TimeEntry` itself.
+    """
+    WEEK = 'week'
+    MONTH = 'month'
+    PERIOD_CHOICES = [
+        (WEEK, 'Semana'),
+        (MONTH, 'Mês'),
+    ]
+    user = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', verbose_name="Usuario")
+    period = models.CharField(max_length=5, choices=PERIOD_CHOICES, verbose_name='Período')
+    start = models.DateField(verbose_name='Início do período')
+    entry_count = models.IntegerField(default=0, verbose_name='quantidade de entradas')
+    estimated_minutes = models.IntegerField(default=0, verbose_name='estimativa em minutos')
+
+    class Meta:
+        verbose_name = "Consolidado de horas"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'period', 'start'], name='timerollup_user_period_start_uniq'),
+        ]
+        indexes = [
+            # Report pagination and its date range filter.
+            models.Index(fields=['period', 'start', 'id'], name='timerollup_period_start_idx'),
+        ]
+
+    @property
+    def estimated_hours(self):
+        return minutes_to_hours(self.estimated_minutes)
+
+
+class StaleRollupBucket(models.Model):
+    """
+        User and date an entry had before it was changed or deleted, whose rollups must be recomputed
+        by the next refresh. The `updated_at` watermark only sees where entries are now, not where they were.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    date = models.DateField()
+
+
+class RollupWatermark(models.Model):
+    """
+        Point in time up to which the time entries are already reflected in the rollups.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,154 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    """
+        Encodes the keyset values of a row into an opaque, URL-safe cursor.
+    """
+    raw = json.dumps([str(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """
+        Decodes a cursor produced by `encode_cursor` back into Python values, using `fields` to convert them.
+
+        :return: returns the list of values, or None when the cursor is missing or invalid
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(fields):
+            return None
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def keyset_filter(names, values, lookup):
+    """
+        Builds the condition "row comes after (names) = (values)" in keyset order.
+
+        For `('date', 'id')` and `lookup='lt'` it yields `date < v0 OR (date = v0 AND id < v1)`,
+        plus a redundant `date <= v0` so the database can turn it into an index range scan.
+    """
+    inclusive = {'lt': 'lte', 'gt': 'gte'}[lookup]
+    condition = Q()
+    for position, name in enumerate(names):
+        equal = Q(**{name: value for name, value in zip(names[:position], values[:position])})
+        condition |= equal & Q(**{f'{name}__{lookup}': values[position]})
+    return Q(**{f'{names[0]}__{inclusive}': values[0]}) & condition
+
+
+class KeysetPage:
+    """
+        Page of results produced by `KeysetPaginationMixin`.
+
+        Attributes:
+            object_list: The rows of the page, in display order.
+            has_next / has_previous: Whether there are rows after or before this page.
+            next_querystring / previous_querystring: The current querystring (filters included)
+                with the cursor that leads to the next or previous page.
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_querystring, previous_querystring):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_querystring = next_querystring
+        self.previous_querystring = previous_querystring
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginationMixin:
+    """
+        Mixin for `ListView` that replaces OFFSET pagination with cursor (keyset) pagination.
+
+        Rows are ordered by `keyset_fields`, newest first. The `after` and `before` querystring parameters carry
+        the cursor of the last or first row already shown, so every page is a bounded index range scan and page N
+        costs the same as page 1. All other querystring parameters, such as the filters, are preserved.
+
+        Attributes:
+            paginate_by: The number of rows per page.
+            keyset_fields: The model fields (or annotations) that define a stable order. The last one must be unique.
+                Override `get_keyset_fields` to pick them per request.
+    """
+    paginate_by = 50
+    keyset_fields = ('id',)
+
+    def get_keyset_fields(self):
+        return self.keyset_fields
+
+    def get_keyset_values(self, obj):
+        return [getattr(obj, name) for name in self.get_keyset_fields()]
+
+    def resolve_keyset_field(self, queryset, name):
+        # Keyset fields may also be annotations, such as a search rank.
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def build_querystring(self, **cursor):
+        params = self.request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params.update(cursor)
+        return params.urlencode()
+
+    def keyset_window(self, queryset, page_size):
+        """
+            Returns the query of the requested page (one extra row to detect a following page) and
+            the cursor it was requested with: `'after'`, `'before'` (rows in reverse order) or None.
+        """
+        names = list(self.get_keyset_fields())
+        fields = [self.resolve_keyset_field(queryset, name) for name in names]
+        after = decode_cursor(self.request.GET.get('after'), fields)
+        before = decode_cursor(self.request.GET.get('before'), fields) if after is None else None
+
+        if before is not None:
+            return queryset.filter(keyset_filter(names, before, 'gt')).order_by(*names)[:page_size + 1], 'before'
+        if after is not None:
+            queryset = queryset.filter(keyset_filter(names, after, 'lt'))
+        return queryset.order_by(*[f'-{name}' for name in names])[:page_size + 1], 'after' if after is not None else None
+
+    def build_page(self, rows, page_size, cursor):
+        if cursor == 'before':
+            has_previous, has_next = len(rows) > page_size, True
+            rows = rows[:page_size][::-1]
+        else:
+            has_previous, has_next = cursor == 'after', len(rows) > page_size
+            rows = rows[:page_size]
+
+        next_querystring = previous_querystring = ''
+        if rows and has_next:
+            next_querystring = self.build_querystring(after=encode_cursor(self.get_keyset_values(rows[-1])))
+        if rows and has_previous:
+            previous_querystring = self.build_querystring(before=encode_cursor(self.get_keyset_values(rows[0])))
+
+        page = KeysetPage(rows, has_next and bool(rows), has_previous and bool(rows), next_querystring, previous_querystring)
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def paginate_queryset(self, queryset, page_size):
+        window, cursor = self.keyset_window(queryset, page_size)
+        return self.build_page(list(window), page_size, cursor)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """
+            Same as `paginate_queryset`, fetching the page with the async ORM.
+        """
+        window, cursor = self.keyset_window(queryset, page_size)
+        return self.build_page([row async for row in window], page_size, cursor)
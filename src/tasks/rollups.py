@@ -0,0 +1,130 @@
+"""
+    Weekly and monthly estimated-hour rollups per user (`TimeRollup`), refreshed incrementally.
+
+    A refresh only recomputes the buckets (user, period, start) touched since the previous one:
+
+        - the current user and date of every entry whose `updated_at` is past the watermark
+          (saves, bulk imports, `set_statuses`, `backfill_estimates`);
+        - the `StaleRollupBucket` rows, recorded by `tasks.signals` with the user and date an entry had
+          before it was changed, moved to another user or deleted.
+
+    Each touched bucket is recomputed from scratch, so processing it twice is harmless. That is what
+    allows the watermark to overlap the previous run by `WATERMARK_OVERLAP`, picking up the entries
+    of transactions that were still open when it was taken.
+"""
+import datetime
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import RollupWatermark, StaleRollupBucket, TimeEntry, TimeRollup
+
+
+WATERMARK_NAME = 'time_rollup'
+WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+BUCKETS_PER_QUERY = 200
+
+
+def week_start(day):
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def week_end(start):
+    return start + datetime.timedelta(days=7)
+
+
+def month_end(start):
+    return (start + datetime.timedelta(days=32)).replace(day=1)
+
+
+# period: (start of the bucket of a date, end of a bucket, SQL truncation)
+PERIODS = {
+    TimeRollup.WEEK: (week_start, week_end, TruncWeek),
+    TimeRollup.MONTH: (month_start, month_end, TruncMonth),
+}
+
+
+def period_start(period, day):
+    return PERIODS[period][0](day)
+
+
+def mark_stale(pairs):
+    """
+        Records `(user_id, date)` pairs whose rollups must be recomputed by the next refresh.
+    """
+    StaleRollupBucket.objects.bulk_create(
+        StaleRollupBucket(user_id=user_id, date=date) for user_id, date in set(pairs) if user_id is not None
+    )
+
+
+def aggregate(period, entries):
+    """
+        Sums `entries` per user and bucket of `period` with one `GROUP BY` query.
+    """
+    truncate = PERIODS[period][2]
+    rows = entries.annotate(start=truncate('date')).values('task__user_id', 'start')
+    return rows.annotate(entry_count=Count('id'), minutes=Sum('estimated_minutes')).order_by()
+
+
+def build_rollups(period, rows):
+    return [
+        TimeRollup(user_id=row['task__user_id'], period=period, start=row['start'],
+                   entry_count=row['entry_count'], estimated_minutes=row['minutes'] or 0)
+        for row in rows
+    ]
+
+
+def recompute(period, buckets):
+    """
+        Rewrites the rollups of `buckets` (`(user_id, start)` pairs of `period`), a chunk at a time.
+    """
+    end = PERIODS[period][1]
+    buckets = iter(sorted(buckets))
+    while chunk := list(islice(buckets, BUCKETS_PER_QUERY)):
+        entries = reduce(or_, (Q(task__user_id=user_id, date__gte=start, date__lt=end(start)) for user_id, start in chunk))
+        existing = reduce(or_, (Q(user_id=user_id, start=start) for user_id, start in chunk))
+        with transaction.atomic():
+            TimeRollup.objects.filter(existing, period=period).delete()
+            TimeRollup.objects.bulk_create(build_rollups(period, aggregate(period, TimeEntry.objects.filter(entries))))
+
+
+def refresh_rollups(full=False):
+    """
+        Brings `TimeRollup` up to date with the time entries.
+
+        :param full: recompute every bucket instead of only the touched ones (also done on the first run)
+        :return: returns the number of buckets recomputed
+    """
+    started = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    stale = list(StaleRollupBucket.objects.values_list('id', 'user_id', 'date'))
+
+    if full or watermark is None:
+        with transaction.atomic():
+            TimeRollup.objects.all().delete()
+            for period in PERIODS:
+                TimeRollup.objects.bulk_create(build_rollups(period, aggregate(period, TimeEntry.objects.all())))
+        total = TimeRollup.objects.count()
+    else:
+        touched = TimeEntry.objects.filter(updated_at__gte=watermark.value - WATERMARK_OVERLAP)
+        pairs = set(touched.values_list('task__user_id', 'date').distinct())
+        pairs.update((user_id, date) for pk, user_id, date in stale)
+        total = 0
+        for period in PERIODS:
+            buckets = {(user_id, period_start(period, date)) for user_id, date in pairs}
+            recompute(period, buckets)
+            total += len(buckets)
+
+    if stale:
+        StaleRollupBucket.objects.filter(id__lte=max(pk for pk, user_id, date in stale)).delete()
+    RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': started})
+    return total
@@ -0,0 +1,176 @@
+"""
+    Full-text search over time entries.
+
+    Every `TimeEntry` stores `search_document`, the plain text of its task name, the task description and
+    its own description. The index built on top of it depends on the database:
+
+        - PostgreSQL: `search_vector` holds `to_tsvector(search_document)` and has a GIN index.
+        - SQLite: the `tasks_timeentry_fts` FTS5 table indexes `search_document`, kept up to date by triggers.
+        - Anything else falls back to `icontains` over `search_document`.
+
+    The GIN index is created by the `0003_timeentry_search` migration. The FTS5 table and its triggers are
+    (re)created after every `migrate` by `ensure_sqlite_fts`, because SQLite drops triggers whenever a
+    migration rebuilds the `tasks_timeentry` table.
+"""
+import html
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, connections
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+
+
+SEARCH_CONFIG = 'portuguese'
+EXCERPT_LENGTH = 200
+FTS_TABLE = 'tasks_timeentry_fts'
+
+WHITESPACE = re.compile(r'\s+')
+WORD = re.compile(r'\w+')
+
+
+def html_to_text(value):
+    """
+        Converts the CKEditor HTML into plain text, with entities decoded and whitespace collapsed.
+    """
+    return WHITESPACE.sub(' ', html.unescape(strip_tags(value or ''))).strip()
+
+
+def build_excerpt(value):
+    """
+        Returns the beginning of the plain text of a CKEditor field, stored so lists never parse the HTML.
+    """
+    return html_to_text(value)[:EXCERPT_LENGTH]
+
+
+def build_search_document(entry):
+    """
+        Builds the text indexed for a time entry from its task and its own description.
+    """
+    task = entry.task
+    parts = (task.name, html_to_text(task.description), html_to_text(entry.description))
+    return ' '.join(part for part in parts if part)
+
+
+def search_vector_for(document):
+    """
+        Returns the value of `search_vector` when saving a single entry: on PostgreSQL the `to_tsvector`
+        expression, evaluated by the INSERT/UPDATE of the row itself, and `None` elsewhere.
+    """
+    if connection.vendor == 'postgresql':
+        return SearchVector(Value(document), config=SEARCH_CONFIG)
+    return None
+
+
+def update_search_vectors(queryset):
+    """
+        Recomputes `search_vector` from `search_document` for the entries in `queryset` with one UPDATE.
+        SQLite keeps its FTS5 table in sync through triggers, so there is nothing to do there.
+    """
+    if connection.vendor == 'postgresql':
+        queryset.update(search_vector=SearchVector('search_document', config=SEARCH_CONFIG))
+
+
+def refresh_search_documents(queryset, batch_size=1000):
+    """
+        Rebuilds `search_document` (and the Postgres vector) for every entry in `queryset`.
+
+        Used when a task changes, since its name and description are part of the document of its entry.
+
+        :return: returns the number of entries rewritten
+    """
+    pending, total = [], 0
+    for entry in queryset.select_related('task').iterator(chunk_size=batch_size):
+        entry.search_document = build_search_document(entry)
+        pending.append(entry)
+        if len(pending) >= batch_size:
+            total += queryset.model.objects.bulk_update(pending, ['search_document'])
+            pending = []
+    if pending:
+        total += queryset.model.objects.bulk_update(pending, ['search_document'])
+
+    update_search_vectors(queryset)
+    return total
+
+
+FTS_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON tasks_timeentry BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON tasks_timeentry BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document);
+        END""",
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_document ON tasks_timeentry BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.id, old.search_document);
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.id, new.search_document);
+        END""",
+}
+
+
+def ensure_sqlite_fts(using):
+    """
+        Creates the FTS5 table and its triggers when they are missing, and rebuilds the index
+        from `search_document` whenever a trigger had to be recreated. Does nothing while the
+        `search_document` column doesn't exist.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite' or 'tasks_timeentry' not in db.introspection.table_names():
+        return
+
+    with db.cursor() as cursor:
+        # Migrated back (or not yet) past `0003_timeentry_search`: there is no document to index.
+        columns = db.introspection.get_table_description(cursor, 'tasks_timeentry')
+        if 'search_document' not in {column.name for column in columns}:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(search_document, content='tasks_timeentry', content_rowid='id')"
+        )
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [sql for name, sql in FTS_TRIGGERS.items() if name not in existing]
+        for sql in missing:
+            cursor.execute(sql)
+        if missing:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def fts_available():
+    return connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+
+
+def fts_query(text):
+    """
+        Turns free text into an FTS5 query: every word is quoted (so operators typed by the user are
+        treated as text) and matched as a prefix.
+    """
+    return ' '.join('"%s"*' % word for word in WORD.findall(text))
+
+
+def search_time_entries(queryset, text):
+    """
+        Filters `queryset` down to the entries matching `text` and annotates each one with `search_rank`,
+        where a higher value means a more relevant entry.
+    """
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(search_rank=SearchRank(F('search_vector'), query))
+
+    if fts_available():
+        match = fts_query(text)
+        if not match:
+            return queryset.none()
+        table = queryset.model._meta.db_table
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE}.rowid = {table}.id AND {FTS_TABLE} MATCH %s',
+            (match,),
+            output_field=FloatField(),
+        )
+        matches = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', (match,))
+        return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+    return queryset.filter(search_document__icontains=text).annotate(search_rank=RawSQL('1.0', (), output_field=FloatField()))
@@ -0,0 +1,171 @@
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from perfil_users.models import CustomUser
+from .models import StaleRollupBucket, Task, TaskSummary, TimeEntry, TimeRollup
+from .cache import bump_generation_on_commit
+from .rollups import mark_stale
+from .search import ensure_sqlite_fts, refresh_search_documents
+from .summary import apply_delta, difference, entry_contribution, state_contributions, task_contribution, task_states
+
+
+# Sent after time entries are changed in bulk (queryset updates, bulk_create), which don't fire
+# `post_save`, with the `task_ids` and the `previous` states of those tasks (`tasks.summary.task_states`,
+# read before the change; `{}` for tasks that were just created).
+time_entries_changed = Signal()
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using='default', **kwargs):
+    if sender.name == 'tasks':
+        ensure_sqlite_fts(using)
+
+
+@receiver(post_save, sender=Task)
+def refresh_task_search_documents(sender, instance, created, **kwargs):
+    # The task name and description are part of the search document of its time entry.
+    if not created:
+        refresh_search_documents(TimeEntry.objects.filter(task=instance))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=TimeEntry)
+@receiver(post_delete, sender=TimeEntry)
+@receiver(time_entries_changed)
+def invalidate_cached_data(sender, using=None, **kwargs):
+    bump_generation_on_commit(using)
+
+
+# The cached tables and charts show the username and email of the owners; the viewer's groups are part
+# of the fragment keys. Other user saves, like `update_last_login` on every login, keep the caches.
+USER_CACHED_FIELDS = ('username', 'email')
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_user_labels(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_labels = None
+    if raw or instance._state.adding or (update_fields is not None and not set(update_fields) & set(USER_CACHED_FIELDS)):
+        return
+    instance._previous_labels = CustomUser.objects.filter(pk=instance.pk).values_list(*USER_CACHED_FIELDS).first()
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_cached_user_labels(sender, instance, using=None, **kwargs):
+    previous = getattr(instance, '_previous_labels', None)
+    if previous is not None and previous != tuple(getattr(instance, field) for field in USER_CACHED_FIELDS):
+        bump_generation_on_commit(using)
+
+
+# State of a task or time entry before it is saved, used by the summary and rollup handlers below.
+# Raw saves (`loaddata`) are skipped; run `rebuild_summaries` and `refresh_rollups --full` after them.
+
+@receiver(pre_save, sender=Task)
+def remember_task_owner(sender, instance, raw=False, **kwargs):
+    instance._previous_user_id = None
+    if not (raw or instance._state.adding):
+        instance._previous_user_id = Task.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+
+
+@receiver(pre_save, sender=TimeEntry)
+def remember_entry_state(sender, instance, raw=False, **kwargs):
+    instance._previous_state = None
+    if not (raw or instance._state.adding):
+        instance._previous_state = (
+            TimeEntry.objects.filter(pk=instance.pk).values('task__user_id', 'status', 'estimated_minutes', 'date').first()
+        )
+
+
+def task_owner_changed(instance):
+    previous = getattr(instance, '_previous_user_id', None)
+    return previous is not None and previous != instance.user_id
+
+
+def deleted_entry_owner(instance):
+    # Looked up once per deleted entry and shared by the handlers; the task still exists at this point,
+    # since a cascade deletes the entry first.
+    if not hasattr(instance, '_owner_id'):
+        instance._owner_id = Task.objects.filter(pk=instance.task_id).values_list('user_id', flat=True).first()
+    return instance._owner_id
+
+
+# Dashboard summary (see `tasks.summary`).
+
+@receiver(post_save, sender=Task)
+def summarize_saved_task(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_delta(difference([task_contribution(instance.user_id)], []))
+        return
+    if not task_owner_changed(instance):
+        return
+
+    previous = instance._previous_user_id
+    entry = TimeEntry.objects.filter(task=instance).values_list('status', 'estimated_minutes').first()
+    before, after = [task_contribution(previous)], [task_contribution(instance.user_id)]
+    if entry:
+        before.append(entry_contribution(previous, *entry))
+        after.append(entry_contribution(instance.user_id, *entry))
+    apply_delta(difference(after, before))
+
+
+@receiver(post_delete, sender=Task)
+def summarize_deleted_task(sender, instance, **kwargs):
+    # Its time entry, deleted first by the cascade, has already been subtracted.
+    apply_delta(difference([], [task_contribution(instance.user_id)]))
+
+
+@receiver(post_save, sender=TimeEntry)
+def summarize_saved_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    before = []
+    if previous:
+        before.append(entry_contribution(previous['task__user_id'], previous['status'], previous['estimated_minutes']))
+    after = [entry_contribution(instance.task.user_id, instance.status, instance.estimated_minutes)]
+    apply_delta(difference(after, before))
+
+
+@receiver(post_delete, sender=TimeEntry)
+def summarize_deleted_entry(sender, instance, **kwargs):
+    user_id = deleted_entry_owner(instance)
+    if user_id is not None:
+        apply_delta(difference([], [entry_contribution(user_id, instance.status, instance.estimated_minutes)]))
+
+
+@receiver(time_entries_changed)
+def summarize_bulk_changes(sender, task_ids, previous, **kwargs):
+    apply_delta(difference(state_contributions(task_states(task_ids)), state_contributions(previous)))
+
+
+# Rollups (see `tasks.rollups`). Where an entry is now is found through `updated_at`;
+# these handlers record where it was.
+
+@receiver(post_save, sender=TimeEntry)
+def mark_previous_rollup(sender, instance, raw=False, **kwargs):
+    previous = None if raw else getattr(instance, '_previous_state', None)
+    if previous and (previous['task__user_id'], previous['date']) != (instance.task.user_id, instance.date):
+        mark_stale([(previous['task__user_id'], previous['date'])])
+
+
+@receiver(post_save, sender=Task)
+def mark_moved_task_rollups(sender, instance, raw=False, **kwargs):
+    # The entry of the task changes owner without being saved, so neither bucket is seen by the watermark.
+    if raw or not task_owner_changed(instance):
+        return
+    dates = TimeEntry.objects.filter(task=instance).values_list('date', flat=True)
+    mark_stale([(user_id, date) for date in dates for user_id in (instance._previous_user_id, instance.user_id)])
+
+
+@receiver(post_delete, sender=TimeEntry)
+def mark_deleted_entry_rollup(sender, instance, **kwargs):
+    mark_stale([(deleted_entry_owner(instance), instance.date)])
+
+
+@receiver(post_delete, sender=CustomUser)
+def delete_user_aggregates(sender, instance, **kwargs):
+    TaskSummary.objects.filter(user_id=instance.pk).delete()
+    TimeRollup.objects.filter(user_id=instance.pk).delete()
+    StaleRollupBucket.objects.filter(user_id=instance.pk).delete()
@@ -0,0 +1,55 @@
+// Adds a search box above every <select data-autocomplete-url> (see tasks.widgets.AutocompleteSelect).
+// The select starts with the selected option only; typing fetches the matching options from the endpoint.
+// Each new term aborts the request still in flight, so a slow response can't overwrite newer results.
+document.addEventListener('DOMContentLoaded', function () {
+    function search(select, input, term) {
+        if (select.autocompleteRequest) {
+            select.autocompleteRequest.abort();
+            select.autocompleteRequest = null;
+        }
+        if (!term) {
+            return;
+        }
+        var request = new AbortController();
+        select.autocompleteRequest = request;
+        fetch(select.dataset.autocompleteUrl + '?q=' + encodeURIComponent(term), {
+            headers: {'Accept': 'application/json'},
+            signal: request.signal
+        })
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                if (request.signal.aborted || input.value.trim() !== term) {
+                    return;
+                }
+                var selected = select.value;
+                Array.from(select.options).forEach(function (option) {
+                    if (option.value && option.value !== selected) {
+                        option.remove();
+                    }
+                });
+                data.results.forEach(function (result) {
+                    if (String(result.id) !== selected) {
+                        select.add(new Option(result.text, result.id));
+                    }
+                });
+            })
+            .catch(function (error) {
+                if (error.name !== 'AbortError') {
+                    throw error;
+                }
+            });
+    }
+
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(function (select) {
+        var input = document.createElement('input');
+        var timer = null;
+        input.type = 'search';
+        input.className = 'form-control col-lg-6 mb-1';
+        input.placeholder = 'Digite para buscar...';
+        select.parentNode.insertBefore(input, select);
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { search(select, input, input.value.trim()); }, 250);
+        });
+    });
+});
@@ -0,0 +1,135 @@
+"""
+    Incremental maintenance of `TaskSummary`, the per-user and per-status counters of the home dashboard.
+
+    Every task contributes one task to the `(user, '')` row. A time entry moves its task from that row to
+    the row of its status and adds its estimate there:
+
+        task:        (user, '')     +1 task
+        time entry:  (user, '')     -1 task
+                     (user, status) +1 task, +estimated_minutes
+
+    A change is applied as the difference between the contributions after and before it, with one
+    `UPDATE ... SET task_count = task_count + n` (an `F()` expression) per affected row, so concurrent
+    changes don't overwrite each other. Bulk changes, which don't fire the model signals, read the
+    `task_states` of their tasks before changing them and send them with `time_entries_changed`; the
+    handler reads the states after and applies the difference the same way. `rebuild_summaries` only
+    repairs counters that drifted.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .duration import minutes_to_hours
+from .models import Task, TaskSummary, TimeEntry
+
+
+def task_contribution(user_id):
+    return {(user_id, ''): (1, 0)}
+
+
+def entry_contribution(user_id, status, minutes):
+    return {(user_id, ''): (-1, 0), (user_id, status): (1, minutes)}
+
+
+def task_states(task_ids):
+    """
+        Returns `{task_id: (user_id, status, estimated_minutes)}` for the tasks that exist, where status
+        is None for a task without a time entry. Read in a single query.
+    """
+    rows = Task.objects.filter(pk__in=task_ids).values_list('id', 'user_id', 'task__status', 'task__estimated_minutes')
+    return {task_id: (user_id, status, minutes or 0) for task_id, user_id, status, minutes in rows}
+
+
+def state_contributions(states):
+    contributions = []
+    for user_id, status, minutes in states.values():
+        contributions.append(task_contribution(user_id))
+        if status is not None:
+            contributions.append(entry_contribution(user_id, status, minutes))
+    return contributions
+
+
+def difference(after, before):
+    """
+        Returns the sum of the `after` contributions minus the sum of the `before` ones,
+        leaving out the rows that don't change.
+    """
+    tasks, minutes = Counter(), Counter()
+    for sign, contributions in ((1, after), (-1, before)):
+        for contribution in contributions:
+            for key, (task_delta, minutes_delta) in contribution.items():
+                tasks[key] += sign * task_delta
+                minutes[key] += sign * minutes_delta
+    return {key: (tasks[key], minutes[key]) for key in tasks.keys() | minutes.keys() if tasks[key] or minutes[key]}
+
+
+def apply_delta(delta):
+    """
+        Adds `{(user_id, status): (tasks, minutes)}` to the summary rows, creating the missing ones.
+    """
+    for (user_id, status), (tasks, minutes) in sorted(delta.items()):
+        increment = {'task_count': F('task_count') + tasks, 'estimated_minutes': F('estimated_minutes') + minutes}
+        rows = TaskSummary.objects.filter(user_id=user_id, status=status)
+        if rows.update(**increment):
+            continue
+        try:
+            with transaction.atomic():
+                TaskSummary.objects.create(user_id=user_id, status=status, task_count=tasks, estimated_minutes=minutes)
+        except IntegrityError:
+            # Created by a concurrent request in the meantime.
+            rows.update(**increment)
+
+
+def rebuild_summaries(user_ids=None):
+    """
+        Recomputes the summary rows from `Task` and `TimeEntry` with two `GROUP BY` queries.
+
+        :param user_ids: only rebuild the rows of these users (default: every user)
+        :return: returns the number of summary rows written
+    """
+    tasks = Task.objects.all()
+    summaries = TaskSummary.objects.all()
+    if user_ids is not None:
+        tasks = tasks.filter(user_id__in=user_ids)
+        summaries = summaries.filter(user_id__in=user_ids)
+
+    rows = {}
+    for row in tasks.filter(task__isnull=True).values('user_id').annotate(tasks=Count('id')).order_by():
+        rows[row['user_id'], ''] = (row['tasks'], 0)
+    entries = TimeEntry.objects.filter(task__in=tasks).values('task__user_id', 'status')
+    for row in entries.annotate(tasks=Count('id'), minutes=Sum('estimated_minutes')).order_by():
+        key = (row['task__user_id'], row['status'])
+        previous_tasks, previous_minutes = rows.get(key, (0, 0))
+        rows[key] = (previous_tasks + row['tasks'], previous_minutes + (row['minutes'] or 0))
+
+    with transaction.atomic():
+        summaries.delete()
+        TaskSummary.objects.bulk_create(
+            TaskSummary(user_id=user_id, status=status, task_count=count, estimated_minutes=minutes)
+            for (user_id, status), (count, minutes) in rows.items()
+        )
+    return len(rows)
+
+
+def dashboard_rows(summaries):
+    """
+        Adds up the `summaries` rows per status, in the order of `TimeEntry.STATUS_CHOICES`, for the dashboard.
+
+        :return: returns a list of `{"status", "label", "tasks", "hours"}` dicts, one per status with tasks
+    """
+    totals = {
+        row['status']: row
+        for row in summaries.values('status').annotate(tasks=Sum('task_count'), minutes=Sum('estimated_minutes')).order_by()
+    }
+    rows = []
+    for status, label in TimeEntry.STATUS_CHOICES:
+        row = totals.get(status)
+        if row and row['tasks']:
+            rows.append({
+                'status': status,
+                'label': label if status else 'Sem entrada de tempo',
+                'tasks': row['tasks'],
+                'hours': minutes_to_hours(row['minutes']),
+            })
+    return rows
@@ -1,3 +1,977 @@
-from django.test import TestCase
+import datetime
+import json
+import tempfile
+from concurrent.futures import Future
+from importlib import import_module
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.db.models.sql import UpdateQuery
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from perfil_users.models import CustomUser
+from perfil_users.testing import PASSWORD, UserTestCase, create_user
+from task_manager.metrics import REGISTRY
+from .models import Task, TaskSummary, TimeEntry, TimeRollup
+from .cache import GENERATION_KEY, bump_generation, fragment_stats, get_generation
+from .dbstats import record_pool_stats
+from .images import generate_variants, responsive_images, rewrite_references, variants_ready
+from .rollups import refresh_rollups
+from .search import search_vector_for
+from .summary import rebuild_summaries, task_states
+from .signals import time_entries_changed
+from .forms import TaskForm, TimeEntryFilterForm
+from .management.commands.explain_time_entry_filters import uses_index_for
+from .views import TaskChartDataView, TimeEntryListView
+from .duration import parse_minutes, parse_minutes_array, parse_hours_array
+
+
+class TaskListQueryBudgetTest(UserTestCase):
+    """
+        The task list must cost the same number of queries regardless of how many tasks exist.
+    """
+
+    groups = ('tasks',)
+
+    def create_tasks(self, count):
+        # The cached table is invalidated when the transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(count):
+                task = Task.objects.create(user=self.user, name=f'Tarefa {i}', description='<p>texto</p>')
+                TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time='1d 2h')
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('task_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        self.count_queries()  # warm up the per-user caches
+        self.create_tasks(2)
+        baseline = self.count_queries()
+
+        self.create_tasks(20)
+        self.assertEqual(self.count_queries(), baseline)
+
+    def test_rows_include_time_entry_data(self):
+        self.create_tasks(1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(user=self.user, name='Sem entrada')
+
+        response = self.client.get(reverse('task_list'))
+        rows = {row['name']: row for row in response.context['tasks_with_time']}
+
+        self.assertEqual(rows['Tarefa 0']['estimated_hours'], '1d 2h')
+        self.assertEqual(rows['Tarefa 0']['total_estimated_hours'], 10)
+        self.assertEqual(rows['Sem entrada']['status'], '')
+        self.assertEqual(rows['Sem entrada']['total_estimated_hours'], 0)
+
+
+class EstimatedMinutesTest(UserTestCase):
+
+    login = False
+
+    def create_entry(self, estimated_time, status='pendente'):
+        task = Task.objects.create(user=self.user, name=estimated_time)
+        return TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time=estimated_time, status=status)
+
+    def test_minutes_are_stored_on_save(self):
+        entry = self.create_entry('1w 3d 2h 45m')
+        self.assertEqual(entry.estimated_minutes, (44 + 24 + 2) * 60 + 45)
+        self.assertEqual(entry.hours_estimated, 70.75)
+
+        entry.estimated_time = '30m'
+        entry.save(update_fields=['estimated_time'])
+        entry.refresh_from_db()
+        self.assertEqual(entry.estimated_minutes, 30)
+
+    def test_totals_are_aggregated_in_the_database(self):
+        self.create_entry('1d')
+        self.create_entry('2h 30m', status='feito')
+
+        self.assertEqual(TimeEntry.objects.total_estimated_hours(), 10.5)
+        totals = {row['status']: row['total_minutes'] for row in TimeEntry.objects.estimated_minutes_by('status')}
+        self.assertEqual(totals, {'feito': 150, 'pendente': 480})
+
+    def test_backfill_command_fixes_stale_rows(self):
+        entry = self.create_entry('3h')
+        self.create_entry('1h', status='feito')
+        # As after a raw write that skipped `save()`: the summary was built from the rows without their minutes.
+        TimeEntry.objects.update(estimated_minutes=0)
+        rebuild_summaries()
+
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('backfill_estimates', stdout=StringIO())
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.estimated_minutes, 180)
+        summary = TaskSummary.objects.exclude(task_count=0, estimated_minutes=0).values_list('status', 'task_count', 'estimated_minutes')
+        self.assertEqual(set(summary), {('pendente', 1, 180), ('feito', 1, 60)})
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_migration_fills_existing_rows(self):
+        backfill = import_module('tasks.migrations.0002_timeentry_estimated_minutes').backfill_estimated_minutes
+        entry = self.create_entry('1d 2h')
+        TimeEntry.objects.update(estimated_minutes=0)
+
+        backfill(apps, mock.Mock(connection=connection), batch_size=1)
+        entry.refresh_from_db()
+        self.assertEqual(entry.estimated_minutes, 600)
+
+
+class DurationParserTest(SimpleTestCase):
+
+    def test_parse_minutes(self):
+        self.assertEqual(parse_minutes('1w 3d 2h 45m'), (44 + 24 + 2) * 60 + 45)
+        self.assertEqual(parse_minutes('45m'), 45)
+        self.assertEqual(parse_minutes(''), 0)
+        self.assertEqual(parse_minutes(None), 0)
+
+    def test_parse_arrays_match_scalar_parser(self):
+        values = ['2h', '1d', '2h', None, '3h 30m', '1d']
+        self.assertEqual(parse_minutes_array(values).tolist(), [parse_minutes(value) for value in values])
+        self.assertEqual(parse_hours_array(values).tolist(), [2.0, 8.0, 2.0, 0.0, 3.5, 8.0])
+        self.assertEqual(parse_minutes_array([]).tolist(), [])
+
+
+@mock.patch.object(TimeEntryListView, 'paginate_by', 3)
+class TimeEntryKeysetPaginationTest(UserTestCase):
+
+    groups = ('timeEntry',)
+
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 9):
+            task = Task.objects.create(user=self.user, name=f'Tarefa {day}')
+            status = 'feito' if day % 2 else 'pendente'
+            TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, day % 4 + 1), estimated_time='1h', status=status)
+
+    def get_page(self, querystring=''):
+        response = self.client.get(reverse('time_entry_list') + '?' + querystring)
+        return response.context['page_obj']
+
+    def test_walks_forward_and_back_in_stable_order(self):
+        expected = list(TimeEntry.objects.order_by('-date', '-id').values_list('id', flat=True))
+
+        seen, page = [], self.get_page()
+        pages = [page]
+        while True:
+            seen += [entry.id for entry in page]
+            if not page.has_next:
+                break
+            page = self.get_page(page.next_querystring)
+            pages.append(page)
+        self.assertEqual(seen, expected)
+
+        previous = self.get_page(pages[-1].previous_querystring)
+        self.assertEqual([entry.id for entry in previous], [entry.id for entry in pages[-2]])
+
+    def test_cursor_keeps_filters(self):
+        first = self.get_page('status=feito')
+        self.assertIn('status=feito', first.next_querystring)
+
+        second = self.get_page(first.next_querystring)
+        self.assertEqual({entry.status for entry in second}, {'feito'})
+        self.assertFalse(second.has_next)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        self.assertEqual(len(self.get_page('after=not-a-cursor')), 3)
+
+
+class TimeEntrySearchTest(UserTestCase):
+
+    groups = ('timeEntry',)
+
+    def create_entry(self, name, description, task_description=''):
+        task = Task.objects.create(user=self.user, name=name, description=task_description)
+        return TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time='1h', description=description)
+
+    def search(self, text):
+        response = self.client.get(reverse('time_entry_list'), {'description': text})
+        return [entry.task.name for entry in response.context['entries']]
+
+    def test_matches_stripped_text_of_entry_and_task(self):
+        self.create_entry('Migração', '<p>Ajuste no <strong>relatório</strong> mensal</p>')
+        self.create_entry('Deploy', '<p>nada</p>', task_description='<p>Servidor de relatórios</p>')
+        self.create_entry('Outra', '<p>sem relação</p>')
+
+        self.assertEqual(sorted(self.search('relat')), ['Deploy', 'Migração'])
+        self.assertEqual(self.search('strong'), [])
+
+    def test_task_changes_reach_the_index(self):
+        entry = self.create_entry('Antigo', '<p>texto</p>')
+        entry.task.name = 'Faturamento'
+        entry.task.save()
+
+        self.assertEqual(self.search('faturamento'), ['Faturamento'])
+
+    def test_save_writes_the_vector_with_the_row(self):
+        postgres = PostgresDatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'})
+        with mock.patch('tasks.search.connection', postgres):
+            vector = search_vector_for('Servidor de relatórios')
+        query = UpdateQuery(TimeEntry)
+        query.add_update_values({'search_vector': vector})
+        sql, params = query.get_compiler(connection=postgres).as_sql()
+        self.assertIn('"search_vector" = to_tsvector(%s::regconfig', sql)
+        self.assertEqual(params[:2], ('portuguese', 'Servidor de relatórios'))
+
+        entry = self.create_entry('Deploy', '<p>texto</p>')
+        with CaptureQueriesContext(connection) as ctx:
+            entry.save(update_fields=['description'])
+        updates = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('UPDATE "tasks_timeentry"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_migration_fills_existing_rows(self):
+        backfill = import_module('tasks.migrations.0003_timeentry_search').backfill_search_documents
+        self.create_entry('Deploy', '<p>Servidor de <em>homologação</em></p>')
+        TimeEntry.objects.update(search_document='')
+        self.assertEqual(self.search('servidor'), [])
+
+        backfill(apps, mock.Mock(connection=connection), batch_size=1)
+        self.assertEqual(TimeEntry.objects.get().search_document, 'Deploy Servidor de homologação')
+        self.assertEqual(self.search('homologação'), ['Deploy'])
+
+    @mock.patch.object(TimeEntryListView, 'paginate_by', 1)
+    def test_results_paginate_by_rank(self):
+        self.create_entry('Uma', '<p>backup</p>')
+        self.create_entry('Duas', '<p>backup backup backup</p>')
+
+        first = self.client.get(reverse('time_entry_list'), {'description': 'backup'}).context['page_obj']
+        second = self.client.get(reverse('time_entry_list') + '?' + first.next_querystring).context['page_obj']
+        self.assertEqual([entry.task.name for entry in first] + [entry.task.name for entry in second], ['Duas', 'Uma'])
+
+
+class FilterIndexTest(TestCase):
+
+    def test_every_filter_combination_uses_an_index(self):
+        user = create_user()
+        task = Task.objects.create(user=user, name='Tarefa')
+        TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time='2h')
+
+        out = StringIO()
+        call_command('explain_time_entry_filters', stdout=out)
+        self.assertIn('All 128 filter combinations use an index.', out.getvalue())
+
+    def test_filters_applied_row_by_row_are_rejected(self):
+        sqlite = '7 0 0 SCAN tasks_timeentry USING INDEX timeentry_date_id_idx\n10 0 0 SEARCH tasks_task USING INTEGER PRIMARY KEY (rowid=?)'
+        self.assertTrue(uses_index_for('sqlite', sqlite, ()))
+        self.assertFalse(uses_index_for('sqlite', sqlite, ('status',)))
+        self.assertTrue(uses_index_for('sqlite', '7 0 0 SEARCH tasks_timeentry USING INDEX timeentry_status_date_idx (status=?)', ('status',)))
+
+        postgres = (
+            'Limit\n  ->  Index Scan Backward using timeentry_date_id_idx on tasks_timeentry\n'
+            "        Filter: ((status)::text = 'feito'::text)"
+        )
+        self.assertFalse(uses_index_for('postgresql', postgres, ('status',)))
+        self.assertTrue(uses_index_for('postgresql', "  ->  Bitmap Index Scan on timeentry_status_date_idx\n        Index Cond: ((status)::text = 'feito'::text)", ('status',)))
+
+
+class TaskChartDataTest(UserTestCase):
+
+    groups = ('tasks',)
+
+    def setUp(self):
+        super().setUp()
+        self.entry = self.create_entry('Tarefa A', '1d', 'feito')
+        self.create_entry('Tarefa B', '2h', 'pendente')
+
+    def create_entry(self, name, estimated_time, status):
+        task = Task.objects.create(user=self.user, name=name)
+        return TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time=estimated_time, status=status)
+
+    def get_chart(self, group_by):
+        return self.client.get(reverse('task_chart_data'), {'group_by': group_by}).json()
+
+    def test_groups_are_aggregated(self):
+        self.assertEqual(self.get_chart('task'), {'group_by': 'task', 'labels': ['Tarefa A', 'Tarefa B'], 'hours': [8.0, 2.0]})
+        self.assertEqual(self.get_chart('user')['hours'], [10.0])
+        self.assertEqual(self.get_chart('status')['labels'], ['Feito', 'Pendente'])
+
+    def test_cache_is_invalidated_on_save(self):
+        with mock.patch.object(TaskChartDataView, 'build_chart', autospec=True, side_effect=TaskChartDataView.build_chart) as build:
+            self.assertEqual(self.get_chart('user')['hours'], [10.0])
+            self.assertEqual(self.get_chart('user')['hours'], [10.0])
+            self.assertEqual(build.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.entry.estimated_time = '4h'
+                self.entry.save()
+            self.assertEqual(self.get_chart('user')['hours'], [6.0])
+            self.assertEqual(build.call_count, 2)
+
+    def test_rejects_unknown_grouping(self):
+        response = self.client.get(reverse('task_chart_data'), {'group_by': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskStatusUpdateTest(UserTestCase):
+
+    groups = ('tasks',)
+
+    def setUp(self):
+        super().setUp()
+        self.entries = []
+        for i in range(3):
+            task = Task.objects.create(user=self.user, name=f'Tarefa {i}')
+            self.entries.append(TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time='1h'))
+
+    def post(self, body):
+        return self.client.post(reverse('task_status_update'), json.dumps(body), content_type='application/json')
+
+    def test_applies_many_updates_with_one_statement(self):
+        first, second, _ = self.entries
+        body = [{'task_id': first.task_id, 'status': 'feito'}, {'task_id': second.task_id, 'status': 'reavaliar'}, {'task_id': 999, 'status': 'feito'}]
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post({'updates': body})
+        updates = [query for query in ctx.captured_queries if query['sql'].startswith('UPDATE "tasks_timeentry"')]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['not_found'], [999])
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            dict(TimeEntry.objects.values_list('task_id', 'status')),
+            {first.task_id: 'feito', second.task_id: 'reavaliar', self.entries[2].task_id: 'pendente'},
+        )
+
+    def test_summary_is_adjusted_not_rebuilt(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.post({'task_id': self.entries[0].task_id, 'status': 'feito'})
+            self.client.post(reverse('task_list'), {'task_id': self.entries[1].task_id, 'status': 'feito'})
+        self.assertFalse([query for query in ctx.captured_queries if query['sql'].startswith('DELETE FROM "tasks_tasksummary"')])
+
+        summary = set(TaskSummary.objects.exclude(task_count=0).values_list('status', 'task_count', 'estimated_minutes'))
+        self.assertEqual(summary, {('feito', 2, 120), ('pendente', 1, 60)})
+        rebuild_summaries()
+        self.assertEqual(summary, set(TaskSummary.objects.exclude(task_count=0).values_list('status', 'task_count', 'estimated_minutes')))
+
+    def test_invalid_status_applies_nothing(self):
+        response = self.post([{'task_id': self.entries[0].task_id, 'status': 'feito'}, {'task_id': self.entries[1].task_id, 'status': 'x'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(TimeEntry.objects.filter(status='feito').exists())
+
+
+class TimeEntryExportTest(UserTestCase):
+
+    groups = ('timeEntry',)
+
+    def setUp(self):
+        super().setUp()
+        for i, status in enumerate(['feito', 'pendente', 'feito']):
+            task = Task.objects.create(user=self.user, name=f'Tarefa {i}')
+            TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, i + 1), estimated_time='2h', status=status)
+
+    def export(self, **params):
+        response = self.client.get(reverse('time_entry_export'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_uses_list_filters(self):
+        lines = self.export(status='feito').splitlines()
+
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'date', 'estimated_time'])
+        self.assertEqual([line.split(',')[6] for line in lines[1:]], ['Tarefa 0', 'Tarefa 2'])
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export(format='ndjson', date_from='2024-10-02').splitlines()]
+
+        self.assertEqual([row['task'] for row in rows], ['Tarefa 1', 'Tarefa 2'])
+        self.assertEqual(rows[0]['estimated_minutes'], 120)
+        self.assertEqual(rows[0]['user'], 'tester')
+
+    def test_invalid_filters_are_rejected(self):
+        response = self.client.get(reverse('time_entry_export'), {'date_from': 'ontem'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_links_keep_filters_but_not_the_page(self):
+        response = self.client.get(reverse('time_entry_list'), {'status': 'feito', 'after': 'abc', 'format': 'csv'})
+        self.assertEqual(response.context['export_querystrings'], {'csv': 'status=feito&format=csv', 'ndjson': 'status=feito&format=ndjson'})
+        self.assertContains(response, 'href="%s?status=feito&amp;format=ndjson"' % reverse('time_entry_export'))
+
+
+class ImportTasksCommandTest(UserTestCase):
+
+    login = False
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def run_import(self, filename, content, *args):
+        path = Path(self.directory.name) / filename
+        path.write_text(content, encoding='utf-8')
+        out, err = StringIO(), StringIO()
+        call_command('import_tasks', str(path), *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_resolves_users_and_reports_bad_rows(self):
+        content = (
+            'user,name,description,date,estimated_time,status\n'
+            'tester@example.com,Migrar base,<p>dados</p>,2024-10-01,1d 2h,feito\n'
+            'tester,Sem entrada,,,,\n'
+            'ninguem,Tarefa órfã,,2024-10-01,1h,\n'
+            'tester,Status ruim,,2024-10-01,1h,talvez\n'
+        )
+        out, err = self.run_import('tasks.csv', content, '--batch-size', '2')
+
+        self.assertIn('2 tasks and 1 time entries created', out)
+        self.assertIn("line 4: unknown user 'ninguem'", err)
+        self.assertIn("line 5: invalid status 'talvez'", err)
+        entry = TimeEntry.objects.get(task__name='Migrar base')
+        self.assertEqual((entry.estimated_minutes, entry.status, entry.task.user), (600, 'feito', self.user))
+        self.assertIn('dados', entry.search_document)
+
+    def test_failed_batch_does_not_abort_the_file(self):
+        lines = [
+            {'user': 'tester', 'name': 'Primeira', 'date': '2024-10-01', 'estimated_time': '1h'},
+            {'user': 'tester', 'name': 'Segunda', 'date': '2024-10-01', 'estimated_time': '1h'},
+        ]
+        content = '\n'.join(json.dumps(line) for line in lines) + '\n{quebrado\n'
+
+        with mock.patch.object(TimeEntry.objects, 'bulk_create', side_effect=[DatabaseError('boom'), []]):
+            out, err = self.run_import('tasks.jsonl', content, '--batch-size', '1')
+
+        self.assertIn('batch 1 (lines 1-1) rolled back: boom', err)
+        self.assertIn('line 3: invalid JSON object', err)
+        self.assertEqual(list(Task.objects.values_list('name', flat=True)), ['Segunda'])
+
+
+class SeedDataCommandTest(TestCase):
+
+    def seed(self, **options):
+        out = StringIO()
+        call_command('seed_data', users=4, tasks=5, groups=2, batch_size=7, stdout=out, **options)
+        return out.getvalue()
+
+    def test_generates_consistent_data(self):
+        out = self.seed()
+
+        self.assertIn('4 users, 20 tasks', out)
+        user = CustomUser.objects.get(username='seed-1')
+        self.assertTrue(self.client.login(username='seed-1@example.com', password='Senha@123'))
+        self.assertIsNotNone(user.position)
+        self.assertTrue(user.groups.filter(name='seed equipe 1').exists() or user.groups.filter(name='seed equipe 2').exists())
+
+        entries = TimeEntry.objects.select_related('task')
+        self.assertTrue(entries.exists())
+        for entry in entries:
+            self.assertEqual(entry.estimated_minutes, parse_minutes(entry.estimated_time))
+            self.assertGreater(entry.estimated_minutes, 0)
+            self.assertIn(entry.task.name, entry.search_document)
+        self.assertTrue(Task.objects.filter(description__startswith='<p>').exclude(excerpt='').exists())
+
+        summaries = set(TaskSummary.objects.values_list('user_id', 'status', 'task_count', 'estimated_minutes'))
+        rebuild_summaries()
+        self.assertEqual(summaries, set(TaskSummary.objects.values_list('user_id', 'status', 'task_count', 'estimated_minutes')))
+        rollups = set(TimeRollup.objects.values_list('user_id', 'period', 'start', 'entry_count', 'estimated_minutes'))
+        refresh_rollups(full=True)
+        self.assertEqual(rollups, set(TimeRollup.objects.values_list('user_id', 'period', 'start', 'entry_count', 'estimated_minutes')))
+        self.assertEqual(
+            sum(TimeRollup.objects.filter(period=TimeRollup.MONTH).values_list('estimated_minutes', flat=True)),
+            sum(entries.values_list('estimated_minutes', flat=True)),
+        )
+
+    def test_same_seed_same_data(self):
+        self.seed(prefix='a')
+        self.seed(prefix='b')
+        first, second = (
+            list(Task.objects.filter(user__username__startswith=prefix).order_by('id').values_list('name', 'description', 'task__estimated_time'))
+            for prefix in ('a-', 'b-')
+        )
+        self.assertEqual(first, second)
+
+        with self.assertRaisesMessage(CommandError, "prefix 'a' already exist"):
+            self.seed(prefix='a')
+
+
+class FragmentCacheTest(UserTestCase):
+
+    groups = ('tasks', 'timeEntry')
+
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(user=self.user, name='Primeira')
+
+    def test_cached_table_is_served_until_a_task_changes(self):
+        before = fragment_stats()['task_table']
+        self.assertContains(self.client.get(reverse('task_list')), 'Primeira')
+        self.assertContains(self.client.get(reverse('task_list')), 'Primeira')
+        after = fragment_stats()['task_table']
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.name = 'Renomeada'
+            self.task.save()
+        self.assertContains(self.client.get(reverse('task_list')), 'Renomeada')
+
+    def test_generation_is_bumped_when_the_transaction_commits(self):
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.name = 'Renomeada'
+            self.task.save()
+            time_entries_changed.send(sender=TimeEntry, task_ids=[self.task.pk], previous=task_states([self.task.pk]))
+            # Another request would still cache the committed data under the current generation.
+            self.assertEqual(get_generation(), generation)
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_login_and_unrelated_user_changes_keep_the_cache(self):
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(self.client.login(username='tester@example.com', password=PASSWORD))
+            self.user.first_name = 'Teste'
+            self.user.save()
+        self.assertEqual(get_generation(), generation)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.username = 'renomeado'
+            self.user.save()
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_generations_are_never_reused(self):
+        generation = get_generation()
+        cache.delete(GENERATION_KEY)  # evicted, e.g. culled by the file backend
+        self.assertGreater(get_generation(), generation)
+
+        generation = get_generation()
+        bump_generation()
+        self.assertGreater(get_generation(), generation)
+        cache.delete(GENERATION_KEY)
+        bump_generation()
+        self.assertGreater(get_generation(), generation)
+
+    def test_filters_are_part_of_the_key(self):
+        self.client.get(reverse('time_entry_list'))
+        before = fragment_stats()['time_entry_table']
+        self.client.get(reverse('time_entry_list'), {'status': 'feito'})
+        self.assertEqual(fragment_stats()['time_entry_table']['misses'] - before['misses'], 1)
+
+    def test_stats_are_staff_only(self):
+        self.assertEqual(self.client.get(reverse('fragment_cache_stats')).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('fragment_cache_stats'))
+        self.assertEqual(set(response.json()), {'task_table', 'time_entry_table'})
+
+
+class DatabaseStatsTest(UserTestCase):
+
+    user_fields = {'is_staff': True}
+
+    def metric(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_opened_connections_are_counted(self):
+        before = self.metric('db_connections_opened_total', database='default')
+        connection_created.send(sender=connection.__class__, connection=connection)
+        self.assertEqual(self.metric('db_connections_opened_total', database='default') - before, 1)
+        self.assertIn('db_connections_opened_total{database="default"}', self.client.get(reverse('metrics')).content.decode())
+
+    def test_pool_stats_are_exported(self):
+        pool = mock.Mock()
+        pool.pop_stats.return_value = {
+            'pool_min': 1, 'pool_max': 4, 'pool_size': 4, 'pool_available': 1,
+            'requests_num': 50, 'requests_queued': 5, 'requests_wait_ms': 60, 'requests_waiting': 2,
+        }
+        record_pool_stats('pooled', pool)
+        pool.pop_stats.return_value = {'pool_max': 4, 'pool_size': 2, 'pool_available': 2, 'requests_num': 10}
+        record_pool_stats('pooled', pool)
+
+        self.assertEqual(self.metric('db_pool_connections', database='pooled', state='in_use'), 0)
+        self.assertEqual(self.metric('db_pool_connections', database='pooled', state='available'), 2)
+        self.assertEqual(self.metric('db_pool_max_connections', database='pooled'), 4)
+        self.assertEqual(self.metric('db_pool_waiting_requests', database='pooled'), 0)
+        # The counters add what each `pop_stats()` reported.
+        self.assertEqual(self.metric('db_pool_checkouts_total', database='pooled'), 60)
+        self.assertEqual(self.metric('db_pool_checkouts_queued_total', database='pooled'), 5)
+        self.assertAlmostEqual(self.metric('db_pool_checkout_wait_seconds_total', database='pooled'), 0.06)
+
+    def test_pools_are_recorded_after_each_request(self):
+        pool = mock.Mock()
+        pool.pop_stats.return_value = {'pool_max': 4, 'pool_size': 3, 'pool_available': 0, 'requests_waiting': 1}
+        with mock.patch('tasks.dbstats.get_pool', return_value=pool):
+            self.client.get(reverse('task_list'))
+        pool.pop_stats.assert_called()
+        self.assertEqual(self.metric('db_pool_connections', database='default', state='in_use'), 3)
+        self.assertEqual(self.metric('db_pool_waiting_requests', database='default'), 1)
+
+
+class TaskSummaryTest(UserTestCase):
+    """
+        The incrementally maintained summary must always match a full rebuild.
+    """
+
+    login = False
+
+    def setUp(self):
+        super().setUp()
+        self.other = create_user('other')
+
+    def snapshot(self):
+        rows = TaskSummary.objects.exclude(task_count=0, estimated_minutes=0)
+        return set(rows.values_list('user_id', 'status', 'task_count', 'estimated_minutes'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_summaries()
+        self.assertEqual(incremental, self.snapshot())
+        return incremental
+
+    def test_signals_keep_summary_in_sync(self):
+        first = Task.objects.create(user=self.user, name='Primeira')
+        second = Task.objects.create(user=self.user, name='Segunda')
+        self.assertEqual(self.assertMatchesRebuild(), {(self.user.pk, '', 2, 0)})
+
+        entry = TimeEntry.objects.create(task=first, date=datetime.date(2024, 10, 1), estimated_time='2h')
+        self.assertEqual(self.assertMatchesRebuild(), {(self.user.pk, '', 1, 0), (self.user.pk, 'pendente', 1, 120)})
+
+        entry.status = 'feito'
+        entry.estimated_time = '1d'
+        entry.save()
+        self.assertMatchesRebuild()
+
+        entry.task = second
+        entry.save()
+        second.user = self.other
+        second.save()
+        self.assertEqual(self.assertMatchesRebuild(), {(self.user.pk, '', 1, 0), (self.other.pk, 'feito', 1, 480)})
+
+        previous = task_states([second.pk])
+        TimeEntry.objects.set_statuses({second.pk: 'reavaliar'})
+        time_entries_changed.send(sender=TimeEntry, task_ids=[second.pk], previous=previous)
+        self.assertEqual(self.assertMatchesRebuild(), {(self.user.pk, '', 1, 0), (self.other.pk, 'reavaliar', 1, 480)})
+
+        second.delete()
+        self.assertEqual(self.assertMatchesRebuild(), {(self.user.pk, '', 1, 0)})
+
+        TimeEntry.objects.create(task=first, date=datetime.date(2024, 10, 1), estimated_time='30m')
+        self.user.delete()
+        self.assertFalse(TaskSummary.objects.exists())
+
+    def test_migration_seeds_the_existing_rows(self):
+        seed_summaries = import_module('tasks.migrations.0005_task_summary').seed_summaries
+        Task.objects.create(user=self.user, name='Sem registro')
+        task = Task.objects.create(user=self.user, name='Primeira')
+        TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time='2h', status='feito')
+        expected = self.snapshot()
+        TaskSummary.objects.all().delete()
+
+        seed_summaries(apps, mock.Mock(connection=connection))
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_home_reads_the_summary(self):
+        task = Task.objects.create(user=self.user, name='Primeira')
+        TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, 1), estimated_time='1h 30m', status='feito')
+        Task.objects.create(user=self.other, name='Outra')
+        self.client.force_login(self.user)
+
+        response = self.client.get(reverse('home'))
+        (title, rows), = response.context['summaries']
+        self.assertEqual(rows, [{'status': 'feito', 'label': 'Feito', 'tasks': 1, 'hours': 1.5}])
+
+        self.user.groups.add(Group.objects.get(name='tasks'))
+        response = self.client.get(reverse('home'))
+        title, rows = response.context['summaries'][1]
+        self.assertEqual([(row['status'], row['tasks']) for row in rows], [('', 1), ('feito', 1)])
+
+
+class TimeRollupTest(UserTestCase):
+
+    login = False
+
+    def setUp(self):
+        super().setUp()
+        self.other = create_user('other')
+
+    def create_entry(self, user, date, estimated_time):
+        task = Task.objects.create(user=user, name=f'{date} {estimated_time}')
+        return TimeEntry.objects.create(task=task, date=date, estimated_time=estimated_time)
+
+    def rollups(self, period):
+        rows = TimeRollup.objects.filter(period=period)
+        return set(rows.values_list('user_id', 'start', 'entry_count', 'estimated_minutes'))
+
+    def test_refresh_only_recomputes_touched_buckets(self):
+        monday = datetime.date(2024, 9, 30)
+        entry = self.create_entry(self.user, datetime.date(2024, 10, 2), '2h')
+        self.create_entry(self.user, datetime.date(2024, 10, 3), '1h')
+        self.create_entry(self.other, datetime.date(2024, 10, 10), '1d')
+        refresh_rollups()
+        self.assertEqual(self.rollups(TimeRollup.WEEK), {
+            (self.user.pk, monday, 2, 180),
+            (self.other.pk, datetime.date(2024, 10, 7), 1, 480),
+        })
+        self.assertEqual(self.rollups(TimeRollup.MONTH), {
+            (self.user.pk, datetime.date(2024, 10, 1), 2, 180),
+            (self.other.pk, datetime.date(2024, 10, 1), 1, 480),
+        })
+
+        # A bucket nobody touched is left alone (its wrong value survives), the others are recomputed.
+        TimeRollup.objects.filter(user=self.other, period=TimeRollup.WEEK).update(entry_count=99)
+        entry.date = datetime.date(2024, 10, 21)
+        entry.save()
+        with mock.patch('tasks.rollups.WATERMARK_OVERLAP', datetime.timedelta(0)):
+            refresh_rollups()
+        self.assertEqual(self.rollups(TimeRollup.WEEK), {
+            (self.user.pk, monday, 1, 60),
+            (self.user.pk, datetime.date(2024, 10, 21), 1, 120),
+            (self.other.pk, datetime.date(2024, 10, 7), 99, 480),
+        })
+
+        refresh_rollups(full=True)
+        self.assertIn((self.other.pk, datetime.date(2024, 10, 7), 1, 480), self.rollups(TimeRollup.WEEK))
+
+    def test_deleted_and_reassigned_entries_leave_their_old_buckets(self):
+        entry = self.create_entry(self.user, datetime.date(2024, 10, 2), '2h')
+        removed = self.create_entry(self.user, datetime.date(2024, 11, 5), '1h')
+        refresh_rollups()
+
+        removed.task.delete()
+        entry.task.user = self.other
+        entry.task.save()
+        refresh_rollups()
+        self.assertEqual(self.rollups(TimeRollup.MONTH), {(self.other.pk, datetime.date(2024, 10, 1), 1, 120)})
+
+    def test_report_reads_rollups(self):
+        self.user.groups.add(Group.objects.get(name='timeEntry'))
+        self.client.force_login(self.user)
+        self.create_entry(self.user, datetime.date(2024, 10, 2), '2h')
+        self.create_entry(self.other, datetime.date(2024, 10, 9), '1h')
+        refresh_rollups()
+
+        response = self.client.get(reverse('time_rollup_report'), {'date_from': '2024-10-03', 'date_to': '2024-10-31'})
+        self.assertEqual([row.estimated_minutes for row in response.context['rollups']], [60, 120])
+        self.assertEqual(response.context['total_estimated_hours'], 3)
+
+        response = self.client.get(reverse('time_rollup_report'), {'period': 'month', 'user': self.other.pk})
+        self.assertEqual([(row.start, row.estimated_minutes) for row in response.context['rollups']], [(datetime.date(2024, 10, 1), 60)])
+
+
+class AutocompleteTest(UserTestCase):
+
+    groups = ('tasks',)
+
+    def setUp(self):
+        super().setUp()
+        for name in ('Relatorio mensal', 'relatorio anual', 'Reuniao', 'Deploy'):
+            Task.objects.create(user=self.user, name=name)
+
+    def search(self, url_name, term):
+        response = self.client.get(reverse(url_name), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return [result['text'] for result in response.json()['results']]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.search('task_autocomplete', 'relat'), ['Relatorio mensal', 'relatorio anual'])
+        self.assertEqual(self.search('task_autocomplete', 'mensal'), [])
+        self.assertEqual(self.search('task_autocomplete', ''), [])
+        self.assertEqual(self.search('user_autocomplete', 'TEST'), ['tester@example.com'])
+
+    def test_results_are_limited(self):
+        for i in range(30):
+            Task.objects.create(user=self.user, name=f'Lote {i}')
+        self.assertEqual(len(self.search('task_autocomplete', 'lote')), 20)
+
+    def test_forms_render_only_the_selected_rows(self):
+        task = Task.objects.get(name='Deploy')
+        html = str(TimeEntryFilterForm({'task': task.pk})['task'])
+        self.assertIn('Deploy', html)
+        self.assertNotIn('Reuniao', html)
+        self.assertIn(reverse('task_autocomplete'), html)
+
+        form = TaskForm({'user': self.user.pk, 'name': 'Nova'})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['user'], self.user)
+        self.assertNotIn('<option value="" selected>', str(form['user']))
+        self.assertFalse(TaskForm({'user': 999999, 'name': 'Nova'}).is_valid())
+
+
+class ExcerptTest(UserTestCase):
+
+    groups = ('tasks', 'timeEntry')
+
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(user=self.user, name='Tarefa', description='<p>Revisar o <b>contrato</b> &amp; anexos</p>')
+        self.entry = TimeEntry.objects.create(
+            task=self.task, date=datetime.date(2024, 10, 1), estimated_time='1h', description='<ul><li>Medido</li></ul>',
+        )
+
+    def test_excerpts_are_stored_on_save(self):
+        self.assertEqual(self.task.excerpt, 'Revisar o contrato & anexos')
+        self.assertEqual(self.entry.excerpt, 'Medido')
+
+        self.task.description = '<p>' + 'x' * 500 + '</p>'
+        self.task.save(update_fields=['description'])
+        self.task.refresh_from_db()
+        self.assertEqual(len(self.task.excerpt), 200)
+
+    def test_backfill(self):
+        Task.objects.update(excerpt='')
+        TimeEntry.objects.update(excerpt='')
+        call_command('backfill_excerpts', stdout=StringIO())
+        self.assertEqual(Task.objects.get().excerpt, 'Revisar o contrato & anexos')
+        self.assertEqual(TimeEntry.objects.get().excerpt, 'Medido')
+
+    def test_migration_fills_existing_rows(self):
+        backfill = import_module('tasks.migrations.0008_excerpts').backfill_excerpts
+        Task.objects.update(excerpt='')
+        TimeEntry.objects.update(excerpt='')
+        backfill(apps, mock.Mock(connection=connection), batch_size=1)
+        self.assertEqual(Task.objects.get().excerpt, 'Revisar o contrato & anexos')
+        self.assertEqual(TimeEntry.objects.get().excerpt, 'Medido')
+
+    def test_lists_do_not_load_descriptions(self):
+        for url_name, excerpt in (('task_list', 'Revisar o contrato'), ('time_entry_list', 'Medido')):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse(url_name))
+            self.assertContains(response, excerpt)
+            sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+            self.assertNotIn('"tasks_task"."description"', sql, url_name)
+            self.assertNotIn('"tasks_timeentry"."description"', sql, url_name)
+
+
+class AsyncViewsTest(UserTestCase):
+
+    groups = ('tasks', 'timeEntry')
+    login = False
+
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            task = Task.objects.create(user=self.user, name=f'Tarefa {i}')
+            TimeEntry.objects.create(task=task, date=datetime.date(2024, 10, i + 1), estimated_time='1d', status='feito')
+
+    async def test_async_lists_match_sync_ones(self):
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(reverse('task_list_async'))
+        self.assertContains(response, 'Tarefa 2')
+        self.assertEqual(len(response.context['table_fragment'].split('<tr>')), 5)
+
+        response = await self.async_client.get(reverse('time_entry_list_async'), {'date_from': '2024-10-02'})
+        self.assertContains(response, 'Tarefa 1')
+        self.assertNotContains(response, 'Tarefa 0')
+        self.assertContains(response, '<th colspan="5">16.0</th>')
+
+    async def test_async_chart_matches_sync_chart(self):
+        await self.async_client.aforce_login(self.user)
+        for group_by in ('task', 'user', 'status'):
+            async_data = (await self.async_client.get(reverse('task_chart_data_async'), {'group_by': group_by})).json()
+            await cache.aclear()
+            sync_data = (await self.async_client.get(reverse('task_chart_data'), {'group_by': group_by})).json()
+            self.assertEqual(async_data, sync_data)
+
+    async def test_access_is_checked(self):
+        response = await self.async_client.get(reverse('task_list_async'))
+        self.assertEqual(response.status_code, 302)
+
+        outsider = await CustomUser.objects.acreate(username='outsider', email='outsider@example.com')
+        await self.async_client.aforce_login(outsider)
+        response = await self.async_client.get(reverse('task_chart_data_async'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ImageVariantsTest(TestCase):
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.media = Path(media.name)
+        (self.media / 'uploads/2024/10/01').mkdir(parents=True)
+        self.png()
+
+    def png(self, name='uploads/2024/10/01/print.png', size=(2000, 1000)):
+        output = BytesIO()
+        Image.new('RGB', size, 'navy').save(output, format='PNG')
+        (self.media / name).write_bytes(output.getvalue())
+        return output.getvalue()
+
+    def test_generates_webp_and_smaller_copies(self):
+        written = generate_variants('uploads/2024/10/01/print.png')
+        self.assertEqual(sorted(written), sorted([
+            'uploads/2024/10/01/print.png.webp',
+            *[f'uploads/2024/10/01/print.png.w{width}.{extension}' for width in (480, 960, 1920) for extension in ('webp', 'png')],
+        ]))
+        with Image.open(self.media / 'uploads/2024/10/01/print.png.w960.webp') as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (960, 480)))
+        self.assertEqual(generate_variants('uploads/2024/10/01/print.png.w960.webp'), [])
+
+    def test_images_point_to_the_best_variant(self):
+        html = '<p><img alt="" src="/media/uploads/2024/10/01/print.png" style="width: 300px" /><img src="https://example.com/a.png" /></p>'
+        self.assertEqual(responsive_images(html), html)  # no variants yet
+
+        generate_variants('uploads/2024/10/01/print.png')
+        self.assertEqual(
+            responsive_images(html),
+            '<p><img alt="" src="/media/uploads/2024/10/01/print.png.w960.webp" style="width: 300px" /><img src="https://example.com/a.png" /></p>',
+        )
+        resized = '<img src="/media/uploads/2024/10/01/print.png.w960.webp" width="200" />'
+        self.assertEqual(responsive_images(resized), '<img src="/media/uploads/2024/10/01/print.png.w480.webp" width="200" />')
+        self.assertEqual(
+            responsive_images('<img src="/media/uploads/2024/10/01/print.png" />'),
+            '<img src="/media/uploads/2024/10/01/print.png.webp" />',
+        )
+
+    def test_uploads_schedule_the_variants(self):
+        staff = create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        upload = SimpleUploadedFile('captura.png', self.png('uploads/source.png', (800, 600)), content_type='image/png')
+
+        with mock.patch('tasks.images.schedule_variants') as schedule:
+            response = self.client.post(reverse('ckeditor_upload'), {'upload': upload})
+        self.assertEqual(response.status_code, 200)
+        name, = schedule.call_args.args
+        self.assertTrue(name.startswith('uploads/') and name.endswith('captura.png'), name)
+
+    def test_description_saved_before_the_variants_is_rewritten_when_they_are_ready(self):
+        user = create_user()
+        html = '<p><img src="/media/uploads/2024/10/01/print.png" width="400" /></p>'
+        form = TaskForm(data={'user': user.pk, 'name': 'Com imagem', 'description': html})
+        self.assertTrue(form.is_valid(), form.errors)
+        task = form.save()
+        self.assertEqual(task.description, html)
+
+        future = Future()
+        future.set_result(generate_variants('uploads/2024/10/01/print.png'))
+        with mock.patch('tasks.images.threading.Thread') as thread:
+            variants_ready('uploads/2024/10/01/print.png', future)
+        self.assertEqual(thread.call_args.kwargs['args'], ('uploads/2024/10/01/print.png',))
+
+        self.assertEqual(rewrite_references('uploads/2024/10/01/print.png'), 1)
+        task.refresh_from_db()
+        self.assertEqual(task.description, '<p><img src="/media/uploads/2024/10/01/print.png.w960.webp" width="400" /></p>')
+
+    def test_backfill_generates_variants_and_rewrites_descriptions(self):
+        user = create_user()
+        task = Task.objects.create(user=user, name='Com imagem', description='<p><img src="/media/uploads/2024/10/01/print.png" width="400" /></p>')
+
+        call_command('backfill_image_variants', workers=0, stdout=StringIO())
+        task.refresh_from_db()
+        self.assertEqual(task.description, '<p><img src="/media/uploads/2024/10/01/print.png.w960.webp" width="400" /></p>')
+        self.assertTrue((self.media / 'uploads/2024/10/01/print.png.w1920.png').exists())
+
+        out = StringIO()
+        call_command('backfill_image_variants', workers=0, stdout=out)
+        self.assertIn('0 images processed', out.getvalue())
@@ -1,11 +1,24 @@
 from django.urls import path
-from .views import TaskLisView, TaskCreateView, TaskUpdateView, TaskDeleteView, TimeEntryListView
+from .async_views import AsyncTaskListView, AsyncTimeEntryListView, AsyncTaskChartDataView
+from .views import TaskLisView, TaskCreateView, TaskUpdateView, TaskDeleteView, TimeEntryListView, TaskChartDataView, TaskStatusUpdateView, TimeEntryExportView, FragmentCacheStatsView, TimeRollupReportView, UserAutocompleteView, TaskAutocompleteView
 
 urlpatterns = [
     path('', TaskLisView.as_view(), name='task_list'),
     path('create/', TaskCreateView.as_view(), name='task_create'),
     path('update/<int:pk>/', TaskUpdateView.as_view(), name='task_update'),
     path('delete/<int:pk>/', TaskDeleteView.as_view(), name='task_delete'),
+    path('chart-data/', TaskChartDataView.as_view(), name='task_chart_data'),
+    path('status/', TaskStatusUpdateView.as_view(), name='task_status_update'),
+    path('cache-stats/', FragmentCacheStatsView.as_view(), name='fragment_cache_stats'),
+    path('autocomplete/users/', UserAutocompleteView.as_view(), name='user_autocomplete'),
+    path('autocomplete/tasks/', TaskAutocompleteView.as_view(), name='task_autocomplete'),
 
      path('time-entries/', TimeEntryListView.as_view(), name='time_entry_list'),
+     path('time-entries/export/', TimeEntryExportView.as_view(), name='time_entry_export'),
+     path('time-entries/report/', TimeRollupReportView.as_view(), name='time_rollup_report'),
+
+    # Async versions of the read-heavy views, for ASGI deployments (see tasks.async_views).
+    path('async/', AsyncTaskListView.as_view(), name='task_list_async'),
+    path('async/chart-data/', AsyncTaskChartDataView.as_view(), name='task_chart_data_async'),
+    path('async/time-entries/', AsyncTimeEntryListView.as_view(), name='time_entry_list_async'),
 ]
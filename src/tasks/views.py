@@ -1,15 +1,55 @@
+import csv
+import json
+
 from django.shortcuts import render, redirect
 from django.urls import reverse_lazy
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView
-from braces.views import GroupRequiredMixin
-from .models import Task, TimeEntry
-from .forms import TaskForm, TimeEntryFormSet, TimeEntryFilterForm
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.views.generic import View, ListView, CreateView, UpdateView, DeleteView
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from perfil_users.mixins import GroupRequiredMixin
+from perfil_users.models import CustomUser
+from .models import RollupWatermark, Task, TimeEntry, TimeRollup
+from .duration import minutes_to_hours
+from .cache import CachedFragmentMixin, fragment_stats, get_or_build_chart
+from .signals import time_entries_changed
+from .summary import task_states
+from .pagination import KeysetPaginationMixin
+from .forms import TaskForm, TimeEntryFormSet, TimeEntryFilterForm, TimeRollupFilterForm
+from .rollups import WATERMARK_NAME
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_protect
 
 
-class TaskLisView(GroupRequiredMixin, LoginRequiredMixin, ListView):
+def task_rows(tasks):
+    """
+        Builds the rows of the task table from tasks fetched with their user and time entry.
+    """
+    rows = []
+    for task in tasks:
+        entry = getattr(task, 'task', None)
+        time_entries = [entry] if entry is not None else []
+        rows.append({
+            'id': task.id,
+            'name': task.name,
+            'user': task.user.username,
+            'excerpt': task.excerpt,
+            'stimed': task.created_at.strftime('%d-%m-%Y'),
+            'estimated_hours': ', '.join(entry.estimated_time for entry in time_entries),
+            'init_date': ', '.join(entry.date.strftime('%d-%m-%Y') for entry in time_entries),
+            'status': ', '.join(entry.status for entry in time_entries),
+            'total_estimated_hours': minutes_to_hours(sum(entry.estimated_minutes for entry in time_entries))
+        })
+    return rows
+
+
+# Large columns of a time entry the list pages never display.
+ENTRY_DEFERRED_FIELDS = ('description', 'search_document', 'search_vector')
+
+
+class TaskLisView(GroupRequiredMixin, LoginRequiredMixin, CachedFragmentMixin, KeysetPaginationMixin, ListView):
     """
         View that lists all tasks in the system along with their associated time entries.
 
@@ -18,17 +58,24 @@ class TaskLisView(GroupRequiredMixin, LoginRequiredMixin, ListView):
             model: The Django model `Task`, representing the task entities that will be listed.
             template_name: The HTML template used to render the task list.
             context_object_name: The context variable name for the list of tasks in the template.
+            keyset_fields: The cursor used to paginate the list, newest tasks first.
+            fragment_name / fragment_template_name: The cached table of the list (see `tasks.cache.CachedFragmentMixin`).
 
         Methods:
+            get_queryset:
+                - Loads each task together with its user and its time entry in a single joined query.
+
             get_context_data: 
                 - Extends the default context with additional information, including time entries related to each task.
-                - Iterates over all tasks to gather relevant data, such as estimated hours, task initiation date, and task status.
+                - Builds the rows in a single pass over the joined queryset, without extra queries per task.
+                - The rich-text descriptions are deferred; rows carry the stored plain-text excerpt instead.
                 - Returns the modified context that includes a list of tasks and their time entries.
 
             post:
-                - Handles POST requests to update the status of a time entry.
+                - Fallback for browsers without JavaScript; the dropdown normally uses `TaskStatusUpdateView`.
                 - Fetches the task ID and the new status from the request.
-                - Updates the `status` field of the corresponding `TimeEntry` and saves the changes.
+                - Updates the `status` field of the corresponding `TimeEntry` with a single UPDATE,
+                  and sends the previous state so the dashboard counters are adjusted, not rebuilt.
                 - Redirects back to the task list view after updating the status.
 
         Expected Output:
@@ -40,27 +87,21 @@ class TaskLisView(GroupRequiredMixin, LoginRequiredMixin, ListView):
     model = Task
     template_name = "tasks/task_list.html"
     context_object_name = 'tasks'
+    keyset_fields = ('created_at', 'id')
+    fragment_name = 'task_table'
+    fragment_template_name = "tasks/task_table.html"
+
+    def get_queryset(self):
+        # `task` is the reverse side of TimeEntry's OneToOneField, so the
+        # entry and the user come in the same JOIN as the task itself.
+        # The rich-text bodies are left out: the table shows the stored excerpt.
+        return super().get_queryset().select_related('user', 'task').defer(
+            'description', *[f'task__{name}' for name in ENTRY_DEFERRED_FIELDS]
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        tasks_with_time = []
-
-        for task in context['tasks']:
-            time_entries = TimeEntry.objects.filter(task=task)            
-            total_estimated_hours = sum(entry.hours_estimated for entry in time_entries)       
-            tasks_with_time.append({
-                'id': task.id,
-                'name': task.name,
-                'user': task.user.username, 
-                'description': task.description,                
-                'stimed': task.created_at.strftime('%d-%m-%Y'),
-                'estimated_hours': ', '.join(entry.estimated_time for entry in time_entries), 
-                'init_date': ', '.join(entry.date.strftime('%d-%m-%Y') for entry in time_entries),
-                'status': ', '.join(entry.status for entry in time_entries),
-                'total_estimated_hours': total_estimated_hours  
-            })
-
-        context['tasks_with_time'] = tasks_with_time
+        context['tasks_with_time'] = task_rows(context['tasks'])
         return context
     
     @method_decorator(csrf_protect)
@@ -68,14 +109,10 @@ class TaskLisView(GroupRequiredMixin, LoginRequiredMixin, ListView):
         task_id = request.POST.get('task_id')
         new_status = request.POST.get('status')
 
-        if task_id and new_status:
-            try:
-                task = TimeEntry.objects.get(task=task_id)
-                print(task)
-                task.status = new_status
-                task.save()
-            except TimeEntry.DoesNotExist:
-                pass
+        if task_id and task_id.isdigit() and new_status in TaskStatusUpdateView.valid_statuses():
+            previous = task_states([int(task_id)])
+            if TimeEntry.objects.set_statuses({int(task_id): new_status}):
+                time_entries_changed.send(sender=TimeEntry, task_ids=[int(task_id)], previous=previous)
 
         return redirect(reverse_lazy('task_list')) 
 
@@ -225,7 +262,7 @@ class TaskDeleteView(GroupRequiredMixin, LoginRequiredMixin, DeleteView):
 
 
 
-class TimeEntryListView(GroupRequiredMixin, LoginRequiredMixin, ListView):
+class TimeEntryListView(GroupRequiredMixin, LoginRequiredMixin, CachedFragmentMixin, KeysetPaginationMixin, ListView):
     """
     View that lists all time entries in the system with filtering capabilities.
 
@@ -234,56 +271,401 @@ class TimeEntryListView(GroupRequiredMixin, LoginRequiredMixin, ListView):
         model: The Django model `TimeEntry`, representing the time entry entities that will be listed.
         template_name: The HTML template used to render the time entry list.
         context_object_name: The context variable name for the list of time entries in the template.
+        keyset_fields: The cursor used to paginate the list, most recent entries first.
+        fragment_name / fragment_template_name: The cached table of the list (see `tasks.cache.CachedFragmentMixin`).
 
     Methods:
         get_queryset: 
             - Overrides the default queryset to apply filters based on user input from the TimeEntryFilterForm.
-            - Filters entries based on various criteria like date, estimated time, description, status, user, and task.
+            - Filters entries based on various criteria like date, estimated time, description, status, user, and task,
+              through `TimeEntryFilterForm.filter_queryset`.
+            - Joins the related task and user so each row renders without extra queries.
+            - Defers the rich-text descriptions and the search columns; the table shows the stored excerpt.
+            - The description filter runs a full-text search over the task name, the task description and
+              the entry description (see `tasks.search`), ordering the results by relevance.
+
+        get_keyset_fields:
+            - Paginates by date, or by search rank when a description search is active.
 
         get_context_data: 
-            - Adds the filter form to the context for rendering in the template.
-            - Returns the modified context that includes the filter form and the filtered time entries.
+            - Adds the total estimated hours of the filtered entries, summed in the database.
+            - Returns the context used to render the (cached) table of time entries.
+
+        get_page_context_data:
+            - Adds the filter form and the querystrings of the export links, rendered outside the cached table.
 
     Expected Output:
         - Renders a list of time entries with filtering options for date range, estimated time, description, status, user, and task.
+        - Paginates the list with next/previous cursors that keep the active filters.
     """
     group_required = u"timeEntry"
     model = TimeEntry
     template_name = "tasks/time_entry_list.html"
     context_object_name = 'entries'
+    keyset_fields = ('date', 'id')
+    fragment_name = 'time_entry_table'
+    fragment_template_name = "tasks/time_entry_table.html"
+    searching = False
+
+    def get_keyset_fields(self):
+        # Search results are listed by relevance, most relevant first.
+        if self.searching:
+            return ('search_rank', 'id')
+        return self.keyset_fields
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('task__user').defer(*ENTRY_DEFERRED_FIELDS, 'task__description')
         form = TimeEntryFilterForm(self.request.GET)
 
         if form.is_valid():
-            date_from = form.cleaned_data.get('date_from')
-            date_to = form.cleaned_data.get('date_to')
-            
-            if date_from:
-                queryset = queryset.filter(date__gte=date_from)
-            if date_to:
-                queryset = queryset.filter(date__lte=date_to)
-            estimated_time = form.cleaned_data.get('estimated_time')
-            if estimated_time:
-                queryset = queryset.filter(estimated_time=estimated_time)
-            description = form.cleaned_data.get('description')
-            if description:
-                queryset = queryset.filter(description__icontains=description)
-            status = form.cleaned_data.get('status')
-            if status:
-                queryset = queryset.filter(status=status)
-            user = form.cleaned_data.get('user')
-            if user:
-                queryset = queryset.filter(task__user=user) 
-            task = form.cleaned_data.get('task')
-            if task:
-                queryset = queryset.filter(task=task)
+            queryset = form.filter_queryset(queryset)
+            self.searching = 'search_rank' in queryset.query.annotations
 
         return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['form'] = TimeEntryFilterForm(self.request.GET or None)
+        context['total_estimated_hours'] = self.object_list.total_estimated_hours()
         return context
 
+    def get_page_context_data(self, **kwargs):
+        kwargs['form'] = TimeEntryFilterForm(self.request.GET or None)
+        kwargs['export_querystrings'] = {export_format: self.build_export_querystring(export_format) for export_format in ('csv', 'ndjson')}
+        return kwargs
+
+    def build_export_querystring(self, export_format):
+        # The export takes the same filters as the list, but neither the page cursor nor a previous format.
+        params = self.request.GET.copy()
+        for name in ('after', 'before', 'format'):
+            params.pop(name, None)
+        params['format'] = export_format
+        return params.urlencode()
+
+
+
+class TaskChartDataView(GroupRequiredMixin, LoginRequiredMixin, View):
+    """
+        JSON endpoint that feeds the estimated time chart of the task list.
+
+        Attributes:
+            group_required: The group required to access this view. Only users in the "tasks" group can read the chart.
+            group_by_choices: The supported groupings, selected with the `group_by` querystring parameter.
+            default_limit: How many tasks are returned when grouping by task (the ones with the most hours).
+
+        Methods:
+            get:
+                - Returns `{"group_by", "labels", "hours"}`, with the estimated hours summed in SQL with `GROUP BY`.
+                - The result is cached until a task or time entry is saved or deleted (see `tasks.cache`).
+
+        Expected Output:
+            - The task list modal fetches this endpoint only when it's opened, so the page itself no longer
+              carries the chart data.
+    """
+    group_required = u"tasks"
+    group_by_choices = ('task', 'user', 'status')
+    default_limit = 50
+
+    def get_params(self, request):
+        """
+            Returns the `(group_by, limit)` of the request; raises ValueError for an unsupported `group_by`.
+        """
+        group_by = request.GET.get('group_by', 'task')
+        if group_by not in self.group_by_choices:
+            raise ValueError(f"group_by must be one of: {', '.join(self.group_by_choices)}")
+        try:
+            limit = max(1, min(int(request.GET.get('limit', self.default_limit)), 500))
+        except ValueError:
+            limit = self.default_limit
+        return group_by, limit
+
+    def get(self, request, *args, **kwargs):
+        try:
+            group_by, limit = self.get_params(request)
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+
+        data = get_or_build_chart(group_by, limit, lambda: self.build_chart(group_by, limit))
+        return JsonResponse(data)
+
+    def chart_rows(self, group_by, limit):
+        if group_by == 'task':
+            return (Task.objects.values('id', 'name')
+                    .annotate(total_minutes=Coalesce(Sum('task__estimated_minutes'), 0))
+                    .order_by('-total_minutes', 'id')[:limit])
+        if group_by == 'user':
+            return TimeEntry.objects.estimated_minutes_by('task__user__username')
+        return TimeEntry.objects.estimated_minutes_by('status')
+
+    def chart_data(self, group_by, rows):
+        if group_by == 'task':
+            labels = [row['name'] for row in rows]
+        elif group_by == 'user':
+            labels = [row['task__user__username'] for row in rows]
+        else:
+            names = dict(TimeEntry.STATUS_CHOICES)
+            labels = [names.get(row['status'], row['status']) for row in rows]
+
+        return {
+            'group_by': group_by,
+            'labels': labels,
+            'hours': [minutes_to_hours(row['total_minutes']) for row in rows],
+        }
+
+    def build_chart(self, group_by, limit):
+        return self.chart_data(group_by, list(self.chart_rows(group_by, limit)))
+
+
+class TaskStatusUpdateView(GroupRequiredMixin, LoginRequiredMixin, View):
+    """
+        JSON endpoint used by the status dropdown of the task list.
+
+        Attributes:
+            group_required: The group required to access this view. Only users in the "tasks" group can change a status.
+
+        Methods:
+            post:
+                - Accepts a JSON body with one `{"task_id": 1, "status": "feito"}` pair, a list of pairs,
+                  or `{"updates": [...]}`.
+                - Validates every pair against `TimeEntry.STATUS_CHOICES`; if any pair is invalid nothing is applied.
+                - Applies all the pairs with a single UPDATE statement (`TimeEntryQuerySet.set_statuses`).
+
+        Expected Output:
+            - `{"updated": [...], "not_found": [...]}` with the task ids that were changed and the ones without a time entry,
+              or status 400 with `{"errors": [...]}`.
+    """
+    group_required = u"tasks"
+    http_method_names = ['post']
+
+    @staticmethod
+    def valid_statuses():
+        return {value for value, label in TimeEntry.STATUS_CHOICES if value}
+
+    def parse_updates(self, body):
+        if isinstance(body, dict):
+            body = body.get('updates', [body])
+        if not isinstance(body, list) or not body:
+            return {}, ['O corpo deve ser um objeto {task_id, status} ou uma lista deles.']
+
+        statuses, errors, valid = {}, [], self.valid_statuses()
+        for position, item in enumerate(body):
+            task_id = item.get('task_id') if isinstance(item, dict) else None
+            status = item.get('status') if isinstance(item, dict) else None
+            if isinstance(task_id, str) and task_id.isdigit():
+                task_id = int(task_id)
+            if not isinstance(task_id, int) or isinstance(task_id, bool):
+                errors.append(f'Item {position}: task_id inválido.')
+            elif status not in valid:
+                errors.append(f'Item {position}: status inválido "{status}".')
+            else:
+                statuses[task_id] = status
+        return statuses, errors
+
+    def post(self, request, *args, **kwargs):
+        try:
+            body = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'errors': ['JSON inválido.']}, status=400)
+
+        statuses, errors = self.parse_updates(body)
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+
+        previous = {task_id: state for task_id, state in task_states(statuses).items() if state[1] is not None}
+        existing = set(previous)
+        TimeEntry.objects.set_statuses({task_id: statuses[task_id] for task_id in existing})
+        if existing:
+            time_entries_changed.send(sender=TimeEntry, task_ids=sorted(existing), previous=previous)
+
+        return JsonResponse({
+            'updated': [{'task_id': task_id, 'status': statuses[task_id]} for task_id in sorted(existing)],
+            'not_found': sorted(set(statuses) - existing),
+        })
+
+
+class Echo:
+    """
+        Pseudo-buffer for `csv.writer`: `write` hands the formatted line back instead of storing it.
+    """
+
+    def write(self, value):
+        return value
+
+
+class TimeEntryExportView(GroupRequiredMixin, LoginRequiredMixin, View):
+    """
+        Streams the time entries selected by the `TimeEntryFilterForm` filters as CSV or NDJSON.
+
+        Attributes:
+            group_required: The group required to access this view. Only users in the "timeEntry" group can export.
+            columns: The exported columns, as `(header, field lookup)` pairs; task and user are joined in the same query.
+            chunk_size: How many rows are fetched per round trip from the server-side cursor.
+
+        Methods:
+            get:
+                - Validates the filters with `TimeEntryFilterForm` and applies them with `filter_queryset`, exactly like
+                  `TimeEntryListView`; the `format` parameter selects `csv` (default) or `ndjson`.
+                - Streams the rows with `StreamingHttpResponse` over `iterator(chunk_size=...)`, so memory use is
+                  constant and the first bytes are sent right away.
+
+        Expected Output:
+            - A downloadable `time-entries.csv` or `time-entries.ndjson`, or status 400 with the form errors.
+    """
+    group_required = u"timeEntry"
+    columns = (
+        ('id', 'id'),
+        ('date', 'date'),
+        ('estimated_time', 'estimated_time'),
+        ('estimated_minutes', 'estimated_minutes'),
+        ('status', 'status'),
+        ('task_id', 'task_id'),
+        ('task', 'task__name'),
+        ('user', 'task__user__username'),
+        ('user_email', 'task__user__email'),
+    )
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in ('csv', 'ndjson'):
+            return JsonResponse({'errors': ['format deve ser csv ou ndjson.']}, status=400)
+
+        form = TimeEntryFilterForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+
+        headers = [header for header, lookup in self.columns]
+        rows = (form.filter_queryset(TimeEntry.objects.all())
+                .order_by('date', 'id')
+                .values_list(*[lookup for header, lookup in self.columns])
+                .iterator(chunk_size=self.chunk_size))
+
+        if export_format == 'csv':
+            writer = csv.writer(Echo())
+            content = (writer.writerow(row) for row in self.with_header(headers, rows))
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            content = (json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="time-entries.{export_format}"'
+        return response
+
+    @staticmethod
+    def with_header(headers, rows):
+        yield headers
+        yield from rows
+
+
+class TimeRollupReportView(GroupRequiredMixin, LoginRequiredMixin, KeysetPaginationMixin, ListView):
+    """
+    Report of the estimated hours of each user per week or per month.
+
+    Reads the precomputed `TimeRollup` rows, refreshed by the `refresh_rollups` command, so the report
+    costs the same whatever the size of the time entry history.
+
+    Attributes:
+        group_required: The group required to access this view. Only users in the "timeEntry" group can access the report.
+        model: The Django model `TimeRollup`.
+        template_name: The HTML template used to render the report.
+        context_object_name: The context variable name for the rollup rows in the template.
+        keyset_fields: The cursor used to paginate the report, most recent periods first.
+
+    Methods:
+        get_queryset:
+            - Filters the rollups by period, date range and user through `TimeRollupFilterForm`.
+        get_context_data:
+            - Adds the filter form, the total estimated hours of the filtered rows and when the rollups
+              were last refreshed.
+    """
+    group_required = u"timeEntry"
+    model = TimeRollup
+    template_name = "tasks/time_rollup_report.html"
+    context_object_name = 'rollups'
+    keyset_fields = ('start', 'id')
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('user')
+        self.form = TimeRollupFilterForm(self.request.GET or None)
+        if self.form.is_valid():
+            return self.form.filter_queryset(queryset)
+        return queryset.filter(period=TimeRollup.WEEK)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['form'] = self.form
+        context['total_estimated_hours'] = minutes_to_hours(self.object_list.aggregate(total=Sum('estimated_minutes'))['total'])
+        context['refreshed_at'] = RollupWatermark.objects.filter(name=WATERMARK_NAME).values_list('value', flat=True).first()
+        return context
+
+
+class AutocompleteView(GroupRequiredMixin, LoginRequiredMixin, View):
+    """
+        Base of the JSON endpoints behind `tasks.widgets.AutocompleteSelect`.
+
+        Returns the rows whose `search_fields` start with the `q` parameter (case-insensitive), at most `limit`
+        of them. Prefix searches are served by the `UPPER(...) text_pattern_ops` indexes on PostgreSQL.
+
+        Attributes:
+            group_required: Members of the "tasks" or "timeEntry" groups, the ones that see the forms.
+            model: The model searched.
+            search_fields: The fields matched against the prefix.
+            ordering: The order of the results.
+            limit: The maximum number of results.
+
+        Methods:
+            get:
+                - Returns `{"results": [{"id": ..., "text": ...}]}`, with the same labels the form uses.
+                - An empty `q` returns no results.
+    """
+    group_required = [u"tasks", u"timeEntry"]
+    model = None
+    search_fields = ()
+    ordering = ()
+    limit = 20
+
+    def get_queryset(self, term):
+        condition = Q()
+        for field in self.search_fields:
+            condition |= Q(**{f'{field}__istartswith': term})
+        return self.model.objects.filter(condition).order_by(*self.ordering)[:self.limit]
+
+    def get(self, request, *args, **kwargs):
+        term = request.GET.get('q', '').strip()
+        if not term:
+            return JsonResponse({'results': []})
+        return JsonResponse({'results': [{'id': obj.pk, 'text': str(obj)} for obj in self.get_queryset(term)]})
+
+
+class UserAutocompleteView(AutocompleteView):
+    model = CustomUser
+    search_fields = ('username', 'email')
+    ordering = ('email',)
+
+    def get_queryset(self, term):
+        return super().get_queryset(term).only('id', 'email')
+
+
+class TaskAutocompleteView(AutocompleteView):
+    model = Task
+    search_fields = ('name',)
+    ordering = ('name', 'id')
+
+    def get_queryset(self, term):
+        return super().get_queryset(term).only('id', 'name')
+
+
+class FragmentCacheStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+        JSON endpoint with the hit and miss counters of the cached list tables, for tuning the cache.
+
+        Methods:
+            test_func: Only staff users can read the counters.
+            get: Returns `{"task_table": {"hits": ..., "misses": ...}, "time_entry_table": {...}}`.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(fragment_stats())
@@ -0,0 +1,51 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+        `<select>` for a `ModelChoiceField` that only renders the selected option.
+
+        The other options are fetched from a prefix-search JSON endpoint while the user types
+        (see `tasks/autocomplete.js` and `tasks.views.AutocompleteView`), so rendering the form never
+        loads the whole table. On submit the field still validates the chosen id against its queryset.
+
+        Attributes:
+            url_name: The name of the URL of the autocomplete endpoint.
+    """
+
+    class Media:
+        js = ('tasks/autocomplete.js',)
+
+    def __init__(self, url_name, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = reverse(self.url_name)
+        return context
+
+    def selected_choices(self, value):
+        values = [v for v in value if v not in (None, '')]
+        if not values:
+            return []
+        field = self.choices.field
+        try:
+            objects = field.queryset.filter(pk__in=values)
+            return [(obj.pk, field.label_from_instance(obj)) for obj in objects]
+        except (ValueError, TypeError, ValidationError):
+            # An invalid id was submitted; the field reports it.
+            return []
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.selected_choices(value)
+        if self.choices.field.empty_label is not None:
+            choices.insert(0, ('', self.choices.field.empty_label))
+
+        selected = {str(v) for v in value}
+        return [
+            (None, [self.create_option(name, option_value, label, str(option_value) in selected, index, attrs=attrs)], index)
+            for index, (option_value, label) in enumerate(choices)
+        ]